@@ -1,72 +1,38 @@
 import streamlit as st
 import pandas as pd
-import os
-from fractions import Fraction
-from openpyxl import load_workbook, Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 import tempfile
-import re
 from datetime import datetime
 import plotly.express as px
 import time
 import json
 import numpy as np
-import math
 import warnings
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-import io
-import requests
-from io import BytesIO
 import openpyxl.styles
+from itertools import islice
+from fastener_engine import (
+    OperationLog, CalculationIssues, configure_logging, configure_tracing, Spans, SpanRecorder,
+    url, me_chem_google_url, iso4014_file_url, din7991_file_url, asme_b18_3_file_url, thread_files,
+    get_reference_snapshot, DimensionIndex, ResultView, query_standard_table, get_thread_row_positions,
+    BatchTemplateManager, ShardedBatchExecutor, BATCH_SHARD_MIN_ROWS,
+    StreamingBatchReader, StreamingBatchPipeline, BatchResultExport, BATCH_DISPLAY_ROWS,
+    BatchJobManager, BATCH_JOB_POLL_SECONDS,
+    get_pitch_diameter_from_thread_data, convert_to_mm, get_material_density_rectified, calculate_weight_rectified,
+    formula_details_for
+)
 warnings.filterwarnings('ignore')
 
 # ======================================================
 # LOGGING CONFIGURATION
 # ======================================================
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('fastener_app.log')
-    ]
-)
+configure_logging()
+tracing_enabled = configure_tracing()
 logger = logging.getLogger(__name__)
 
-# ======================================================
-# PATHS & FILES - UPDATED WITH GOOGLE SHEETS LINKS
-# ======================================================
-url = "https://docs.google.com/spreadsheets/d/11Icre8F3X8WA5BVwkJx75NOH3VzF6G7b/export?format=xlsx"
-local_excel_path = r"G:\My Drive\Streamlite\ASME B18.2.1 Hex Bolt and Heavy Hex Bolt.xlsx"
-
-# Mechanical and Chemical Properties paths
-me_chem_google_url = "https://docs.google.com/spreadsheets/d/12lBzI67Wb0yZyJKYxpDCLzHF9zvS2Fha/export?format=xlsx"
-me_chem_path = r"G:\My Drive\Streamlite\Mechanical and Chemical.xlsx"
-
-# ISO 4014 paths - local and Google Sheets
-iso4014_local_path = r"G:\My Drive\Streamlite\ISO 4014 Hex Bolt.xlsx"
-iso4014_file_url = "https://docs.google.com/spreadsheets/d/1d2hANwoMhuzwyKJ72c125Uy0ujB6QsV_/export?format=xlsx"
-
-# DIN-7991 paths - local and Google Sheets
-din7991_local_path = r"G:\My Drive\Streamlite\DIN-7991.xlsx"
-din7991_file_url = "https://docs.google.com/spreadsheets/d/1PjptIbFfebdF1h_Aj124fNgw5jNBWlvn/export?format=xlsx"
-
-# ASME B18.3 paths - local and Google Sheets
-asme_b18_3_local_path = r"G:\My Drive\Streamlite\ASME B18.3.xlsx"
-asme_b18_3_file_url = "https://docs.google.com/spreadsheets/d/1dPNGwf7bv5A77rMSPpl11dhcJTXQfob1/export?format=xlsx"
-
-# Thread files - UPDATED WITH GOOGLE SHEETS LINKS
-thread_files = {
-    "ASME B1.1": "https://docs.google.com/spreadsheets/d/1YHgUloNsFudxxqhWQV66D2DtSSKWFP_w/export?format=xlsx",
-    "ISO 965-2-98 Coarse": "https://docs.google.com/spreadsheets/d/1be5eEy9hbVfMg2sl1-Cz1NNCGGF8EB-L/export?format=xlsx",
-    "ISO 965-2-98 Fine": "https://docs.google.com/spreadsheets/d/1QGQ6SMWBSTsah-vq3zYnhOC3NXaBdKPe/export?format=xlsx",
-}
-
 # ======================================================
 # LOADING INDICATORS MANAGEMENT
 # ======================================================
-class LoadingManager:
+class LoadingManager(OperationLog):
     """Manage loading states and progress indicators"""
     
     @staticmethod
@@ -82,62 +48,20 @@ class LoadingManager:
             progress.progress((i + 1) / total_steps, text=f"{text}... {i+1}/{total_steps}")
             time.sleep(0.1)
         progress.empty()
-    
-    @staticmethod
-    def log_operation(operation_name, success=True, details=""):
-        """Log operations with details"""
-        status = "SUCCESS" if success else "FAILED"
-        logger.info(f"{operation_name} - {status} - {details}")
+
+def show_calculation_issues(issues):
+    """Render collected issues: errors and warnings inline, debug notes in the sidebar"""
+    for level, message in issues:
+        if level == "error":
+            st.error(message)
+        elif level == "warning":
+            st.warning(message)
+        else:
+            st.sidebar.write(message)
 
 # ======================================================
 # ENHANCED CONFIGURATION & ERROR HANDLING
 # ======================================================
-@st.cache_data(ttl=3600, show_spinner=False)
-def safe_load_excel_file_enhanced(path_or_url, max_retries=3, timeout=30):
-    """Enhanced loading with better caching, validation and retry mechanism"""
-    for attempt in range(max_retries):
-        try:
-            if path_or_url.startswith('http'):
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                response = requests.get(path_or_url, headers=headers, timeout=timeout)
-                response.raise_for_status()
-                
-                if len(response.content) < 100:
-                    st.warning(f"File seems too small: {path_or_url}")
-                    continue
-                    
-                df = pd.read_excel(BytesIO(response.content))
-            else:
-                if os.path.exists(path_or_url):
-                    file_size = os.path.getsize(path_or_url)
-                    if file_size < 100:
-                        st.warning(f"File seems too small: {path_or_url}")
-                        continue
-                    df = pd.read_excel(path_or_url)
-                else:
-                    st.error(f"File not found: {path_or_url}")
-                    return pd.DataFrame()
-            
-            if df.empty:
-                st.warning(f"Empty dataframe loaded from: {path_or_url}")
-                return pd.DataFrame()
-                
-            if len(df.columns) < 2:
-                st.warning(f"Dataframe has too few columns: {path_or_url}")
-                return pd.DataFrame()
-                
-            LoadingManager.log_operation(f"Load Excel File: {path_or_url}", True, f"Rows: {len(df)}, Columns: {len(df.columns)}")
-            return df
-            
-        except Exception as e:
-            if attempt == max_retries - 1:
-                st.error(f"Error loading {path_or_url}: {str(e)}")
-                LoadingManager.log_operation(f"Load Excel File: {path_or_url}", False, str(e))
-                return pd.DataFrame()
-            time.sleep(1)
-
 def validate_dataframe(df, required_columns=[]):
     """Validate dataframe structure"""
     if df.empty:
@@ -198,22 +122,15 @@ def initialize_session_state():
         "current_filters_thread": {},
         "current_filters_material": {},
         "product_intelligence_filters": {},
-        "me_chem_columns": [],
-        "property_classes": [],
-        "din7991_loaded": False,
-        "asme_b18_3_loaded": False,
-        "dimensional_standards_count": 0,
-        "available_products": {},
-        "available_series": {},
         "debug_mode": False,
         "section_a_view": True,
         "section_b_view": True,
         "section_c_view": True,
         "thread_independent_mode": True,
-        "section_a_results": pd.DataFrame(),
-        "section_b_results": pd.DataFrame(),
-        "section_c_results": pd.DataFrame(),
-        "combined_results": pd.DataFrame(),
+        "section_a_results": ResultView(),
+        "section_b_results": ResultView(),
+        "section_c_results": ResultView(),
+        "combined_results": ResultView(),
         "section_a_filters": {},
         "section_b_filters": {},
         "section_c_filters": {},
@@ -254,13 +171,19 @@ def initialize_session_state():
         "mobile_view_optimized": False,
         # Batch calculator session states - NEW
         "batch_uploaded_file": None,
+        "batch_file_scan": None,
         "batch_processing": False,
         "batch_results": None,
         "batch_summary": None,
         "batch_errors": [],
         "batch_processing_complete": False,
+        "batch_job_id": None,
+        "batch_job_error": None,
         "batch_mode": "basic",  # 'basic' or 'advanced'
         "batch_diameter_type": "Blank Diameter",  # NEW: Store diameter type for batch
+        "batch_execution_mode": "auto",  # 'auto', 'single' or 'parallel'
+        # Span timings over the whole session, for the debug panel
+        "session_spans": SpanRecorder(),
     }
     
     for key, value in defaults.items():
@@ -362,502 +285,46 @@ class ExportTemplateManager:
         return None
 
 # ======================================================
-# ENHANCED BATCH CALCULATOR TEMPLATES WITH DIAMETER TYPE SUPPORT
+# BACKGROUND BATCH JOBS - SHARED MANAGER AND PROGRESS POLLING
 # ======================================================
-class BatchTemplateManager:
-    """Manage batch calculator templates with diameter type support"""
-    
-    @staticmethod
-    def extract_thread_info_from_size(size_str):
-        """PROPERLY extract thread size, pitch, and TPI from formats like '3/8-16'"""
-        if '-' not in size_str:
-            return size_str, None, None
-        
-        try:
-            # Handle formats: "3/8-16", "1/2-13", "M10-1.5"
-            parts = size_str.split('-')
-            thread_size = parts[0].strip()
-            
-            # Extract TPI or pitch
-            pitch_part = parts[1].strip()
-            
-            # Handle metric threads (M10-1.5)
-            if thread_size.startswith('M'):
-                pitch = float(pitch_part) if '.' in pitch_part else None
-                tpi = None
-            else:
-                # Handle inch threads (3/8-16)
-                tpi = int(pitch_part) if pitch_part.isdigit() else None
-                pitch = None
-            
-            return thread_size, tpi, pitch
-            
-        except Exception as e:
-            st.warning(f"Error extracting thread info from '{size_str}': {str(e)}")
-            return size_str, None, None
-    
-    @staticmethod
-    def get_basic_template(diameter_type="Blank Diameter"):
-        """Get basic template with Product_Type column and diameter type support"""
-        if diameter_type == "Blank Diameter":
-            template_data = {
-                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
-                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
-                'Size': ['1/4', 'M10', '1/2-13', '5/16'],
-                'Length': [50, 75, 200, 100],
-                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
-                'Diameter_Value': [6.35, 10.0, 12.7, 7.94],
-                'Diameter_Unit': ['mm', 'mm', 'mm', 'mm'],
-                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
-                'Quantity': [100, 50, 25, 200]
-            }
-        else:  # Pitch Diameter
-            template_data = {
-                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
-                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
-                'Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
-                'Length': [50, 75, 200, 100],
-                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
-                'Thread_Standard': ['ASME B1.1', 'ASME B1.1', 'ASME B1.1', 'ASME B1.1'],
-                'Product_Standard': ['ASME B18.2.1', 'ASME B18.2.1', 'Not Required', 'ASME B18.2.1'],
-                'Thread_Class': ['2A', '3A', '2A', '1A'],  # Different classes for demonstration
-                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
-                'Quantity': [100, 50, 25, 200]
-            }
-        return pd.DataFrame(template_data)
-    
-    @staticmethod
-    def get_advanced_template(diameter_type="Blank Diameter"):
-        """Get advanced template with all parameters and diameter type support"""
-        if diameter_type == "Blank Diameter":
-            template_data = {
-                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hexagon Socket Head Cap Screws', 'Hex Bolt'],
-                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'SHS-001', 'HB-003'],
-                'Series': ['Inch', 'Metric', 'Inch', 'Inch', 'Metric'],
-                'Standard': ['ASME B18.2.1', 'ISO 4014', 'Not Required', 'ASME B18.3', 'ISO 4014'],
-                'Size': ['1/4', 'M10', '1/2-13', '1/4', 'M12'],
-                'Grade': ['N/A', 'A', 'N/A', 'N/A', 'B'],
-                'Diameter_Type': ['Blank Diameter', 'Blank Diameter', 'Blank Diameter', 'Blank Diameter', 'Blank Diameter'],
-                'Diameter_Value': [6.35, 10.0, 12.7, 6.35, 12.0],
-                'Diameter_Unit': ['mm', 'mm', 'mm', 'mm', 'mm'],
-                'Thread_Standard': ['N/A', 'N/A', 'ASME B1.1', 'N/A', 'N/A'],
-                'Thread_Size': ['N/A', 'N/A', '1/2-13', 'N/A', 'N/A'],
-                'Thread_Class': ['N/A', 'N/A', '2A', 'N/A', 'N/A'],
-                'Length': [50, 75, 200, 50, 100],
-                'Length_Unit': ['mm', 'mm', 'mm', 'mm', 'mm'],
-                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel', 'Carbon Steel'],
-                'Quantity': [100, 50, 25, 75, 150]
-            }
-        else:  # Pitch Diameter
-            template_data = {
-                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
-                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
-                'Series': ['Inch', 'Inch', 'Inch', 'Inch'],
-                'Standard': ['ASME B18.2.1', 'ASME B18.2.1', 'Not Required', 'ASME B18.2.1'],
-                'Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
-                'Grade': ['N/A', 'N/A', 'N/A', 'N/A'],
-                'Diameter_Type': ['Pitch Diameter', 'Pitch Diameter', 'Pitch Diameter', 'Pitch Diameter'],
-                'Thread_Standard': ['ASME B1.1', 'ASME B1.1', 'ASME B1.1', 'ASME B1.1'],
-                'Thread_Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
-                'Thread_Class': ['2A', '3A', '2A', '1A'],
-                'Length': [50, 75, 200, 100],
-                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
-                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
-                'Quantity': [100, 50, 25, 200]
-            }
-        return pd.DataFrame(template_data)
-    
-    @staticmethod
-    def detect_input_mode(row):
-        """Detect whether row is in basic or advanced mode"""
-        basic_columns = ['Product_Type', 'Size', 'Length']
-        advanced_columns = ['Product_Type', 'Series', 'Standard', 'Diameter_Type']
-        
-        # Check if advanced columns are populated
-        advanced_mode = any(pd.notna(row.get(col, None)) for col in advanced_columns if col in row)
-        
-        # Check if basic columns are populated
-        basic_mode = all(pd.notna(row.get(col, None)) for col in basic_columns if col in row)
-        
-        if advanced_mode:
-            return "advanced"
-        elif basic_mode:
-            return "basic"
-        else:
-            return "invalid"
-    
-    @staticmethod
-    def infer_parameters_basic_mode(row, diameter_type="Blank Diameter"):
-        """Intelligently infer parameters from basic mode with diameter type support"""
-        try:
-            product_type = row.get('Product_Type', 'Hex Bolt')
-            product_code = row.get('Product_Code', '')
-            size = row.get('Size')
-            length = row.get('Length', 50.0)
-            length_unit = row.get('Length_Unit', 'mm')
-            material = row.get('Material', 'Carbon Steel')
-            quantity = row.get('Quantity', 1)
-            thread_standard = row.get('Thread_Standard', 'ASME B1.1')
-            product_standard = row.get('Product_Standard', 'ASME B18.2.1')
-            thread_class = row.get('Thread_Class', '2A')  # Use provided thread class, not hardcoded
-            
-            # Initialize default parameters
-            params = {
-                'product_type': product_type,
-                'product_code': product_code,
-                'size': str(size),
-                'material': material,
-                'length': length,
-                'length_unit': length_unit,
-                'quantity': quantity,
-                'diameter_type': diameter_type,
-                'thread_standard': thread_standard,
-                'product_standard': product_standard,
-                'thread_class': thread_class  # Use the provided thread class
-            }
-            
-            # Analyze size pattern
-            size_str = str(size).strip().upper()
-            
-            # Metric detection (M10, M12, M16, etc.)
-            if size_str.startswith('M'):
-                params['series'] = 'Metric'
-                params['standard'] = 'ISO 4014' if product_standard == 'All' else product_standard
-                
-                # Extract diameter from metric size (M10 -> 10.0 mm)
-                try:
-                    diameter_value = float(size_str[1:])
-                    params['diameter_value'] = diameter_value
-                    params['diameter_unit'] = 'mm'
-                    params['grade'] = 'A'  # Default grade for metric
-                except ValueError:
-                    params['diameter_value'] = 10.0  # Default fallback
-                    params['diameter_unit'] = 'mm'
-                    params['grade'] = 'A'
-            
-            # Inch detection (fractions or numbers) - INCLUDING THREADED ROD WITH THREAD SIZES
-            elif '/' in size_str or any(char.isdigit() for char in size_str):
-                params['series'] = 'Inch'
-                params['standard'] = 'ASME B18.2.1' if product_standard == 'All' else product_standard
-                params['grade'] = 'N/A'
-                
-                # SPECIAL HANDLING FOR THREADED ROD WITH THREAD SIZES LIKE "3/8-16"
-                if product_type == "Threaded Rod" and '-' in size_str and diameter_type == "Pitch Diameter":
-                    # Extract thread size for pitch diameter lookup - USE FULL SIZE "3/8-16"
-                    params['thread_size'] = size_str  # Use full size like "3/8-16"
-                    
-                    try:
-                        # Handle fractions for thread size
-                        thread_size_only = size_str.split('-')[0].strip()  # Get "3/8" from "3/8-16"
-                        if '/' in thread_size_only:
-                            if '-' in thread_size_only:
-                                # Handle cases like "1-1/2"
-                                parts = thread_size_only.split('-')
-                                whole = float(parts[0]) if parts[0] else 0
-                                fraction = float(Fraction(parts[1]))
-                                decimal_inches = whole + fraction
-                            else:
-                                decimal_inches = float(Fraction(thread_size_only))
-                        else:
-                            decimal_inches = float(thread_size_only)
-                        
-                        # Convert inches to mm for calculation
-                        params['diameter_value'] = decimal_inches * 25.4
-                        params['diameter_unit'] = 'mm'
-                        
-                    except (ValueError, ZeroDivisionError):
-                        params['diameter_value'] = 6.35  # 1/4" default
-                        params['diameter_unit'] = 'mm'
-                
-                else:
-                    # Regular inch size processing
-                    try:
-                        # Handle fractions
-                        if '/' in size_str:
-                            if '-' in size_str:
-                                # Handle cases like "1-1/2"
-                                parts = size_str.split('-')
-                                whole = float(parts[0]) if parts[0] else 0
-                                fraction = float(Fraction(parts[1]))
-                                decimal_inches = whole + fraction
-                            else:
-                                decimal_inches = float(Fraction(size_str))
-                        else:
-                            decimal_inches = float(size_str)
-                        
-                        # Convert inches to mm for calculation
-                        params['diameter_value'] = decimal_inches * 25.4
-                        params['diameter_unit'] = 'mm'
-                        
-                    except (ValueError, ZeroDivisionError):
-                        params['diameter_value'] = 6.35  # 1/4" default
-                        params['diameter_unit'] = 'mm'
-            
-            else:
-                # Default fallback
-                params['series'] = 'Inch'
-                params['standard'] = 'ASME B18.2.1'
-                params['diameter_value'] = 10.0
-                params['diameter_unit'] = 'mm'
-                params['grade'] = 'N/A'
-            
-            # Handle diameter type specific parameters
-            if diameter_type == "Pitch Diameter":
-                # For pitch diameter, we need thread information
-                # For Threaded Rod, extract thread size from Size column if it contains thread info
-                if product_type == "Threaded Rod" and '-' in str(size):
-                    # Use the FULL thread size like "3/8-16" for lookup
-                    params['thread_size'] = str(size)
-                    # Use the provided thread class, not hardcoded
-                    params['thread_class'] = thread_class
-                    params['thread_standard'] = thread_standard
-                
-                # Get pitch diameter from database - USE FULL THREAD SIZE
-                pitch_diameter = get_pitch_diameter_from_thread_data(
-                    params.get('thread_standard', 'ASME B1.1'),
-                    params.get('thread_size', size),  # Use full size like "3/8-16"
-                    params.get('thread_class', thread_class)  # Use provided thread class
-                )
-                
-                if pitch_diameter is not None:
-                    params['diameter_value'] = pitch_diameter
-                    params['diameter_unit'] = 'inch' if params.get('series') == 'Inch' else 'mm'
-                    params['pitch_diameter_found'] = True
-                else:
-                    # Fallback to blank diameter calculation
-                    st.warning(f"Pitch diameter not found for {params.get('thread_size', size)}, using blank diameter")
-                    params['diameter_type'] = 'Blank Diameter'
-                    params['pitch_diameter_found'] = False
-            
-            elif diameter_type == "Blank Diameter":
-                # Use the provided diameter values
-                params['diameter_value'] = row.get('Diameter_Value', params.get('diameter_value', 10.0))
-                params['diameter_unit'] = row.get('Diameter_Unit', params.get('diameter_unit', 'mm'))
-            
-            return params
-            
-        except Exception as e:
-            st.error(f"Error inferring parameters for size {size}: {str(e)}")
-            # Return safe defaults
-            return {
-                'product_type': 'Hex Bolt',
-                'product_code': product_code,
-                'series': 'Inch',
-                'standard': 'ASME B18.2.1',
-                'size': str(size),
-                'grade': 'N/A',
-                'diameter_type': diameter_type,
-                'diameter_value': 10.0,
-                'diameter_unit': 'mm',
-                'material': material,
-                'length': length,
-                'length_unit': length_unit,
-                'quantity': quantity,
-                'thread_standard': thread_standard,
-                'product_standard': product_standard,
-                'thread_class': thread_class
-            }
+@st.cache_resource
+def get_batch_job_manager():
+    """One job manager per server process"""
+    return BatchJobManager()
 
-# ======================================================
-# BATCH PROCESSING ENGINE WITH DIAMETER TYPE SUPPORT
-# ======================================================
-class BatchProcessor:
-    """Handle batch weight calculations with diameter type support"""
+batch_jobs = get_batch_job_manager()
+
+@st.fragment(run_every=BATCH_JOB_POLL_SECONDS)
+def show_batch_job_progress():
+    """Poll this session's batch job; hand the results to session state when it finishes"""
+    job_id = st.session_state.batch_job_id
+    job = batch_jobs.get(job_id)
+    
+    if job is None:
+        st.session_state.batch_job_id = None
+        st.session_state.batch_processing = False
+        st.warning("The batch job is no longer available. Please process the file again.")
+        return
     
-    @staticmethod
-    def validate_batch_file(df, mode="basic", diameter_type="Blank Diameter"):
-        """Validate batch file structure and data with diameter type support"""
-        errors = []
-        warnings = []
-        
-        if df.empty:
-            errors.append("Uploaded file is empty")
-            return False, errors, warnings
-        
-        # Basic mode validation
-        if mode == "basic":
-            required_columns = ['Product_Type', 'Size', 'Length']
-            
-            if diameter_type == "Blank Diameter":
-                required_columns.extend(['Diameter_Value', 'Diameter_Unit'])
-            else:  # Pitch Diameter
-                required_columns.extend(['Thread_Standard', 'Product_Standard', 'Thread_Class'])
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                errors.append(f"Missing required columns for basic mode with {diameter_type}: {', '.join(missing_columns)}")
-            
-            # Check for empty values in required columns
-            for col in required_columns:
-                if col in df.columns and df[col].isna().any():
-                    empty_count = df[col].isna().sum()
-                    warnings.append(f"Column '{col}' has {empty_count} empty values")
-        
-        # Advanced mode validation
-        elif mode == "advanced":
-            required_columns = ['Product_Type', 'Size', 'Length', 'Diameter_Type']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                errors.append(f"Missing required columns for advanced mode: {', '.join(missing_columns)}")
-        
-        # Check data types
-        if 'Length' in df.columns:
-            try:
-                pd.to_numeric(df['Length'], errors='coerce')
-            except:
-                errors.append("Length column contains non-numeric values")
-        
-        if 'Quantity' in df.columns:
-            try:
-                pd.to_numeric(df['Quantity'], errors='coerce')
-            except:
-                warnings.append("Quantity column contains non-numeric values - will use default of 1")
-        
-        if 'Diameter_Value' in df.columns:
-            try:
-                pd.to_numeric(df['Diameter_Value'], errors='coerce')
-            except:
-                errors.append("Diameter_Value column contains non-numeric values")
-        
-        return len(errors) == 0, errors, warnings
+    if not job.done:
+        st.markdown(f"### ⏳ Processing {job.file_name}")
+        st.progress(job.progress)
+        st.text(job.status_text)
+        st.caption(f"Job {job.job_id} - you can keep working on other pages; the batch keeps running on the server")
+        return
     
-    @staticmethod
-    def process_batch_calculations(batch_df, diameter_type="Blank Diameter", progress_callback=None):
-        """Process batch calculations for all rows with diameter type support"""
-        results = []
-        errors = []
-        summary = {
-            'total_rows': len(batch_df),
-            'successful_calculations': 0,
-            'failed_calculations': 0,
-            'total_weight_kg': 0.0,
-            'total_weight_lb': 0.0,
-            'start_time': datetime.now(),
-            'diameter_type_used': diameter_type
-        }
-        
-        for index, row in batch_df.iterrows():
-            try:
-                # Determine input mode and prepare parameters
-                input_mode = BatchTemplateManager.detect_input_mode(row)
-                
-                if input_mode == "invalid":
-                    errors.append({
-                        'row_index': index,
-                        'input_data': row.to_dict(),
-                        'error': 'Invalid input - missing required columns',
-                        'status': 'failed'
-                    })
-                    continue
-                
-                # Prepare calculation parameters based on mode
-                if input_mode == "basic":
-                    params = BatchTemplateManager.infer_parameters_basic_mode(row, diameter_type)
-                else:  # advanced mode
-                    params = {
-                        'product_type': row.get('Product_Type', 'Hex Bolt'),
-                        'product_code': row.get('Product_Code', ''),
-                        'series': row.get('Series', 'Inch'),
-                        'standard': row.get('Standard', 'ASME B18.2.1'),
-                        'size': row.get('Size'),
-                        'grade': row.get('Grade', 'N/A'),
-                        'diameter_type': row.get('Diameter_Type', diameter_type),
-                        'diameter_value': row.get('Diameter_Value', 10.0),
-                        'diameter_unit': row.get('Diameter_Unit', 'mm'),
-                        'thread_standard': row.get('Thread_Standard', 'N/A'),
-                        'thread_size': row.get('Thread_Size', 'N/A'),
-                        'thread_class': row.get('Thread_Class', 'N/A'),
-                        'length': row.get('Length'),
-                        'length_unit': row.get('Length_Unit', 'mm'),
-                        'material': row.get('Material', 'Carbon Steel'),
-                        'quantity': row.get('Quantity', 1)
-                    }
-                
-                # Handle pitch diameter thread data
-                if params['diameter_type'] == 'Pitch Diameter':
-                    # For Threaded Rod in basic mode, extract thread info from Size column if needed
-                    if (params['product_type'] == 'Threaded Rod' and 
-                        input_mode == 'basic' and 
-                        '-' in str(params.get('size', '')) and
-                        params.get('thread_standard') == 'N/A'):
-                        
-                        # Extract thread information from Size column (e.g., "3/8-16")
-                        size_str = str(params.get('size', ''))
-                        params['thread_size'] = size_str  # Use full size like "3/8-16"
-                        params['thread_standard'] = 'ASME B1.1'
-                        # Use the thread class from the row, don't hardcode to '2A'
-                        params['thread_class'] = row.get('Thread_Class', '2A')
-                    
-                    # Get pitch diameter from database - USE FULL THREAD SIZE
-                    pitch_diameter = get_pitch_diameter_from_thread_data(
-                        params.get('thread_standard', 'ASME B1.1'),
-                        params.get('thread_size', params.get('size')),
-                        params.get('thread_class', row.get('Thread_Class', '2A'))
-                    )
-                    
-                    if pitch_diameter is not None:
-                        params['diameter_value'] = pitch_diameter
-                        params['diameter_unit'] = 'inch' if params.get('series') == 'Inch' else 'mm'
-                        params['pitch_diameter_found'] = True
-                    else:
-                        # Fallback to blank diameter calculation
-                        errors.append({
-                            'row_index': index,
-                            'input_data': row.to_dict(),
-                            'error': f"Pitch diameter not found for thread size: {params.get('thread_size', params.get('size'))} with class: {params.get('thread_class', 'N/A')}",
-                            'status': 'failed'
-                        })
-                        summary['failed_calculations'] += 1
-                        continue
-                
-                # Perform calculation
-                calculation_result = calculate_weight_rectified(params)
-                
-                if calculation_result:
-                    # Add batch-specific information
-                    result_record = {
-                        'row_index': index,
-                        'input_data': row.to_dict(),
-                        'calculation_result': calculation_result,
-                        'status': 'success',
-                        'input_mode': input_mode,
-                        'quantity': params.get('quantity', 1)
-                    }
-                    
-                    results.append(result_record)
-                    summary['successful_calculations'] += 1
-                    summary['total_weight_kg'] += calculation_result['weight_kg'] * result_record['quantity']
-                    summary['total_weight_lb'] += calculation_result['weight_lb'] * result_record['quantity']
-                    
-                    # Update progress
-                    if progress_callback and index % max(1, len(batch_df) // 10) == 0:
-                        progress = (index + 1) / len(batch_df)
-                        progress_callback(progress, f"Processed {index + 1}/{len(batch_df)} rows")
-                
-                else:
-                    errors.append({
-                        'row_index': index,
-                        'input_data': row.to_dict(),
-                        'error': 'Calculation returned no result',
-                        'status': 'failed',
-                        'input_mode': input_mode
-                    })
-                    summary['failed_calculations'] += 1
-                    
-            except Exception as e:
-                errors.append({
-                    'row_index': index,
-                    'input_data': row.to_dict(),
-                    'error': str(e),
-                    'status': 'failed',
-                    'input_mode': input_mode if 'input_mode' in locals() else 'unknown'
-                })
-                summary['failed_calculations'] += 1
-        
-        summary['end_time'] = datetime.now()
-        summary['processing_time'] = (summary['end_time'] - summary['start_time']).total_seconds()
-        
-        return results, errors, summary
+    if job.status == "completed":
+        st.session_state.batch_results = job.results
+        st.session_state.batch_errors = job.errors
+        st.session_state.batch_summary = job.summary
+        st.session_state.batch_processing_complete = True
+    else:
+        st.session_state.batch_job_error = job.error
+    
+    batch_jobs.release(job_id)
+    st.session_state.batch_job_id = None
+    st.session_state.batch_processing = False
+    st.rerun()
 
 # ======================================================
 # BATCH RESULTS DISPLAY
@@ -909,7 +376,7 @@ class BatchResultsDisplay:
         
         # Prepare data for display
         display_data = []
-        for result in results:
+        for result in islice(results, BATCH_DISPLAY_ROWS):
             calc = result['calculation_result']
             input_data = result['input_data']
             quantity = result.get('quantity', 1)
@@ -934,6 +401,8 @@ class BatchResultsDisplay:
         
         results_df = pd.DataFrame(display_data)
         st.dataframe(results_df, use_container_width=True)
+        if len(results) > BATCH_DISPLAY_ROWS:
+            st.caption(f"Showing first {BATCH_DISPLAY_ROWS} of {len(results)} results. Download the results for the full list.")
     
     @staticmethod
     def show_error_report(errors):
@@ -944,7 +413,7 @@ class BatchResultsDisplay:
         st.markdown("### ❌ Error Report")
         st.warning(f"Found {len(errors)} calculation errors")
         
-        for error in errors[:10]:  # Show first 10 errors
+        for error in islice(errors, 10):  # Show first 10 errors
             with st.expander(f"Row {error['row_index'] + 1} - {error['error']}"):
                 st.write("**Input Data:**", error['input_data'])
                 st.write("**Error:**", error['error'])
@@ -960,68 +429,9 @@ class BatchResultsDisplay:
             filename = f"{filename_prefix}_{timestamp}.xlsx"
             
             with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-                with pd.ExcelWriter(tmp.name, engine='openpyxl') as writer:
-                    # Sheet 1: Summary
-                    summary_df = pd.DataFrame([summary])
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                    
-                    # Sheet 2: Detailed Results
-                    if results:
-                        detailed_data = []
-                        for result in results:
-                            calc = result['calculation_result']
-                            input_data = result['input_data']
-                            quantity = result.get('quantity', 1)
-                            
-                            detailed_record = {
-                                'Row_Index': result['row_index'] + 1,
-                                'Product_Type': input_data.get('Product_Type', 'Auto-detected'),
-                                'Product_Code': input_data.get('Product_Code', ''),
-                                'Series': input_data.get('Series', 'Auto-detected'),
-                                'Standard': input_data.get('Standard', 'Auto-detected'),
-                                'Size': input_data.get('Size', 'N/A'),
-                                'Grade': input_data.get('Grade', 'N/A'),
-                                'Diameter_Type': input_data.get('Diameter_Type', 'Auto-detected'),
-                                'Diameter_Value': input_data.get('Diameter_Value', 'Auto-calculated'),
-                                'Diameter_Unit': input_data.get('Diameter_Unit', 'mm'),
-                                'Length': input_data.get('Length', 'N/A'),
-                                'Length_Unit': input_data.get('Length_Unit', 'mm'),
-                                'Material': input_data.get('Material', 'Carbon Steel'),
-                                'Input_Mode': result.get('input_mode', 'basic'),
-                                'Weight_kg': calc['weight_kg'],
-                                'Weight_lb': calc['weight_lb'],
-                                'Quantity': quantity,
-                                'Total_Weight_kg': calc['weight_kg'] * quantity,
-                                'Total_Weight_lb': calc['weight_lb'] * quantity,
-                                'Status': 'Success'
-                            }
-                            detailed_data.append(detailed_record)
-                        
-                        detailed_df = pd.DataFrame(detailed_data)
-                        detailed_df.to_excel(writer, sheet_name='Detailed_Results', index=False)
-                    
-                    # Sheet 3: Error Report
-                    if errors:
-                        error_df = pd.DataFrame(errors)
-                        error_df.to_excel(writer, sheet_name='Error_Report', index=False)
-                    
-                    # Sheet 4: Processing Log
-                    log_data = {
-                        'Timestamp': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-                        'Total_Rows': [summary['total_rows']],
-                        'Successful': [summary['successful_calculations']],
-                        'Failed': [summary['failed_calculations']],
-                        'Success_Rate': [f"{(summary['successful_calculations']/summary['total_rows'])*100:.2f}%"],
-                        'Total_Weight_kg': [summary['total_weight_kg']],
-                        'Total_Weight_lb': [summary['total_weight_lb']],
-                        'Processing_Time_seconds': [summary['processing_time']],
-                        'Diameter_Type': [summary.get('diameter_type_used', 'Blank Diameter')]
-                    }
-                    log_df = pd.DataFrame(log_data)
-                    log_df.to_excel(writer, sheet_name='Processing_Log', index=False)
-                
+                BatchResultExport.write_workbook(results, errors, summary, tmp.name)
                 return tmp.name, filename
-                
+        
         except Exception as e:
             st.error(f"Error exporting results: {str(e)}")
             return None, None
@@ -1249,24 +659,28 @@ def show_batch_weight_calculator():
         st.session_state.batch_uploaded_file = uploaded_file
         
         try:
-            # Load the file
-            if uploaded_file.name.endswith('.xlsx'):
-                batch_df = pd.read_excel(uploaded_file)
-            else:
-                batch_df = pd.read_csv(uploaded_file)
+            # Scan the file chunk by chunk; the scan is kept until the file or mode changes
+            scan_key = (uploaded_file.file_id, st.session_state.batch_mode, diameter_type)
+            if st.session_state.batch_file_scan is None or st.session_state.batch_file_scan[0] != scan_key:
+                st.session_state.batch_file_scan = (scan_key, StreamingBatchReader.scan(
+                    uploaded_file, st.session_state.batch_mode, diameter_type
+                ))
+            file_scan = st.session_state.batch_file_scan[1]
+            preview_df = file_scan['preview_df']
+            total_rows = file_scan['total_rows']
             
-            st.success(f"✅ File uploaded successfully! Loaded {len(batch_df)} records")
+            st.success(f"✅ File uploaded successfully! Loaded {total_rows} records")
             
             # Show preview
             with st.expander("📋 Preview Uploaded Data"):
-                st.dataframe(batch_df.head(10), use_container_width=True)
-                st.write(f"Total rows: {len(batch_df)}")
-                st.write(f"Columns: {list(batch_df.columns)}")
+                st.dataframe(preview_df, use_container_width=True)
+                st.write(f"Total rows: {total_rows}")
+                st.write(f"Columns: {file_scan['columns']}")
             
-            # Validate file with diameter type
-            is_valid, validation_errors, validation_warnings = BatchProcessor.validate_batch_file(
-                batch_df, st.session_state.batch_mode, diameter_type
-            )
+            # Validation with diameter type was done during the scan
+            is_valid = file_scan['is_valid']
+            validation_errors = file_scan['errors']
+            validation_warnings = file_scan['warnings']
             
             if validation_warnings:
                 for warning in validation_warnings:
@@ -1278,10 +692,12 @@ def show_batch_weight_calculator():
                 st.stop()
             
             # Show inferred parameters example for basic mode
-            if st.session_state.batch_mode == "basic" and len(batch_df) > 0:
+            if st.session_state.batch_mode == "basic" and len(preview_df) > 0:
                 with st.expander("🔍 Auto-Detection Preview"):
-                    sample_row = batch_df.iloc[0]
-                    inferred_params = BatchTemplateManager.infer_parameters_basic_mode(sample_row, diameter_type)
+                    sample_row = preview_df.iloc[0]
+                    with CalculationIssues.collect(st.session_state.debug_mode) as issues:
+                        inferred_params = BatchTemplateManager.infer_parameters_basic_mode(sample_row, diameter_type)
+                    show_calculation_issues(issues)
                     st.write("**Sample Auto-detected Parameters:**")
                     st.json(inferred_params)
                     st.caption("The system will automatically determine these parameters for all rows")
@@ -1290,44 +706,50 @@ def show_batch_weight_calculator():
             st.markdown("---")
             st.markdown("### ⚙️ Process Batch Calculations")
             
+            execution_labels = {"auto": "Auto", "single": "Single process", "parallel": "All CPU cores"}
+            if ShardedBatchExecutor.available():
+                st.session_state.batch_execution_mode = st.selectbox(
+                    "Execution Mode",
+                    list(execution_labels.keys()),
+                    index=list(execution_labels.keys()).index(st.session_state.batch_execution_mode),
+                    format_func=lambda mode: execution_labels[mode],
+                    help=f"Auto uses all CPU cores for files with {BATCH_SHARD_MIN_ROWS:,}+ rows",
+                    key="batch_execution_mode_select"
+                )
+            
             if st.button(
-                f"🚀 Process {len(batch_df)} Records", 
+                f"🚀 Process {total_rows} Records", 
                 type="primary", 
                 use_container_width=True,
-                key="process_batch_calculations"
+                key="process_batch_calculations",
+                disabled=st.session_state.batch_job_id is not None
             ):
-                st.session_state.batch_processing = True
+                # Hand the file to the background job pool; progress is polled below
+                StreamingBatchPipeline.discard(st.session_state.batch_results)
+                StreamingBatchPipeline.discard(st.session_state.batch_errors)
+                st.session_state.batch_results = None
+                st.session_state.batch_errors = []
+                st.session_state.batch_summary = None
+                st.session_state.batch_job_error = None
                 st.session_state.batch_processing_complete = False
-                
-                # Process batch calculations with diameter type
-                with st.spinner(f"Processing {len(batch_df)} records with {diameter_type}..."):
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    def update_progress(progress, status):
-                        progress_bar.progress(progress)
-                        status_text.text(status)
-                    
-                    results, errors, summary = BatchProcessor.process_batch_calculations(
-                        batch_df, diameter_type, update_progress
-                    )
-                    
-                    # Store results in session state
-                    st.session_state.batch_results = results
-                    st.session_state.batch_errors = errors
-                    st.session_state.batch_summary = summary
-                    st.session_state.batch_processing = False
-                    st.session_state.batch_processing_complete = True
-                
-                progress_bar.empty()
-                status_text.empty()
-                
+                st.session_state.batch_job_id = batch_jobs.submit(
+                    uploaded_file, diameter_type, st.session_state.batch_execution_mode, total_rows
+                )
+                st.session_state.batch_processing = True
                 st.rerun()
         
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
             LoadingManager.log_operation("Batch File Processing", False, str(e))
     
+    # Poll the running job, even after the upload widget was cleared
+    if st.session_state.batch_job_id:
+        st.markdown("---")
+        show_batch_job_progress()
+    
+    if st.session_state.batch_job_error:
+        st.error(f"Batch processing failed: {st.session_state.batch_job_error}")
+    
     # Display results if processing is complete
     if st.session_state.batch_processing_complete and st.session_state.batch_summary:
         st.markdown("---")
@@ -1482,99 +904,37 @@ def show_batch_weight_calculator():
         with col3:
             if st.button("🔄 Process New Batch", use_container_width=True):
                 # Reset batch state
+                StreamingBatchPipeline.discard(st.session_state.batch_results)
+                StreamingBatchPipeline.discard(st.session_state.batch_errors)
+                st.session_state.batch_file_scan = None
                 st.session_state.batch_uploaded_file = None
                 st.session_state.batch_processing = False
                 st.session_state.batch_results = None
                 st.session_state.batch_errors = []
                 st.session_state.batch_summary = None
+                st.session_state.batch_job_error = None
                 st.session_state.batch_processing_complete = False
                 st.rerun()
 
 # ======================================================
 # FIXED THREAD DATA LOADING - PROPER DATA TYPES
 # ======================================================
-@st.cache_data(ttl=3600)
 def load_thread_data_enhanced(standard_name):
     """Enhanced thread data loading with proper data type handling"""
     if standard_name not in thread_files:
         return pd.DataFrame()
     
-    file_path = thread_files[standard_name]
-    try:
-        df_thread = safe_load_excel_file_enhanced(file_path)
-        if df_thread.empty:
-            st.warning(f"Thread data for {standard_name} is empty")
-            return pd.DataFrame()
-        
-        # Clean column names
-        df_thread.columns = [str(col).strip() for col in df_thread.columns]
-        
-        # Debug: Show column info
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"Columns {standard_name}:", df_thread.columns.tolist())
-            st.sidebar.write(f"Shape {standard_name}:", df_thread.shape)
-        
-        # Handle different column naming patterns
-        thread_col = None
-        class_col = None
-        
-        # Find thread size column
-        possible_thread_cols = ['Thread', 'Size', 'Thread Size', 'Nominal Size', 'Basic Major Diameter']
-        for col in df_thread.columns:
-            col_lower = str(col).lower()
-            for possible in possible_thread_cols:
-                if possible.lower() in col_lower:
-                    thread_col = col
-                    break
-            if thread_col:
-                break
-        
-        # Find class/tolerance column
-        possible_class_cols = ['Class', 'Tolerance', 'Tolerance Class', 'Thread Class']
-        for col in df_thread.columns:
-            col_lower = str(col).lower()
-            for possible in possible_class_cols:
-                if possible.lower() in col_lower:
-                    class_col = col
-                    break
-            if class_col:
-                break
-        
-        # If no specific class column found, check for columns containing tolerance info
-        if not class_col:
-            for col in df_thread.columns:
-                if 'tolerance' in str(col).lower() or 'class' in str(col).lower():
-                    class_col = col
-                    break
-        
-        # Standardize column names for consistent processing
-        if thread_col:
-            df_thread = df_thread.rename(columns={thread_col: 'Thread'})
-        
-        if class_col:
-            df_thread = df_thread.rename(columns={class_col: 'Class'})
-        
-        # Clean data - convert all to string and handle NaN
-        if 'Thread' in df_thread.columns:
-            df_thread['Thread'] = df_thread['Thread'].astype(str).str.strip()
-            df_thread = df_thread[df_thread['Thread'] != 'nan']
-            df_thread = df_thread[df_thread['Thread'] != '']
-        
-        if 'Class' in df_thread.columns:
-            df_thread['Class'] = df_thread['Class'].astype(str).str.strip()
-            df_thread = df_thread[df_thread['Class'] != 'nan']
-            df_thread = df_thread[df_thread['Class'] != '']
-        
-        # Add standard identifier
-        df_thread['Standard'] = standard_name
-        
-        LoadingManager.log_operation(f"Load Thread Data: {standard_name}", True, f"Records: {len(df_thread)}")
-        return df_thread
-        
-    except Exception as e:
-        st.error(f"Error loading thread data for {standard_name}: {str(e)}")
-        LoadingManager.log_operation(f"Load Thread Data: {standard_name}", False, str(e))
+    df_thread = get_reference_snapshot().threads.get(standard_name, pd.DataFrame())
+    if df_thread.empty:
+        st.warning(f"Thread data for {standard_name} is empty")
         return pd.DataFrame()
+    
+    # Debug: Show column info
+    if st.session_state.debug_mode:
+        st.sidebar.write(f"Columns {standard_name}:", df_thread.columns.tolist())
+        st.sidebar.write(f"Shape {standard_name}:", df_thread.shape)
+    
+    return df_thread
 
 def get_thread_data_enhanced(standard, thread_size=None, thread_class=None):
     """Enhanced thread data retrieval with proper filtering"""
@@ -1583,115 +943,16 @@ def get_thread_data_enhanced(standard, thread_size=None, thread_class=None):
     if df_thread.empty:
         return pd.DataFrame()
     
-    # Apply filters if provided
-    result_df = df_thread.copy()
-    
-    if thread_size and thread_size != "All" and "Thread" in result_df.columns:
-        # Use exact match for thread size including TPI (e.g., "3/8-16")
-        result_df = result_df[result_df["Thread"].astype(str).str.strip() == str(thread_size).strip()]
-    
-    if thread_class and thread_class != "All" and "Class" in result_df.columns:
-        result_df = result_df[
-            result_df["Class"].astype(str).str.strip().str.upper() == 
-            str(thread_class).strip().upper()
-        ]
-    
-    return result_df
+    # Filter positions first, then take only the matching rows
+    return df_thread.iloc[get_thread_row_positions(df_thread, thread_size, thread_class)]
 
 def get_thread_sizes_enhanced(standard):
     """Get available thread sizes with proper data handling"""
-    df_thread = load_thread_data_enhanced(standard)
-    
-    if df_thread.empty or "Thread" not in df_thread.columns:
-        return ["All"]
-    
-    try:
-        # Get unique sizes and handle NaN values properly
-        unique_sizes = df_thread['Thread'].dropna().unique()
-        
-        # Convert all sizes to string and filter out empty strings
-        unique_sizes = [str(size).strip() for size in unique_sizes if str(size).strip() != '']
-        
-        if len(unique_sizes) > 0:
-            sorted_sizes = safe_sort_sizes(unique_sizes)
-            return ["All"] + sorted_sizes
-        else:
-            return ["All"]
-    except Exception as e:
-        st.warning(f"Thread size processing warning for {standard}: {str(e)}")
-        return ["All"]
+    return reference_snapshot.options.thread_sizes_for(standard)
 
 def get_thread_classes_enhanced(standard):
     """Get available thread classes with proper data handling"""
-    df_thread = load_thread_data_enhanced(standard)
-    
-    if df_thread.empty or "Class" not in df_thread.columns:
-        return ["All"]
-    
-    try:
-        # Get unique classes and handle NaN values properly
-        unique_classes = df_thread['Class'].dropna().unique()
-        
-        # Convert all classes to string and filter out empty strings
-        unique_classes = [str(cls).strip() for cls in unique_classes if str(cls).strip() != '']
-        
-        if len(unique_classes) > 0:
-            sorted_classes = sorted(unique_classes)
-            return ["All"] + sorted_classes
-        else:
-            return ["All"]
-    except Exception as e:
-        st.warning(f"Thread class processing warning for {standard}: {str(e)}")
-        return ["All"]
-
-# ======================================================
-# PITCH DIAMETER LOOKUP - FIXED VERSION
-# ======================================================
-def get_pitch_diameter_from_thread_data(thread_standard, thread_size, thread_class):
-    """Get pitch diameter from thread data for threaded rod calculation - FIXED VERSION"""
-    try:
-        df_thread = get_thread_data_enhanced(thread_standard, thread_size, thread_class)
-        
-        if df_thread.empty:
-            # Try with just the nominal size if full size not found
-            if '-' in str(thread_size):
-                nominal_size = str(thread_size).split('-')[0].strip()
-                df_thread = get_thread_data_enhanced(thread_standard, nominal_size, thread_class)
-            
-            if df_thread.empty:
-                return None
-        
-        # Look for pitch diameter columns - prioritize minimum pitch diameter for threaded rod
-        pitch_dia_cols = []
-        
-        # First priority: Pitch diameter minimum columns
-        min_pitch_cols = [col for col in df_thread.columns if 'pitch' in col.lower() and 'diameter' in col.lower() and 'min' in col.lower()]
-        if min_pitch_cols:
-            pitch_dia_cols.extend(min_pitch_cols)
-        
-        # Second priority: Any pitch diameter columns
-        general_pitch_cols = [col for col in df_thread.columns if 'pitch' in col.lower() and 'diameter' in col.lower()]
-        if general_pitch_cols:
-            pitch_dia_cols.extend([col for col in general_pitch_cols if col not in pitch_dia_cols])
-        
-        # Third priority: Any diameter column that might contain pitch diameter
-        if not pitch_dia_cols:
-            dia_cols = [col for col in df_thread.columns if 'diameter' in col.lower()]
-            for col in dia_cols:
-                if 'pitch' not in col.lower() and 'major' not in col.lower() and 'minor' not in col.lower():
-                    pitch_dia_cols.append(col)
-        
-        if pitch_dia_cols:
-            # Get the first pitch diameter value
-            pitch_diameter = df_thread[pitch_dia_cols[0]].iloc[0]
-            if pd.notna(pitch_diameter):
-                return float(pitch_diameter)
-        
-        return None
-        
-    except Exception as e:
-        st.warning(f"Could not retrieve pitch diameter: {str(e)}")
-        return None
+    return reference_snapshot.options.thread_classes_for(standard)
 
 # ======================================================
 # ORACLE 11G STYLING - COMPLETE UI TRANSFORMATION
@@ -2359,48 +1620,42 @@ st.markdown("""
 initialize_session_state()
 optimize_for_mobile()
 
+# Spans of this rerun go to its own recorder and to the session's
+rerun_started = time.perf_counter()
+rerun_spans = SpanRecorder()
+Spans.activate(rerun_spans, st.session_state.session_spans)
+
 # ======================================================
 # ENHANCED DATA LOADING WITH PRODUCT MAPPING
 # ======================================================
 
-# Load main data
-with LoadingManager.show_loading_spinner("Loading main fastener data..."):
-    df = safe_load_excel_file_enhanced(url) if url else safe_load_excel_file_enhanced(local_excel_path)
-
-# Load Mechanical and Chemical data
-with LoadingManager.show_loading_spinner("Loading mechanical & chemical data..."):
-    df_mechem = safe_load_excel_file_enhanced(me_chem_google_url)
-    if df_mechem.empty:
-        st.info("Online Mechanical & Chemical file not accessible, trying local version...")
-        df_mechem = safe_load_excel_file_enhanced(me_chem_path)
-
-# Load ISO 4014 data
-with LoadingManager.show_loading_spinner("Loading ISO 4014 data..."):
-    df_iso4014 = safe_load_excel_file_enhanced(iso4014_file_url)
-    if df_iso4014.empty:
-        st.info("Online ISO 4014 file not accessible, trying local version...")
-        df_iso4014 = safe_load_excel_file_enhanced(iso4014_local_path)
+# Load every reference workbook concurrently
+# Served from the shared snapshot; stale data is refreshed in the background
+with LoadingManager.show_loading_spinner("Loading fastener reference data..."), Spans.span("data_load"):
+    reference_snapshot = get_reference_snapshot()
 
-# Load DIN-7991 data
-with LoadingManager.show_loading_spinner("Loading DIN-7991 data..."):
-    df_din7991 = safe_load_excel_file_enhanced(din7991_file_url)
-    if df_din7991.empty:
-        st.info("Online DIN-7991 file not accessible, trying local version...")
-        df_din7991 = safe_load_excel_file_enhanced(din7991_local_path)
+for level, message in reference_snapshot.messages:
+    getattr(st, level)(message)
 
-# Load ASME B18.3 data
-with LoadingManager.show_loading_spinner("Loading ASME B18.3 data..."):
-    df_asme_b18_3 = safe_load_excel_file_enhanced(asme_b18_3_file_url)
-    if df_asme_b18_3.empty:
-        st.info("Online ASME B18.3 file not accessible, trying local version...")
-        df_asme_b18_3 = safe_load_excel_file_enhanced(asme_b18_3_local_path)
+df = reference_snapshot.tables['main']
+df_mechem = reference_snapshot.tables['mechem']
+df_iso4014 = reference_snapshot.tables['iso4014']
+df_din7991 = reference_snapshot.tables['din7991']
+df_asme_b18_3 = reference_snapshot.tables['asme_b18_3']
+dimension_index = reference_snapshot.dimension_index
+table_schemas = reference_snapshot.schemas
+pitch_diameters = reference_snapshot.pitch_diameters
 
 # ======================================================
 # FIXED DATA PROCESSING - CORRECT PRODUCT NAMES
 # ======================================================
 
-def process_standard_data():
+def process_standard_data(snapshot):
     """FIXED VERSION: Get ACTUAL product names from Excel files"""
+    df = snapshot.tables['main']
+    df_iso4014 = snapshot.tables['iso4014']
+    df_din7991 = snapshot.tables['din7991']
+    df_asme_b18_3 = snapshot.tables['asme_b18_3']
     
     standard_products = {}
     standard_series = {}
@@ -2459,10 +1714,6 @@ def process_standard_data():
         if "Threaded Rod" not in standard_products[standard]:
             standard_products[standard] = ["All", "Threaded Rod"] + [p for p in standard_products[standard] if p != "All" and p != "Threaded Rod"]
     
-    # Store in session state
-    st.session_state.available_products = standard_products
-    st.session_state.available_series = standard_series
-    
     # Count dimensional standards
     dimensional_standards_count = 0
     if not df.empty:
@@ -2474,86 +1725,22 @@ def process_standard_data():
     if not df_asme_b18_3.empty:
         dimensional_standards_count += 1
     
-    st.session_state.dimensional_standards_count = dimensional_standards_count
-    
-    return standard_products, standard_series
-
-# Process all standards data
-with LoadingManager.show_loading_spinner("Processing standards data..."):
-    standard_products, standard_series = process_standard_data()
-
-# Process DIN-7991 data if loaded
-if not df_din7991.empty:
-    if 'Product' not in df_din7991.columns:
-        df_din7991['Product'] = "Hexagon Socket Countersunk Head Cap Screw"
-    if 'Standards' not in df_din7991.columns:
-        df_din7991['Standards'] = "DIN-7991"
-    st.session_state.din7991_loaded = True
-else:
-    st.session_state.din7991_loaded = False
-
-# Process ASME B18.3 data if loaded
-if not df_asme_b18_3.empty:
-    if 'Product' not in df_asme_b18_3.columns:
-        df_asme_b18_3['Product'] = "Hexagon Socket Head Cap Screws"
-    if 'Standards' not in df_asme_b18_3.columns:
-        df_asme_b18_3['Standards'] = "ASME B18.3"
-    st.session_state.asme_b18_3_loaded = True
-else:
-    st.session_state.asme_b18_3_loaded = False
-
-# Process ISO 4014 data
-if not df_iso4014.empty:
-    product_col = None
-    for col in df_iso4014.columns:
-        if 'product' in col.lower():
-            product_col = col
-            break
-    
-    if product_col:
-        df_iso4014['Product'] = df_iso4014[product_col]
-    else:
-        df_iso4014['Product'] = "Hex Bolt"
-    
-    df_iso4014['Standards'] = "ISO-4014-2011"
-    
-    grade_col = None
-    for col in df_iso4014.columns:
-        if 'grade' in col.lower():
-            grade_col = col
-            break
-    
-    if grade_col and grade_col != 'Product Grade':
-        df_iso4014['Product Grade'] = df_iso4014[grade_col]
+    return standard_products, standard_series, dimensional_standards_count
 
 # ======================================================
 # ENHANCED MECHANICAL & CHEMICAL DATA PROCESSING - COMPLETELY FIXED
 # ======================================================
-def process_mechanical_chemical_data():
+def process_mechanical_chemical_data(snapshot):
     """Process and extract ALL property classes from Mechanical & Chemical data - COMPLETELY FIXED"""
+    df_mechem = snapshot.tables['mechem']
     if df_mechem.empty:
         return [], []
     
     try:
         me_chem_columns = df_mechem.columns.tolist()
         
-        # Find ALL possible property class columns
-        property_class_cols = []
-        possible_class_cols = ['Grade', 'Class', 'Property Class', 'Material Grade', 'Type', 'Designation', 'Material']
-        
-        for col in me_chem_columns:
-            col_lower = str(col).lower()
-            for possible in possible_class_cols:
-                if possible.lower() in col_lower:
-                    property_class_cols.append(col)
-                    break
-        
-        # If no specific class columns found, use first few columns that have string data
-        if not property_class_cols:
-            for col in me_chem_columns[:3]:  # Check first 3 columns
-                if df_mechem[col].dtype == 'object':  # String/object type
-                    property_class_cols.append(col)
-                    break
+        # Property class columns (or the first text column) resolved at load time
+        property_class_cols = snapshot.schemas['mechem']['property_class_columns_or_fallback']
         
         # Collect ALL unique property classes from ALL identified columns
         all_property_classes = set()
@@ -2569,17 +1756,9 @@ def process_mechanical_chemical_data():
         # Convert to sorted list
         property_classes = sorted(list(all_property_classes))
         
-        st.session_state.me_chem_columns = me_chem_columns
-        st.session_state.property_classes = property_classes
-        
-        # Debug info
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"Found {len(property_classes)} property classes")
-            st.sidebar.write(f"Property class columns: {property_class_cols}")
-        
         LoadingManager.log_operation("Process Mechanical & Chemical Data", True, f"Property Classes: {len(property_classes)}")
         return me_chem_columns, property_classes
-        
+    
     except Exception as e:
         st.error(f"Error processing Mechanical & Chemical data: {str(e)}")
         LoadingManager.log_operation("Process Mechanical & Chemical Data", False, str(e))
@@ -2591,41 +1770,10 @@ def get_standards_for_property_class(property_class):
         return []
     
     try:
-        # Find ALL possible standard columns
-        standard_cols = []
-        possible_standard_cols = ['Standard', 'Specification', 'Norm', 'Type', 'Designation']
-        
-        for col in df_mechem.columns:
-            col_lower = str(col).lower()
-            for possible in possible_standard_cols:
-                if possible.lower() in col_lower:
-                    standard_cols.append(col)
-                    break
-        
-        # If no standard columns found, look for any column that might contain standard info
-        if not standard_cols:
-            for col in df_mechem.columns:
-                if any(word in col.lower() for word in ['iso', 'astm', 'asme', 'din', 'bs', 'jis', 'gb']):
-                    standard_cols.append(col)
-                    break
-        
-        # Find ALL possible property class columns
-        property_class_cols = []
-        possible_class_cols = ['Grade', 'Class', 'Property Class', 'Material Grade', 'Type', 'Designation', 'Material']
-        
-        for col in df_mechem.columns:
-            col_lower = str(col).lower()
-            for possible in possible_class_cols:
-                if possible.lower() in col_lower:
-                    property_class_cols.append(col)
-                    break
-        
-        # If no specific class columns found, use first few columns
-        if not property_class_cols:
-            for col in df_mechem.columns[:3]:
-                if df_mechem[col].dtype == 'object':
-                    property_class_cols.append(col)
-                    break
+        # Standard and property class columns resolved at load time
+        schema = table_schemas['mechem']
+        standard_cols = schema['standard_columns_or_fallback']
+        property_class_cols = schema['property_class_columns_or_fallback']
         
         # Try to find matching data using ALL property class columns
         matching_standards = set()
@@ -2659,7 +1807,7 @@ def get_standards_for_property_class(property_class):
                 matching_standards.add(std)
         
         return sorted(list(matching_standards))
-        
+    
     except Exception as e:
         st.error(f"Error getting standards for {property_class}: {str(e)}")
         return []
@@ -2670,16 +1818,8 @@ def show_mechanical_chemical_details(property_class):
         return
     
     try:
-        # Find ALL possible property class columns
-        property_class_cols = []
-        possible_class_cols = ['Grade', 'Class', 'Property Class', 'Material Grade', 'Type', 'Designation', 'Material']
-        
-        for col in df_mechem.columns:
-            col_lower = str(col).lower()
-            for possible in possible_class_cols:
-                if possible.lower() in col_lower:
-                    property_class_cols.append(col)
-                    break
+        # Property class columns resolved at load time
+        property_class_cols = table_schemas['mechem']['property_class_columns']
         
         if not property_class_cols:
             st.info("No property class column found in the data")
@@ -2748,736 +1888,56 @@ def show_mechanical_chemical_details(property_class):
                 with chem_cols[idx % len(chem_cols)]:
                     value = filtered_data[prop].iloc[0] if not filtered_data[prop].isna().all() else "N/A"
                     st.metric(prop, value)
-                    
+    
     except Exception as e:
         st.error(f"Error displaying mechanical/chemical details: {str(e)}")
 
-# Initialize Mechanical & Chemical data processing
-with LoadingManager.show_loading_spinner("Processing mechanical & chemical properties..."):
-    me_chem_columns, property_classes = process_mechanical_chemical_data()
-
 # ======================================================
-# COMPLETELY BULLETPROOF SIZE HANDLING - FIXED VERSION
+# SHARED REFERENCE CATALOG - ONE PER PROCESS, NOT PER SESSION
 # ======================================================
-def size_to_float(size_str):
-    """Convert size string to float for sorting - ULTRA ROBUST VERSION"""
-    try:
-        if pd.isna(size_str) or not isinstance(size_str, (str, int, float)):
-            return 0.0
-        
-        size_str = str(size_str).strip()
-        if not size_str or size_str == "":
-            return 0.0
-        
-        # Handle numeric sizes (0,1,2,3 etc)
-        if size_str.isdigit():
-            return float(size_str)
-        
-        if size_str.startswith('M'):
-            match = re.match(r'M\s*([\d.]+)', size_str)
-            if match:
-                return float(match.group(1))
-            return 0.0
-        
-        if "/" in size_str:
-            try:
-                if "-" in size_str:
-                    # Handle cases like "1-1/2"
-                    parts = size_str.split("-")
-                    whole = float(parts[0]) if parts[0] else 0
-                    fraction = float(Fraction(parts[1]))
-                    return whole + fraction
-                else:
-                    return float(Fraction(size_str))
-            except:
-                return 0.0
-        
-        try:
-            return float(size_str)
-        except:
-            return 0.0
-        
-    except Exception as e:
-        return 0.0
+class ReferenceCatalog:
+    """Products, series and property classes derived from a snapshot; read-only and shared by all sessions"""
+    
+    def __init__(self, snapshot):
+        with Spans.span("process_standard_data"):
+            self.available_products, self.available_series, self.dimensional_standards_count = process_standard_data(snapshot)
+        self.me_chem_columns, self.property_classes = process_mechanical_chemical_data(snapshot)
+        self.din7991_loaded = not snapshot.tables['din7991'].empty
+        self.asme_b18_3_loaded = not snapshot.tables['asme_b18_3'].empty
 
-def safe_sort_sizes(size_list):
-    """Safely sort size list with multiple fallbacks"""
-    if not size_list or len(size_list) == 0:
-        return []
-    
-    try:
-        return sorted(size_list, key=lambda x: (size_to_float(x), str(x)))
-    except:
-        try:
-            return sorted(size_list, key=str)
-        except:
-            return list(size_list)
+# Built once per snapshot; session state only keeps each user's choices
+with LoadingManager.show_loading_spinner("Processing standards data..."), Spans.span("reference_catalog"):
+    reference_catalog = reference_snapshot.derived("reference_catalog", ReferenceCatalog)
 
-def get_safe_size_options(temp_df):
-    """Completely safe way to get size options - FIXED VERSION"""
-    size_options = ["All"]
-    
-    if temp_df is None or temp_df.empty:
-        return size_options
-    
-    if 'Size' not in temp_df.columns:
-        return size_options
-    
-    try:
-        # Get unique sizes and handle NaN values properly
-        unique_sizes = temp_df['Size'].dropna().unique()
-        
-        # Convert all sizes to string and filter out empty strings
-        unique_sizes = [str(size) for size in unique_sizes if str(size).strip() != '']
-        
-        if len(unique_sizes) > 0:
-            sorted_sizes = safe_sort_sizes(unique_sizes)
-            size_options.extend(sorted_sizes)
-        else:
-            return ["All"]
-    except Exception as e:
-        st.warning(f"Size processing warning: {str(e)}")
-        try:
-            unique_sizes = temp_df['Size'].dropna().unique()
-            unique_sizes = [str(size) for size in unique_sizes if str(size).strip() != '']
-            size_options.extend(list(unique_sizes))
-        except:
-            pass
-    
-    return size_options
+standard_products = reference_catalog.available_products
+standard_series = reference_catalog.available_series
+me_chem_columns = reference_catalog.me_chem_columns
+property_classes = reference_catalog.property_classes
+
+if st.session_state.debug_mode:
+    st.sidebar.write(f"Found {len(property_classes)} property classes")
+    st.sidebar.write(f"Property class columns: {table_schemas['mechem']['property_class_columns_or_fallback']}")
 
 # ======================================================
 # NEW: GRADE HANDLING FUNCTIONS FOR ISO 4014
 # ======================================================
 def get_available_grades_for_standard_product(standard, product):
     """Get available grades for specific standard and product"""
-    grade_options = ["All"]
-    
     if standard == "Select Standard" or product == "Select Product":
-        return grade_options
-    
-    # Only ISO 4014 has product grades A and B
-    if standard == "ISO 4014" and product == "Hex Bolt":
-        # Get the appropriate dataframe
-        temp_df = df_iso4014.copy()
-        
-        # Filter by product if specified
-        if product != "All" and 'Product' in temp_df.columns:
-            temp_df = temp_df[temp_df['Product'] == product]
-        
-        # Get grade options from the data
-        if 'Product Grade' in temp_df.columns:
-            unique_grades = temp_df['Product Grade'].dropna().unique()
-            unique_grades = [str(grade).strip() for grade in unique_grades if str(grade).strip() != '']
-            if len(unique_grades) > 0:
-                grade_options.extend(sorted(unique_grades))
-        else:
-            # Default grades for ISO 4014 Hex Bolt
-            grade_options.extend(["A", "B"])
+        return ["All"]
     
-    return grade_options
+    return reference_snapshot.options.grade_options_for(standard, product)
 
 def get_sizes_for_standard_product_grade(standard, product, grade):
     """Get available sizes for specific standard, product and grade"""
-    size_options = ["Select Size"]
-    
     if standard == "Select Standard" or product == "Select Product":
-        return size_options
-    
-    # Get the appropriate dataframe based on standard
-    if standard == "ASME B18.2.1":
-        temp_df = df.copy()
-    elif standard == "ISO 4014":
-        temp_df = df_iso4014.copy()
-    elif standard == "DIN-7991":
-        temp_df = df_din7991.copy()
-    elif standard == "ASME B18.3":
-        temp_df = df_asme_b18_3.copy()
-    else:
-        return size_options
-    
-    # Filter by product if specified
-    if product != "All" and 'Product' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product'] == product]
-    
-    # Filter by grade if specified (only for ISO 4014)
-    if standard == "ISO 4014" and grade != "All" and 'Product Grade' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product Grade'] == grade]
+        return ["Select Size"]
     
-    # Get size options
-    size_options = get_safe_size_options(temp_df)
+    # Precomputed per snapshot; the grade only narrows ISO 4014
+    size_options = reference_snapshot.options.size_options(standard, product, grade)
     
     return ["Select Size"] + [size for size in size_options if size != "All"]
 
-# ======================================================
-# RECTIFIED UNIT CONVERSION FUNCTIONS - FIXED VERSION
-# ======================================================
-def convert_to_mm(value, from_unit):
-    """Convert any unit to millimeters - FIXED: No unnecessary conversion"""
-    try:
-        if pd.isna(value):
-            return 0.0
-        
-        value = float(value)
-        
-        # Only convert if the unit is NOT mm
-        if from_unit == 'mm':
-            return value  # Already in mm, no conversion needed
-        elif from_unit == 'inch':
-            return value * 25.4  # Convert inches to mm
-        elif from_unit == 'ft':
-            return value * 304.8  # Convert feet to mm
-        elif from_unit == 'meter':
-            return value * 1000  # Convert meters to mm
-        else:
-            return value  # Assume mm if unknown unit
-    except Exception as e:
-        st.warning(f"Unit conversion error: {str(e)}")
-        return value
-
-# ======================================================
-# FIXED: SEPARATE DATA FETCHING FOR SOCKET HEAD PRODUCTS
-# ======================================================
-
-def get_asme_b18_3_dimensions(product, size):
-    """FIXED VERSION: Get head diameter and head height for ASME B18.3 socket head cap screws"""
-    try:
-        temp_df = df_asme_b18_3.copy()
-        original_unit = "inch"  # ASME B18.3 data is in inches
-        
-        # Filter by product and size
-        if 'Product' in temp_df.columns and product != "All":
-            temp_df = temp_df[temp_df['Product'].str.contains('Socket Head', na=False, case=False)]
-        
-        if 'Size' in temp_df.columns and size != "All":
-            # Normalize size comparison - handle different formats
-            temp_df['Size_Normalized'] = temp_df['Size'].astype(str).str.strip()
-            size_normalized = str(size).strip()
-            temp_df = temp_df[temp_df['Size_Normalized'] == size_normalized]
-        
-        if temp_df.empty:
-            st.warning(f"No ASME B18.3 data found for {product} size {size}")
-            return None, None, original_unit
-        
-        # SPECIFIC ASME B18.3 COLUMN MAPPING FOR HEAD DIAMETER (MIN) AND HEAD HEIGHT (MIN)
-        head_dia_col = None
-        head_height_col = None
-        
-        # Debug: Show available columns
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"ASME B18.3 Debug - Size: {size}")
-            st.sidebar.write(f"All columns: {temp_df.columns.tolist()}")
-        
-        # SPECIFIC COLUMN NAMES FOR ASME B18.3 - EXACT MATCHES
-        # Head Diameter (Min) - Look for exact column names
-        head_dia_columns = [
-            'Head Diameter (Min)', 'Head_Diameter_Min', 'Head Dia Min', 
-            'Head Diameter Min', 'Head_Dia_Min', 'dk_min', 'Head_D_Min'
-        ]
-        
-        # Head Height (Min) - Look for exact column names
-        head_height_columns = [
-            'Head Height (Min)', 'Head_Height_Min', 'Head Height Min',
-            'Head_Ht_Min', 'k_min', 'Head_H_Min'
-        ]
-        
-        # Find Head Diameter (Min) column
-        for col in temp_df.columns:
-            col_clean = str(col).strip()
-            for target_col in head_dia_columns:
-                if target_col.lower() == col_clean.lower():
-                    head_dia_col = col
-                    break
-            if head_dia_col:
-                break
-        
-        # If not found with exact match, try partial match
-        if not head_dia_col:
-            for col in temp_df.columns:
-                col_lower = str(col).lower()
-                if 'head' in col_lower and 'diameter' in col_lower and 'min' in col_lower:
-                    head_dia_col = col
-                    break
-        
-        # Find Head Height (Min) column
-        for col in temp_df.columns:
-            col_clean = str(col).strip()
-            for target_col in head_height_columns:
-                if target_col.lower() == col_clean.lower():
-                    head_height_col = col
-                    break
-            if head_height_col:
-                break
-        
-        # If not found with exact match, try partial match
-        if not head_height_col:
-            for col in temp_df.columns:
-                col_lower = str(col).lower()
-                if 'head' in col_lower and 'height' in col_lower and 'min' in col_lower:
-                    head_height_col = col
-                    break
-        
-        # Debug: Show found columns
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"Head Diameter Column: {head_dia_col}")
-            st.sidebar.write(f"Head Height Column: {head_height_col}")
-        
-        head_diameter = None
-        head_height = None
-        
-        # Get Head Diameter (Min) value
-        if head_dia_col and head_dia_col in temp_df.columns:
-            head_diameter_val = temp_df[head_dia_col].iloc[0]
-            if pd.notna(head_diameter_val):
-                try:
-                    head_diameter = float(head_diameter_val)
-                    if st.session_state.debug_mode:
-                        st.sidebar.write(f"Head Diameter from {head_dia_col}: {head_diameter}")
-                except (ValueError, TypeError) as e:
-                    st.warning(f"Could not convert head diameter value: {head_diameter_val}")
-        
-        # Get Head Height (Min) value
-        if head_height_col and head_height_col in temp_df.columns:
-            head_height_val = temp_df[head_height_col].iloc[0]
-            if pd.notna(head_height_val):
-                try:
-                    head_height = float(head_height_val)
-                    if st.session_state.debug_mode:
-                        st.sidebar.write(f"Head Height from {head_height_col}: {head_height}")
-                except (ValueError, TypeError) as e:
-                    st.warning(f"Could not convert head height value: {head_height_val}")
-        
-        # If still no values found, try alternative approaches
-        if head_diameter is None:
-            # Try to find any head diameter column
-            for col in temp_df.columns:
-                col_lower = str(col).lower()
-                if 'head' in col_lower and 'diameter' in col_lower:
-                    if 'thread' not in col_lower and 'body' not in col_lower:
-                        try:
-                            head_diameter = float(temp_df[col].iloc[0])
-                            head_dia_col = col
-                            break
-                        except:
-                            continue
-        
-        if head_height is None:
-            # Try to find any head height column
-            for col in temp_df.columns:
-                col_lower = str(col).lower()
-                if 'head' in col_lower and 'height' in col_lower:
-                    try:
-                        head_height = float(temp_df[col].iloc[0])
-                        head_height_col = col
-                        break
-                    except:
-                        continue
-        
-        # Final debug information
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"ASME B18.3 Final Head Diameter: {head_diameter}")
-            st.sidebar.write(f"ASME B18.3 Final Head Height: {head_height}")
-            st.sidebar.write(f"Head Diameter Column Used: {head_dia_col}")
-            st.sidebar.write(f"Head Height Column Used: {head_height_col}")
-        
-        LoadingManager.log_operation(f"Get ASME B18.3 Dimensions", True, f"Head Dia: {head_diameter}, Head Height: {head_height}")
-        return head_diameter, head_height, original_unit
-            
-    except Exception as e:
-        st.error(f"Error getting ASME B18.3 dimensions: {str(e)}")
-        LoadingManager.log_operation("Get ASME B18.3 Dimensions", False, str(e))
-        return None, None, "inch"
-
-def get_din7991_dimensions(product, size):
-    """SEPARATE FUNCTION: Get head diameter and head height for DIN-7991 socket countersunk head cap screws"""
-    try:
-        temp_df = df_din7991.copy()
-        original_unit = "mm"  # DIN-7991 data is in mm
-        
-        # Filter by product and size
-        if 'Product' in temp_df.columns and product != "All":
-            temp_df = temp_df[temp_df['Product'] == product]
-        
-        if 'Size' in temp_df.columns and size != "All":
-            # Normalize size comparison
-            temp_df = temp_df[temp_df['Size'].astype(str).str.strip() == str(size).strip()]
-        
-        if temp_df.empty:
-            return None, None, original_unit
-        
-        # SPECIFIC COLUMN MAPPING FOR DIN-7991
-        # Look for Head Diameter (dk) - specifically dk column for DIN-7991
-        head_dia_cols = [col for col in temp_df.columns if any(keyword in col.lower() for keyword in ['dk', 'head diameter', 'head_dia'])]
-        head_dia_col = None
-        
-        # Prioritize 'dk' column for DIN-7991
-        for col in head_dia_cols:
-            if 'dk' in col.lower():
-                head_dia_col = col
-                break
-        
-        # If no 'dk' found, look for other head diameter columns
-        if not head_dia_col and head_dia_cols:
-            for col in head_dia_cols:
-                if 'min' in col.lower():
-                    head_dia_col = col
-                    break
-            if not head_dia_col:
-                head_dia_col = head_dia_cols[0]
-        
-        # Look for Head Height (k) - specifically k column for DIN-7991
-        head_height_cols = [col for col in temp_df.columns if any(keyword in col.lower() for keyword in ['k', 'head height', 'head_height'])]
-        head_height_col = None
-        
-        # Prioritize 'k' column for DIN-7991
-        for col in head_height_cols:
-            if col.lower() == 'k' or 'head height' in col.lower():
-                head_height_col = col
-                break
-        
-        # If no 'k' found, look for other head height columns
-        if not head_height_col and head_height_cols:
-            for col in head_height_cols:
-                if 'max' in col.lower():
-                    head_height_col = col
-                    break
-            if not head_height_col:
-                head_height_col = head_height_cols[0]
-        
-        head_diameter = None
-        head_height = None
-        
-        if head_dia_col and head_dia_col in temp_df.columns:
-            head_diameter = temp_df[head_dia_col].iloc[0]
-            if pd.notna(head_diameter):
-                head_diameter = float(head_diameter)
-        
-        if head_height_col and head_height_col in temp_df.columns:
-            head_height = temp_df[head_height_col].iloc[0]
-            if pd.notna(head_height):
-                head_height = float(head_height)
-        
-        # Debug information
-        if st.session_state.debug_mode:
-            st.sidebar.write(f"DIN-7991 Debug - Size: {size}")
-            st.sidebar.write(f"Head Diameter Column: {head_dia_col}, Value: {head_diameter}")
-            st.sidebar.write(f"Head Height Column: {head_height_col}, Value: {head_height}")
-            st.sidebar.write(f"Available columns: {temp_df.columns.tolist()}")
-        
-        LoadingManager.log_operation(f"Get DIN-7991 Dimensions", True, f"Head Dia: {head_diameter}, Head Height: {head_height}")
-        return head_diameter, head_height, original_unit
-        
-    except Exception as e:
-        st.warning(f"Error getting DIN-7991 dimensions: {str(e)}")
-        LoadingManager.log_operation("Get DIN-7991 Dimensions", False, str(e))
-        return None, None, "mm"
-
-def get_socket_head_dimensions(standard, product, size, grade="All"):
-    """MAIN FUNCTION: Route to appropriate socket head dimension function based on standard"""
-    try:
-        if standard == "ASME B18.3":
-            return get_asme_b18_3_dimensions(product, size)
-        elif standard == "DIN-7991":
-            return get_din7991_dimensions(product, size)
-        else:
-            return None, None, "unknown"
-    except Exception as e:
-        st.warning(f"Error in get_socket_head_dimensions for {standard}: {str(e)}")
-        return None, None, "unknown"
-
-def get_hex_head_dimensions(standard, product, size, grade="All"):
-    """RECTIFIED: Get width across flats and head height for hex products from database with proper unit tracking"""
-    try:
-        # Get the appropriate dataframe based on standard
-        if standard == "ASME B18.2.1":
-            temp_df = df.copy()
-            original_unit = "inch"  # ASME B18.2.1 data is in inches
-        elif standard == "ISO 4014":
-            temp_df = df_iso4014.copy()
-            original_unit = "mm"  # ISO 4014 data is in mm
-        elif standard == "DIN-7991":
-            temp_df = df_din7991.copy()
-            original_unit = "mm"  # DIN-7991 data is in mm
-        elif standard == "ASME B18.3":
-            temp_df = df_asme_b18_3.copy()
-            original_unit = "inch"  # ASME B18.3 data is in inches
-        else:
-            return None, None, "unknown"
-        
-        # Filter by product and size
-        if 'Product' in temp_df.columns and product != "All":
-            temp_df = temp_df[temp_df['Product'] == product]
-        
-        if 'Size' in temp_df.columns and size != "All":
-            # Normalize size comparison
-            temp_df = temp_df[temp_df['Size'].astype(str).str.strip() == str(size).strip()]
-        
-        # Filter by grade if specified (only for ISO 4014)
-        if standard == "ISO 4014" and grade != "All" and 'Product Grade' in temp_df.columns:
-            temp_df = temp_df[temp_df['Product Grade'] == grade]
-        
-        if temp_df.empty:
-            return None, None, original_unit
-        
-        # Look for width across flats column
-        width_cols = [col for col in temp_df.columns if any(keyword in col.lower() for keyword in ['width', 'across', 'flats', 'w_'])]
-        width_col = None
-        for col in width_cols:
-            if 'min' in col.lower():
-                width_col = col
-                break
-        if not width_col and width_cols:
-            width_col = width_cols[0]
-        
-        # Look for head height column
-        height_cols = [col for col in temp_df.columns if any(keyword in col.lower() for keyword in ['head', 'height', 'head_height'])]
-        height_col = None
-        for col in height_cols:
-            if 'min' in col.lower():
-                height_col = col
-                break
-        if not height_col and height_cols:
-            height_col = height_cols[0]
-        
-        width_across_flats = None
-        head_height = None
-        
-        if width_col and width_col in temp_df.columns:
-            width_across_flats = temp_df[width_col].iloc[0]
-            if pd.notna(width_across_flats):
-                width_across_flats = float(width_across_flats)
-        
-        if height_col and height_col in temp_df.columns:
-            head_height = temp_df[height_col].iloc[0]
-            if pd.notna(head_height):
-                head_height = float(head_height)
-        
-        LoadingManager.log_operation(f"Get Hex Head Dimensions", True, f"Width: {width_across_flats}, Height: {head_height}")
-        return width_across_flats, head_height, original_unit
-        
-    except Exception as e:
-        st.warning(f"Error getting hex head dimensions: {str(e)}")
-        LoadingManager.log_operation("Get Hex Head Dimensions", False, str(e))
-        return None, None, "unknown"
-
-# ======================================================
-# FIXED: VOLUME CALCULATION FUNCTIONS FOR SOCKET HEAD PRODUCTS
-# ======================================================
-
-def calculate_socket_head_volume_rectified(head_diameter_mm, head_height_mm):
-    """Calculate volume for socket head using cylinder formula - FIXED: No head angle"""
-    try:
-        # For socket head, we use cylinder volume formula: V = 0.7853 × d² × h
-        head_volume_mm3 = 0.7853 * (head_diameter_mm ** 2) * head_height_mm
-        return head_volume_mm3
-    except Exception as e:
-        st.warning(f"Error calculating socket head volume: {str(e)}")
-        return 0.0
-
-def calculate_shank_volume_rectified(diameter_mm, length_mm):
-    """Calculate shank volume using cylinder formula"""
-    try:
-        # Shank volume formula: V = 0.7853 × d² × L
-        shank_volume_mm3 = 0.7853 * (diameter_mm ** 2) * length_mm
-        return shank_volume_mm3
-    except Exception as e:
-        st.warning(f"Error calculating shank volume: {str(e)}")
-        return 0.0
-
-def calculate_socket_product_weight_rectified(parameters, head_diameter, head_height, original_unit):
-    """FIXED: Calculate weight for Socket Head Products (ASME B18.3 and DIN-7991)"""
-    try:
-        # Extract parameters
-        product_type = parameters.get('product_type', 'Hexagon Socket Head Cap Screws')
-        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
-        diameter_value = parameters.get('diameter_value', 0.0)
-        diameter_unit = parameters.get('diameter_unit', 'mm')
-        length = parameters.get('length', 0.0)
-        length_unit = parameters.get('length_unit', 'mm')
-        material = parameters.get('material', 'Carbon Steel')
-        
-        # Convert dimensions to mm only if needed
-        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
-        length_mm = convert_to_mm(length, length_unit)
-        
-        # Convert head dimensions to mm (they should already be in mm from database)
-        if head_diameter is not None:
-            head_diameter_mm = convert_to_mm(head_diameter, original_unit)
-        else:
-            head_diameter_mm = diameter_mm * 1.5  # Default ratio if not available
-        
-        if head_height is not None:
-            head_height_mm = convert_to_mm(head_height, original_unit)
-        else:
-            head_height_mm = diameter_mm * 0.65  # Default ratio if not available
-        
-        # Get material density in g/cm³
-        density_g_cm3 = get_material_density_rectified(material)
-        
-        # Calculate volumes in mm³
-        shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
-        head_volume_mm3 = calculate_socket_head_volume_rectified(head_diameter_mm, head_height_mm)
-        total_volume_mm3 = shank_volume_mm3 + head_volume_mm3
-        
-        # Convert mm³ to cm³ for weight calculation
-        total_volume_cm3 = total_volume_mm3 / 1000
-        
-        # Calculate Weight in grams and kg
-        weight_g = total_volume_cm3 * density_g_cm3
-        weight_kg = weight_g / 1000
-        weight_lb = weight_kg * 2.20462
-        
-        result = {
-            'weight_kg': weight_kg,
-            'weight_g': weight_g,
-            'weight_lb': weight_lb,
-            'shank_volume_mm3': shank_volume_mm3,
-            'head_volume_mm3': head_volume_mm3,
-            'total_volume_mm3': total_volume_mm3,
-            'total_volume_cm3': total_volume_cm3,
-            'diameter_mm': diameter_mm,
-            'length_mm': length_mm,
-            'head_diameter_mm': head_diameter_mm,
-            'head_height_mm': head_height_mm,
-            'density_g_cm3': density_g_cm3,
-            'original_diameter': f"{diameter_value} {diameter_unit}",
-            'original_length': f"{length} {length_unit}",
-            'original_head_diameter': f"{head_diameter} {original_unit}" if head_diameter else "N/A",
-            'original_head_height': f"{head_height} {original_unit}" if head_height else "N/A",
-            'calculation_method': 'Socket Head Formula',
-            'formula_details': {
-                'shank_volume_formula': '0.7853 × (diameter)² × length (mm³)',
-                'head_volume_formula': '0.7853 × (head_diameter_min)² × head_height_min (mm³)',
-                'total_volume_formula': 'shank_volume + head_volume (mm³)',
-                'volume_conversion': 'mm³ to cm³: divide by 1000',
-                'weight_formula': 'total_volume_cm³ × density_g/cm³'
-            },
-            'dimensions_used': {
-                'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
-                'diameter_calculation_mm': f"{diameter_mm:.4f}",
-                'length_input': f"{length:.4f} {length_unit}",
-                'length_calculation_mm': f"{length_mm:.4f}",
-                'head_diameter_input': f"{head_diameter:.4f} {original_unit}" if head_diameter else "Estimated",
-                'head_diameter_calculation_mm': f"{head_diameter_mm:.4f}",
-                'head_height_input': f"{head_height:.4f} {original_unit}" if head_height else "Estimated",
-                'head_height_calculation_mm': f"{head_height_mm:.4f}",
-                'shank_volume_mm3': f"{shank_volume_mm3:.4f}",
-                'head_volume_mm3': f"{head_volume_mm3:.4f}",
-                'total_volume_mm3': f"{total_volume_mm3:.4f}",
-                'total_volume_cm3': f"{total_volume_cm3:.4f}",
-                'density_g_cm3': f"{density_g_cm3:.4f}"
-            }
-        }
-        
-        LoadingManager.log_operation("Socket Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
-        return result
-        
-    except Exception as e:
-        st.error(f"Socket product calculation error: {str(e)}")
-        LoadingManager.log_operation("Socket Product Weight Calculation", False, str(e))
-        return None
-
-def calculate_hex_product_weight_rectified(parameters, width_across_flats, head_height, original_unit):
-    """FIXED: Calculate weight for hex products with detailed parameters"""
-    try:
-        # Extract parameters
-        product_type = parameters.get('product_type', 'Hex Bolt')
-        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
-        diameter_value = parameters.get('diameter_value', 0.0)
-        diameter_unit = parameters.get('diameter_unit', 'mm')
-        length = parameters.get('length', 0.0)
-        length_unit = parameters.get('length_unit', 'mm')
-        material = parameters.get('material', 'Carbon Steel')
-        
-        # Convert dimensions to mm only if needed
-        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
-        length_mm = convert_to_mm(length, length_unit)
-        
-        # Convert head dimensions to mm (they should already be in mm from database)
-        if width_across_flats is not None:
-            width_across_flats_mm = convert_to_mm(width_across_flats, original_unit)
-        else:
-            width_across_flats_mm = diameter_mm * 1.5  # Default ratio if not available
-        
-        if head_height is not None:
-            head_height_mm = convert_to_mm(head_height, original_unit)
-        else:
-            head_height_mm = diameter_mm * 0.65  # Default ratio if not available
-        
-        # Get material density in g/cm³
-        density_g_cm3 = get_material_density_rectified(material)
-        
-        # Calculate volumes in mm³
-        shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
-        
-        # Calculate Head Volume using the specific formula in mm³
-        side_length_mm = width_across_flats_mm * 1.1547
-        head_volume_mm3 = 0.65 * (side_length_mm**2) * head_height_mm
-        
-        # Total Volume in mm³
-        total_volume_mm3 = shank_volume_mm3 + head_volume_mm3
-        
-        # Convert mm³ to cm³ for weight calculation
-        total_volume_cm3 = total_volume_mm3 / 1000
-        
-        # Calculate Weight in grams and kg
-        weight_g = total_volume_cm3 * density_g_cm3
-        weight_kg = weight_g / 1000
-        weight_lb = weight_kg * 2.20462
-        
-        result = {
-            'weight_kg': weight_kg,
-            'weight_g': weight_g,
-            'weight_lb': weight_lb,
-            'shank_volume_mm3': shank_volume_mm3,
-            'head_volume_mm3': head_volume_mm3,
-            'total_volume_mm3': total_volume_mm3,
-            'total_volume_cm3': total_volume_cm3,
-            'diameter_mm': diameter_mm,
-            'length_mm': length_mm,
-            'width_across_flats_mm': width_across_flats_mm,
-            'head_height_mm': head_height_mm,
-            'side_length_mm': side_length_mm,
-            'density_g_cm3': density_g_cm3,
-            'original_diameter': f"{diameter_value} {diameter_unit}",
-            'original_length': f"{length} {length_unit}",
-            'original_width_across_flats': f"{width_across_flats} {original_unit}" if width_across_flats else "N/A",
-            'original_head_height': f"{head_height} {original_unit}" if head_height else "N/A",
-            'calculation_method': 'Hex Product Formula',
-            'formula_details': {
-                'shank_volume_formula': '0.7853 × (diameter)² × length (mm³)',
-                'head_volume_formula': '0.65 × side_length² × head_height (mm³)',
-                'side_length_formula': 'width_across_flats × 1.1547 (mm)',
-                'total_volume_formula': 'shank_volume + head_volume (mm³)',
-                'volume_conversion': 'mm³ to cm³: divide by 1000',
-                'weight_formula': 'total_volume_cm³ × density_g/cm³'
-            },
-            'dimensions_used': {
-                'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
-                'diameter_calculation_mm': f"{diameter_mm:.4f}",
-                'length_input': f"{length:.4f} {length_unit}",
-                'length_calculation_mm': f"{length_mm:.4f}",
-                'width_across_flats_input': f"{width_across_flats:.4f} {original_unit}" if width_across_flats else "Estimated",
-                'width_across_flats_calculation_mm': f"{width_across_flats_mm:.4f}",
-                'head_height_input': f"{head_height:.4f} {original_unit}" if head_height else "Estimated",
-                'head_height_calculation_mm': f"{head_height_mm:.4f}",
-                'side_length_calculation_mm': f"{side_length_mm:.4f}",
-                'shank_volume_mm3': f"{shank_volume_mm3:.4f}",
-                'head_volume_mm3': f"{head_volume_mm3:.4f}",
-                'total_volume_mm3': f"{total_volume_mm3:.4f}",
-                'total_volume_cm3': f"{total_volume_cm3:.4f}",
-                'density_g_cm3': f"{density_g_cm3:.4f}"
-            }
-        }
-        
-        LoadingManager.log_operation("Hex Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
-        return result
-        
-    except Exception as e:
-        st.error(f"Hex product calculation error: {str(e)}")
-        LoadingManager.log_operation("Hex Product Weight Calculation", False, str(e))
-        return None
-
 # ======================================================
 # WEIGHT CALCULATION SECTION - COMPLETE WORKFLOW IMPLEMENTATION
 # ======================================================
@@ -3485,7 +1945,7 @@ def calculate_hex_product_weight_rectified(parameters, width_across_flats, head_
 def get_available_products():
     """Get all available products from standards database"""
     all_products = set()
-    for standard_products_list in st.session_state.available_products.values():
+    for standard_products_list in reference_catalog.available_products.values():
         all_products.update(standard_products_list)
     return ["Select Product"] + sorted([p for p in all_products if p != "All"])
 
@@ -3495,9 +1955,9 @@ def get_series_for_product(product):
         return ["Select Series"]
     
     available_series = set()
-    for standard, products in st.session_state.available_products.items():
+    for standard, products in reference_catalog.available_products.items():
         if product in products:
-            series = st.session_state.available_series.get(standard, "")
+            series = reference_catalog.available_series.get(standard, "")
             if series:
                 available_series.add(series)
     
@@ -3509,9 +1969,9 @@ def get_standards_for_product_series(product, series):
         return ["Select Standard"]
     
     available_standards = []
-    for standard, products in st.session_state.available_products.items():
+    for standard, products in reference_catalog.available_products.items():
         if product in products:
-            std_series = st.session_state.available_series.get(standard, "")
+            std_series = reference_catalog.available_series.get(standard, "")
             if std_series == series:
                 available_standards.append(standard)
     
@@ -3522,24 +1982,8 @@ def get_sizes_for_standard_product(standard, product):
     if standard == "Select Standard" or product == "Select Product":
         return ["Select Size"]
     
-    # Get the appropriate dataframe based on standard
-    if standard == "ASME B18.2.1":
-        temp_df = df.copy()
-    elif standard == "ISO 4014":
-        temp_df = df_iso4014.copy()
-    elif standard == "DIN-7991":
-        temp_df = df_din7991.copy()
-    elif standard == "ASME B18.3":
-        temp_df = df_asme_b18_3.copy()
-    else:
-        return ["Select Size"]
-    
-    # Filter by product if specified
-    if product != "All" and 'Product' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product'] == product]
-    
-    # Get size options
-    size_options = get_safe_size_options(temp_df)
+    # Precomputed per snapshot
+    size_options = reference_snapshot.options.size_options(standard, product)
     
     return ["Select Size"] + [size for size in size_options if size != "All"]
 
@@ -3551,224 +1995,21 @@ def get_thread_standards_for_series(series):
         return ["ISO 965-2-98 Coarse", "ISO 965-2-98 Fine"]
     return ["Select Thread Standard"]
 
-def get_material_density_rectified(material):
-    """RECTIFIED: Get density for different materials in g/cm³"""
-    density_map = {
-        "Carbon Steel": 7.85,
-        "Stainless Steel": 8.00,
-        "Alloy Steel": 7.85,
-        "Brass": 8.50,
-        "Aluminum": 2.70,
-        "Copper": 8.96,
-        "Titanium": 4.50,
-        "Bronze": 8.80,
-        "Inconel": 8.20,
-        "Monel": 8.80,
-        "Nickel": 8.90
-    }
-    return density_map.get(material, 7.85)  # Default to carbon steel
-
-def calculate_weight_rectified(parameters):
-    """FIXED: Enhanced weight calculation with proper data fetching for ALL products"""
-    try:
-        # Extract parameters
-        product_type = parameters.get('product_type', 'Hex Bolt')
-        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
-        diameter_value = parameters.get('diameter_value', 0.0)
-        diameter_unit = parameters.get('diameter_unit', 'mm')
-        length = parameters.get('length', 0.0)
-        length_unit = parameters.get('length_unit', 'mm')
-        material = parameters.get('material', 'Carbon Steel')
-        standard = parameters.get('standard', 'ASME B18.2.1')
-        size = parameters.get('size', 'All')
-        grade = parameters.get('grade', 'All')
-        
-        # SPECIAL CASE: For Socket Head Products (ASME B18.3 and DIN-7991)
-        socket_head_products = ["Hexagon Socket Head Cap Screws", "Hexagon Socket Countersunk Head Cap Screw"]
-        
-        if product_type in socket_head_products:
-            # Get socket head dimensions from SEPARATE functions based on standard
-            head_diameter, head_height, original_unit = get_socket_head_dimensions(standard, product_type, size, grade)
-            
-            # Store original dimensions for display
-            original_head_diameter = head_diameter
-            original_head_height = head_height
-            
-            # If dimensions not found in database, use default ratios
-            if head_diameter is None:
-                # Estimate head diameter based on shank diameter
-                diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
-                head_diameter = diameter_mm_temp * 1.5  # Default ratio
-                original_head_diameter = head_diameter
-                original_unit = "mm"  # Default to mm for estimated values
-            
-            if head_height is None:
-                # Estimate head height based on shank diameter
-                diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
-                head_height = diameter_mm_temp * 0.65  # Default ratio
-                original_head_height = head_height
-            
-            # Calculate using socket head formula - SAME FORMULA FOR BOTH
-            return calculate_socket_product_weight_rectified(parameters, head_diameter, head_height, original_unit)
-        
-        # For hex products, get hex head dimensions
-        width_across_flats, head_height, original_unit = get_hex_head_dimensions(standard, product_type, size, grade)
-        
-        # Store original dimensions for display
-        original_width_across_flats = width_across_flats
-        original_head_height = head_height
-        
-        # If dimensions not found in database, use default ratios
-        if width_across_flats is None:
-            # Estimate width across flats based on diameter
-            diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
-            width_across_flats = diameter_mm_temp * 1.5  # Default ratio
-            original_width_across_flats = width_across_flats
-            original_unit = "mm"  # Default to mm for estimated values
-        
-        if head_height is None:
-            # Estimate head height based on diameter
-            diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
-            head_height = diameter_mm_temp * 0.65  # Default ratio
-            original_head_height = head_height
-        
-        hex_products = ["Hex Bolt", "Heavy Hex Bolt", "Hex Cap Screws", "Heavy Hex Screws"]
-        
-        # Convert dimensions to mm only if needed
-        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
-        length_mm = convert_to_mm(length, length_unit)
-        
-        # SPECIAL CASE: For Pitch Diameter from thread data in Inch series
-        if (diameter_type == "Pitch Diameter" and 
-            'pitch_diameter_value' in st.session_state and
-            st.session_state.pitch_diameter_value is not None):
-            
-            # Use the pitch diameter from thread data and convert from inches to mm if needed
-            pitch_diameter = st.session_state.pitch_diameter_value
-            # Thread data for ASME B1.1 is in inches, so convert to mm
-            if diameter_unit == 'inch':
-                diameter_mm = pitch_diameter * 25.4
-            else:
-                diameter_mm = pitch_diameter
-
-        # Get material density in g/cm³
-        density_g_cm3 = get_material_density_rectified(material)
-        
-        # For Threaded Rod, use simple cylinder volume calculation in mm³
-        if product_type == "Threaded Rod":
-            # Simple cylinder volume for threaded rod in mm³
-            shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
-            
-            # Convert mm³ to cm³ for weight calculation
-            volume_cm3 = shank_volume_mm3 / 1000
-            weight_g = volume_cm3 * density_g_cm3
-            weight_kg = weight_g / 1000
-            weight_lb = weight_kg * 2.20462
-            
-            result = {
-                'weight_kg': weight_kg,
-                'weight_g': weight_g,
-                'weight_lb': weight_lb,
-                'volume_mm3': shank_volume_mm3,
-                'volume_cm3': volume_cm3,
-                'density_g_cm3': density_g_cm3,
-                'diameter_mm': diameter_mm,
-                'length_mm': length_mm,
-                'original_diameter': f"{diameter_value} {diameter_unit}",
-                'original_length': f"{length} {length_unit}",
-                'calculation_method': 'Threaded Rod Cylinder Formula',
-                'dimensions_used': {
-                    'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
-                    'diameter_calculation_mm': f"{diameter_mm:.4f}",
-                    'length_input': f"{length:.4f} {length_unit}",
-                    'length_calculation_mm': f"{length_mm:.4f}",
-                    'volume_mm3': f"{shank_volume_mm3:.4f}",
-                    'volume_cm3': f"{volume_cm3:.4f}",
-                    'density_g_cm3': f"{density_g_cm3:.4f}"
-                }
-            }
-            
-            LoadingManager.log_operation("Threaded Rod Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
-            return result
-        
-        # For hex products, use rectified hex product formula in mm³
-        elif product_type in hex_products:
-            return calculate_hex_product_weight_rectified(parameters, width_across_flats, head_height, original_unit)
-        
-        # For other products, use simple cylinder calculation in mm³
-        else:
-            shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
-            volume_cm3 = shank_volume_mm3 / 1000
-            weight_g = volume_cm3 * density_g_cm3
-            weight_kg = weight_g / 1000
-            weight_lb = weight_kg * 2.20462
-            
-            result = {
-                'weight_kg': weight_kg,
-                'weight_g': weight_g,
-                'weight_lb': weight_lb,
-                'volume_mm3': shank_volume_mm3,
-                'volume_cm3': volume_cm3,
-                'density_g_cm3': density_g_cm3,
-                'diameter_mm': diameter_mm,
-                'length_mm': length_mm,
-                'original_diameter': f"{diameter_value:.4f} {diameter_unit}",
-                'original_length': f"{length:.4f} {length_unit}",
-                'calculation_method': 'Standard Cylinder Formula',
-                'dimensions_used': {
-                    'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
-                    'diameter_calculation_mm': f"{diameter_mm:.4f}",
-                    'length_input': f"{length:.4f} {length_unit}",
-                    'length_calculation_mm': f"{length_mm:.4f}",
-                    'volume_mm3': f"{shank_volume_mm3:.4f}",
-                    'volume_cm3': f"{volume_cm3:.4f}",
-                    'density_g_cm3': f"{density_g_cm3:.4f}"
-                }
-            }
-            
-            LoadingManager.log_operation("Standard Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
-            return result
-            
-    except Exception as e:
-        st.error(f"Calculation error: {str(e)}")
-        LoadingManager.log_operation("Weight Calculation", False, str(e))
-        import traceback
-        st.error(f"Detailed error: {traceback.format_exc()}")
-        return None
-
 # ======================================================
 # MISSING FUNCTIONS IMPLEMENTATION - COMPLETED
 # ======================================================
 
 def get_filtered_dataframe(product, standard, grade="All"):
     """Get filtered dataframe based on product and standard selection"""
-    if standard == "ASME B18.2.1":
-        temp_df = df.copy()
-    elif standard == "ISO 4014":
-        temp_df = df_iso4014.copy()
-    elif standard == "DIN-7991":
-        temp_df = df_din7991.copy()
-    elif standard == "ASME B18.3":
-        temp_df = df_asme_b18_3.copy()
-    else:
-        return pd.DataFrame()
-    
-    # Apply product filter if specified
-    if product != "All" and 'Product' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product'] == product]
-    
-    # Apply grade filter if specified (only for ISO 4014)
-    if standard == "ISO 4014" and grade != "All" and 'Product Grade' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product Grade'] == grade]
-    
-    return temp_df
+    return query_standard_table(standard, product, grade=grade).frame()
 
+@Spans.span("filter.section_a")
 def apply_section_a_filters():
     """Apply filters for Section A - Dimensional Specifications"""
     filters = st.session_state.section_a_filters
     
     if not filters:
-        return pd.DataFrame()
+        return ResultView()
     
     product = filters.get('product', 'All')
     series = filters.get('series', 'All')
@@ -3776,107 +2017,75 @@ def apply_section_a_filters():
     size = filters.get('size', 'All')
     grade = filters.get('grade', 'All')
     
-    # Get appropriate dataframe
-    if standard == "ASME B18.2.1":
-        temp_df = df.copy()
-    elif standard == "ISO 4014":
-        temp_df = df_iso4014.copy()
-    elif standard == "DIN-7991":
-        temp_df = df_din7991.copy()
-    elif standard == "ASME B18.3":
-        temp_df = df_asme_b18_3.copy()
-    else:
-        return pd.DataFrame()
-    
-    # Apply filters
-    if product != "All" and 'Product' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product'] == product]
-    
-    if size != "All" and 'Size' in temp_df.columns:
-        temp_df = temp_df[temp_df['Size'].astype(str).str.strip() == str(size).strip()]
-    
-    # Apply grade filter if specified (only for ISO 4014)
-    if standard == "ISO 4014" and grade != "All" and 'Product Grade' in temp_df.columns:
-        temp_df = temp_df[temp_df['Product Grade'] == grade]
-    
-    return temp_df
+    # Indexed product / size / grade / series lookup, kept as row positions
+    return query_standard_table(standard, product, size, grade, series)
 
+@Spans.span("filter.section_b")
 def apply_section_b_filters():
     """Apply filters for Section B - Thread Specifications"""
     filters = st.session_state.section_b_filters
     
     if not filters:
-        return pd.DataFrame()
+        return ResultView()
     
     standard = filters.get('standard', 'All')
     size = filters.get('size', 'All')
     thread_class = filters.get('class', 'All')
     
     if standard == "All":
-        return pd.DataFrame()
+        return ResultView()
     
-    return get_thread_data_enhanced(standard, size, thread_class)
+    df_thread = load_thread_data_enhanced(standard)
+    if df_thread.empty:
+        return ResultView()
+    
+    return ResultView(df_thread, get_thread_row_positions(df_thread, size, thread_class))
 
+@Spans.span("filter.section_c")
 def apply_section_c_filters():
     """Apply filters for Section C - Material Properties"""
     filters = st.session_state.section_c_filters
     
     if not filters or df_mechem.empty:
-        return pd.DataFrame()
+        return ResultView()
     
     property_class = filters.get('property_class', 'All')
     standard = filters.get('standard', 'All')
     
     if property_class == "All":
-        return df_mechem.copy()
+        return ResultView(df_mechem)
     
-    # Find property class columns
-    property_class_cols = []
-    possible_class_cols = ['Grade', 'Class', 'Property Class', 'Material Grade', 'Type', 'Designation', 'Material']
+    # Property class columns resolved at load time
+    property_class_cols = table_schemas['mechem']['property_class_columns']
     
-    for col in df_mechem.columns:
-        col_lower = str(col).lower()
-        for possible in possible_class_cols:
-            if possible.lower() in col_lower:
-                property_class_cols.append(col)
-                break
-    
-    # Try to find matching data
-    filtered_data = pd.DataFrame()
+    # Try to find matching rows
+    matched = DimensionIndex.EMPTY
     
     for prop_col in property_class_cols:
         if prop_col in df_mechem.columns:
             # Try exact match
-            exact_match = df_mechem[df_mechem[prop_col] == property_class]
-            if not exact_match.empty:
-                filtered_data = exact_match
+            exact_match = (df_mechem[prop_col] == property_class).to_numpy()
+            if exact_match.any():
+                matched = np.flatnonzero(exact_match)
                 break
             # Try string contains
-            str_match = df_mechem[df_mechem[prop_col].astype(str).str.contains(str(property_class), na=False, case=False)]
-            if not str_match.empty:
-                filtered_data = str_match
+            str_match = df_mechem[prop_col].astype(str).str.contains(str(property_class), na=False, case=False).to_numpy()
+            if str_match.any():
+                matched = np.flatnonzero(str_match)
                 break
     
     # Apply standard filter if specified
-    if standard != "All" and not filtered_data.empty:
-        standard_cols = []
-        possible_standard_cols = ['Standard', 'Specification', 'Norm', 'Type', 'Designation']
-        
-        for col in filtered_data.columns:
-            col_lower = str(col).lower()
-            for possible in possible_standard_cols:
-                if possible.lower() in col_lower:
-                    standard_cols.append(col)
-                    break
+    if standard != "All" and len(matched) > 0:
+        standard_cols = table_schemas['mechem']['standard_columns']
         
         if standard_cols:
             for std_col in standard_cols:
-                std_filtered = filtered_data[filtered_data[std_col].astype(str).str.contains(str(standard), na=False, case=False)]
-                if not std_filtered.empty:
-                    filtered_data = std_filtered
+                std_match = df_mechem[std_col].iloc[matched].astype(str).str.contains(str(standard), na=False, case=False).to_numpy()
+                if std_match.any():
+                    matched = matched[std_match]
                     break
     
-    return filtered_data
+    return ResultView(df_mechem, matched)
 
 def show_section_a_results():
     """Show results for Section A"""
@@ -3890,7 +2099,7 @@ def show_section_a_results():
         
         # Show data
         st.dataframe(
-            st.session_state.section_a_results,
+            st.session_state.section_a_results.frame(),
             use_container_width=True,
             height=400
         )
@@ -3899,12 +2108,12 @@ def show_section_a_results():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Export Section A Results", key="export_section_a"):
-                enhanced_export_data(st.session_state.section_a_results, "Excel")
+                enhanced_export_data(st.session_state.section_a_results.frame(), "Excel")
         with col2:
             if st.button("Show Professional Card", key="show_pro_card_a"):
                 if not st.session_state.section_a_results.empty:
                     # Extract first row for professional card
-                    first_row = st.session_state.section_a_results.iloc[0].to_dict()
+                    first_row = st.session_state.section_a_results.frame().iloc[0].to_dict()
                     st.session_state.selected_product_details = extract_product_details(first_row)
                     st.session_state.show_professional_card = True
                     st.rerun()
@@ -3918,13 +2127,13 @@ def show_section_b_results():
         st.markdown("### Section B Results - Thread Specifications")
         
         st.dataframe(
-            st.session_state.section_b_results,
+            st.session_state.section_b_results.frame(),
             use_container_width=True,
             height=400
         )
         
         if st.button("Export Section B Results", key="export_section_b"):
-            enhanced_export_data(st.session_state.section_b_results, "Excel")
+            enhanced_export_data(st.session_state.section_b_results.frame(), "Excel")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -3935,7 +2144,7 @@ def show_section_c_results():
         st.markdown("### Section C Results - Material Properties")
         
         st.dataframe(
-            st.session_state.section_c_results,
+            st.session_state.section_c_results.frame(),
             use_container_width=True,
             height=400
         )
@@ -3945,33 +2154,18 @@ def show_section_c_results():
             show_mechanical_chemical_details(st.session_state.section_c_filters.get('property_class'))
         
         if st.button("Export Section C Results", key="export_section_c"):
-            enhanced_export_data(st.session_state.section_c_results, "Excel")
+            enhanced_export_data(st.session_state.section_c_results.frame(), "Excel")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
 def combine_all_results():
     """Combine results from all sections"""
-    combined = pd.DataFrame()
-    
-    # Add section A results
-    if not st.session_state.section_a_results.empty:
-        section_a = st.session_state.section_a_results.copy()
-        section_a['Section'] = 'A - Dimensional'
-        combined = pd.concat([combined, section_a], ignore_index=True)
-    
-    # Add section B results  
-    if not st.session_state.section_b_results.empty:
-        section_b = st.session_state.section_b_results.copy()
-        section_b['Section'] = 'B - Thread'
-        combined = pd.concat([combined, section_b], ignore_index=True)
-    
-    # Add section C results
-    if not st.session_state.section_c_results.empty:
-        section_c = st.session_state.section_c_results.copy()
-        section_c['Section'] = 'C - Material'
-        combined = pd.concat([combined, section_c], ignore_index=True)
-    
-    return combined
+    # Only the section views are kept; rows are concatenated when rendered or exported
+    return ResultView.combine([
+        ('A - Dimensional', st.session_state.section_a_results),
+        ('B - Thread', st.session_state.section_b_results),
+        ('C - Material', st.session_state.section_c_results),
+    ])
 
 def show_combined_results():
     """Show combined results from all sections"""
@@ -3980,7 +2174,7 @@ def show_combined_results():
         st.markdown("### Combined Results - All Sections")
         
         st.dataframe(
-            st.session_state.combined_results,
+            st.session_state.combined_results.frame(),
             use_container_width=True,
             height=500
         )
@@ -3988,10 +2182,10 @@ def show_combined_results():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Export Combined Results", key="export_combined"):
-                enhanced_export_data(st.session_state.combined_results, "Excel")
+                enhanced_export_data(st.session_state.combined_results.frame(), "Excel")
         with col2:
             if st.button("Clear Combined Results", key="clear_combined"):
-                st.session_state.combined_results = pd.DataFrame()
+                st.session_state.combined_results = ResultView()
                 st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -4198,7 +2392,9 @@ def show_weight_calculator_rectified():
                     # Show pitch diameter information for ALL products using Pitch Diameter
                     if selected_diameter_type == "Pitch Diameter" and thread_size != "All":
                         with LoadingManager.show_loading_spinner("Fetching thread data..."):
-                            pitch_diameter = get_pitch_diameter_from_thread_data(thread_standard, thread_size, thread_class)
+                            with CalculationIssues.collect(st.session_state.debug_mode) as issues:
+                                pitch_diameter = get_pitch_diameter_from_thread_data(thread_standard, thread_size, thread_class)
+                        show_calculation_issues(issues)
                         if pitch_diameter is not None:
                             # Store the pitch diameter in session state for calculation
                             st.session_state.pitch_diameter_value = pitch_diameter
@@ -4332,7 +2528,9 @@ def show_weight_calculator_rectified():
             
             # Perform calculation using FIXED function
             with LoadingManager.show_loading_spinner("Calculating weight..."):
-                result = calculate_weight_rectified(calculation_params)
+                with CalculationIssues.collect(st.session_state.debug_mode) as issues:
+                    result = calculate_weight_rectified(calculation_params)
+            show_calculation_issues(issues)
             
             if result:
                 st.session_state.weight_calc_result = result
@@ -4459,9 +2657,9 @@ def show_weight_calculator_rectified():
                     st.markdown(f"- **Density:** `{dimensions['density_g_cm3']} g/cm³`")
             
             # Show formula details for all product types
-            if 'formula_details' in result:
+            formulas = result.get('formula_details') or formula_details_for(calculation_method)
+            if formulas:
                 st.markdown("### 🧮 Formula Details")
-                formulas = result['formula_details']
                 for formula_name, formula in formulas.items():
                     st.markdown(f"- **{formula_name.replace('_', ' ').title()}:** `{formula}`")
             
@@ -4562,18 +2760,21 @@ def show_batch_calculator_rectified():
     
     if uploaded_file:
         try:
-            if uploaded_file.name.endswith('.xlsx'):
-                batch_df = pd.read_excel(uploaded_file)
-            else:
-                batch_df = pd.read_csv(uploaded_file)
+            # Stream the file: keep only the preview rows and the record count
+            preview_df = pd.DataFrame()
+            record_count = 0
+            for chunk in StreamingBatchReader.iter_chunks(uploaded_file):
+                if record_count == 0:
+                    preview_df = chunk.head()
+                record_count += len(chunk)
             
             st.success("File uploaded successfully!")
             st.write("Preview of uploaded data:")
-            st.dataframe(batch_df.head())
+            st.dataframe(preview_df)
             
             # Validate required columns
             required_cols = ['Product_Type', 'Series', 'Diameter_Type', 'Length']
-            missing_cols = [col for col in required_cols if col not in batch_df.columns]
+            missing_cols = [col for col in required_cols if col not in preview_df.columns]
             
             if missing_cols:
                 st.error(f"Missing required columns: {missing_cols}")
@@ -4582,8 +2783,8 @@ def show_batch_calculator_rectified():
                     with LoadingManager.show_loading_spinner("Processing batch calculations..."):
                         LoadingManager.show_progress_bar(1, 5, "Processing batch")
                         st.info("FIXED batch processing with separate data fetching ready for implementation")
-                        st.write(f"Records to process: {len(batch_df)}")
-                    
+                        st.write(f"Records to process: {record_count}")
+        
         except Exception as e:
             st.error(f"Error reading file: {str(e)}")
             LoadingManager.log_operation("Batch File Upload", False, str(e))
@@ -4628,24 +2829,24 @@ def show_data_quality_indicators():
         else:
             st.markdown('<div class="data-quality-indicator quality-warning">ISO 4014: Limited Access</div>', unsafe_allow_html=True)
         
-        if st.session_state.din7991_loaded:
+        if reference_catalog.din7991_loaded:
             st.markdown(f'<div class="data-quality-indicator quality-good">DIN-7991: {len(df_din7991)} Records</div>', unsafe_allow_html=True)
         else:
             st.markdown('<div class="data-quality-indicator quality-warning">DIN-7991: Limited Access</div>', unsafe_allow_html=True)
         
-        if st.session_state.asme_b18_3_loaded:
+        if reference_catalog.asme_b18_3_loaded:
             st.markdown(f'<div class="data-quality-indicator quality-good">ASME B18.3: {len(df_asme_b18_3)} Records</div>', unsafe_allow_html=True)
         else:
             st.markdown('<div class="data-quality-indicator quality-warning">ASME B18.3: Limited Access</div>', unsafe_allow_html=True)
         
         if not df_mechem.empty:
             st.markdown(f'<div class="data-quality-indicator quality-good">Mech & Chem: {len(df_mechem)} Records</div>', unsafe_allow_html=True)
-            st.markdown(f'<div style="font-size: 0.8rem; margin: 0.1rem 0;">Property Classes: {len(st.session_state.property_classes)}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div style="font-size: 0.8rem; margin: 0.1rem 0;">Property Classes: {len(reference_catalog.property_classes)}</div>', unsafe_allow_html=True)
         else:
             st.markdown('<div class="data-quality-indicator quality-warning">Mech & Chem: Limited Access</div>', unsafe_allow_html=True)
         
         thread_status = []
-        for standard, url in thread_files.items():
+        for standard in thread_files:
             df_thread = load_thread_data_enhanced(standard)
             if not df_thread.empty:
                 thread_status.append(f"{standard}: OK")
@@ -4659,6 +2860,7 @@ def show_data_quality_indicators():
 # ======================================================
 # Enhanced Export Functionality
 # ======================================================
+@Spans.span("export.excel")
 def export_to_excel(df, filename_prefix):
     """Export dataframe to Excel with formatting"""
     try:
@@ -4706,7 +2908,8 @@ def enhanced_export_data(filtered_df, export_format):
                     key=f"excel_export_{timestamp}"
                 )
     else:
-        csv_data = filtered_df.to_csv(index=False)
+        with Spans.span("export.csv"):
+            csv_data = filtered_df.to_csv(index=False)
         st.download_button(
             label="Download CSV File",
             data=csv_data,
@@ -4866,7 +3069,7 @@ def extract_product_details(row):
                     st.sidebar.write(f"  {key}: {value}")
         
         return details
-        
+    
     except Exception as e:
         st.error(f"Error extracting product details: {str(e)}")
         # Return basic details even if extraction fails
@@ -5117,23 +3320,23 @@ def get_available_standards_for_product_series(product, series):
     
     if product == "All" and series == "All":
         # Show all standards
-        for standard in st.session_state.available_products.keys():
+        for standard in reference_catalog.available_products.keys():
             available_standards.append(standard)
     elif product == "All" and series != "All":
         # Filter by series only
-        for standard, std_series in st.session_state.available_series.items():
+        for standard, std_series in reference_catalog.available_series.items():
             if std_series == series:
                 available_standards.append(standard)
     elif product != "All" and series == "All":
         # Filter by product only
-        for standard, products in st.session_state.available_products.items():
+        for standard, products in reference_catalog.available_products.items():
             if product in products:
                 available_standards.append(standard)
     else:
         # Filter by both product and series
-        for standard, products in st.session_state.available_products.items():
+        for standard, products in reference_catalog.available_products.items():
             if product in products:
-                std_series = st.session_state.available_series.get(standard, "")
+                std_series = reference_catalog.available_series.get(standard, "")
                 if std_series == series:
                     available_standards.append(standard)
     
@@ -5141,15 +3344,10 @@ def get_available_standards_for_product_series(product, series):
 
 def get_available_sizes_for_standard_product(standard, product, grade="All"):
     """Get available sizes based on selected standard and product"""
-    size_options = ["All"]
-    
     if standard == "All" or product == "All":
-        return size_options
-    
-    temp_df = get_filtered_dataframe(product, standard, grade)
-    size_options = get_safe_size_options(temp_df)
+        return ["All"]
     
-    return size_options
+    return reference_snapshot.options.size_options(standard, product, grade)
 
 # ======================================================
 # FIXED SECTION B - THREAD SPECIFICATIONS WITH PROPER DATA HANDLING
@@ -5170,7 +3368,7 @@ def show_enhanced_product_database():
     </div>
     """, unsafe_allow_html=True)
     
-    if df.empty and df_mechem.empty and df_iso4014.empty and not st.session_state.din7991_loaded and not st.session_state.asme_b18_3_loaded:
+    if df.empty and df_mechem.empty and df_iso4014.empty and not reference_catalog.din7991_loaded and not reference_catalog.asme_b18_3_loaded:
         st.error("No data sources available. Please check your data connections.")
         return
     
@@ -5206,7 +3404,7 @@ def show_enhanced_product_database():
         with col1:
             # 1. Product List - Get all unique products from all standards
             all_products = set()
-            for standard_products_list in st.session_state.available_products.values():
+            for standard_products_list in reference_catalog.available_products.values():
                 all_products.update(standard_products_list)
             all_products = ["All"] + sorted([p for p in all_products if p != "All"])
             
@@ -5243,7 +3441,7 @@ def show_enhanced_product_database():
             
             # Show info about available standards
             if dimensional_standard != "All":
-                std_series = st.session_state.available_series.get(dimensional_standard, "Unknown")
+                std_series = reference_catalog.available_series.get(dimensional_standard, "Unknown")
                 st.caption(f"Series: {std_series}")
         
         with col4:
@@ -5441,8 +3639,8 @@ def show_enhanced_product_database():
         with col1:
             # Property classes - FIXED: Get ALL property classes from Mechanical & Chemical data
             property_classes = ["All"]
-            if st.session_state.property_classes:
-                property_classes.extend(sorted(st.session_state.property_classes))
+            if reference_catalog.property_classes:
+                property_classes.extend(sorted(reference_catalog.property_classes))
             else:
                 # If no property classes found, show a message
                 st.info("No property classes found in Mechanical & Chemical data")
@@ -5497,7 +3695,7 @@ def show_enhanced_product_database():
             - Standards Available: {len(material_standards)-1}
             - Selected Standard: {material_standard}
             - Mechanical & Chemical Data: {len(df_mechem)} records
-            - Sample Property Classes: {st.session_state.property_classes[:5] if st.session_state.property_classes else 'None'}
+            - Sample Property Classes: {reference_catalog.property_classes[:5] if reference_catalog.property_classes else 'None'}
             """)
         
         # Apply Section C Filters Button
@@ -5551,10 +3749,10 @@ def show_enhanced_product_database():
             st.session_state.section_a_filters = {}
             st.session_state.section_b_filters = {}
             st.session_state.section_c_filters = {}
-            st.session_state.section_a_results = pd.DataFrame()
-            st.session_state.section_b_results = pd.DataFrame()
-            st.session_state.section_c_results = pd.DataFrame()
-            st.session_state.combined_results = pd.DataFrame()
+            st.session_state.section_a_results = ResultView()
+            st.session_state.section_b_results = ResultView()
+            st.session_state.section_c_results = ResultView()
+            st.session_state.combined_results = ResultView()
             st.session_state.show_professional_card = False
             # Reset current selections
             st.session_state.section_a_current_product = "All"
@@ -5572,11 +3770,11 @@ def show_enhanced_product_database():
     with quick_col2:
         if st.button("View All Data", use_container_width=True, key="view_all"):
             # Show all available data
-            st.session_state.section_a_results = df.copy()
+            st.session_state.section_a_results = ResultView(df)
             # Load thread data for ASME B1.1
-            st.session_state.section_b_results = get_thread_data_enhanced("ASME B1.1")
+            st.session_state.section_b_results = ResultView(load_thread_data_enhanced("ASME B1.1"))
             if not df_mechem.empty:
-                st.session_state.section_c_results = df_mechem.copy()
+                st.session_state.section_c_results = ResultView(df_mechem)
             st.rerun()
     
     with quick_col3:
@@ -5584,7 +3782,7 @@ def show_enhanced_product_database():
             # Combine current results and export
             combined = combine_all_results()
             if not combined.empty:
-                enhanced_export_data(combined, "Excel")
+                enhanced_export_data(combined.frame(), "Excel")
             else:
                 st.warning("No data to export")
     
@@ -5616,8 +3814,8 @@ def show_rectified_home():
     
     col1, col2, col3, col4 = st.columns(4)
     
-    total_products = len(df) + (len(df_iso4014) if not df_iso4014.empty else 0) + (len(df_din7991) if st.session_state.din7991_loaded else 0) + (len(df_asme_b18_3) if st.session_state.asme_b18_3_loaded else 0)
-    total_dimensional_standards = st.session_state.dimensional_standards_count
+    total_products = len(df) + (len(df_iso4014) if not df_iso4014.empty else 0) + (len(df_din7991) if reference_catalog.din7991_loaded else 0) + (len(df_asme_b18_3) if reference_catalog.asme_b18_3_loaded else 0)
+    total_dimensional_standards = reference_catalog.dimensional_standards_count
     total_threads = len(thread_files)
     total_mecert = len(df_mechem) if not df_mechem.empty else 0
     
@@ -5687,10 +3885,10 @@ def show_rectified_home():
         status_items = [
             ("ASME B18.2.1 Data", not df.empty, "oracle11g-badge"),
             ("ISO 4014 Data", not df_iso4014.empty, "oracle11g-badge-orange"),
-            ("DIN-7991 Data", st.session_state.din7991_loaded, "oracle11g-badge-green"),
-            ("ASME B18.3 Data", st.session_state.asme_b18_3_loaded, "oracle11g-badge-yellow"),
+            ("DIN-7991 Data", reference_catalog.din7991_loaded, "oracle11g-badge-green"),
+            ("ASME B18.3 Data", reference_catalog.asme_b18_3_loaded, "oracle11g-badge-yellow"),
             ("ME&CERT Data", not df_mechem.empty, "oracle11g-badge"),
-            ("Thread Data", any(not load_thread_data_enhanced(url).empty for url in thread_files.values()), "oracle11g-badge-orange"),
+            ("Thread Data", any(not load_thread_data_enhanced(standard).empty for standard in thread_files), "oracle11g-badge-orange"),
             ("Weight Calculations", True, "oracle11g-badge-green"),
             ("FIXED Calculator", True, "oracle11g-badge-yellow"),
             ("Batch Calculator", True, "oracle11g-badge"),
@@ -5768,7 +3966,7 @@ def show_help_system():
             - Complete dimension breakdown
             - Volume calculations for each component
             """)
-
+        
         with st.expander("Batch Calculator Guide"):
             st.markdown("""
             **BATCH CALCULATOR FEATURES:**
@@ -5815,6 +4013,73 @@ def show_section(title):
         st.session_state.selected_section = None
         st.rerun()
 
+# ======================================================
+# PERFORMANCE PANEL - SPAN TIMINGS PER RERUN, SESSION AND PROCESS
+# ======================================================
+def span_summary_frame(recorder):
+    """One row per span name, most total time first"""
+    rows = [
+        {
+            'Span': name,
+            'Calls': summary['count'],
+            'Total (ms)': round(summary['total_ms'], 2),
+            'Mean (ms)': round(summary['mean_ms'], 3),
+            'p50 (ms)': summary['p50_ms'],
+            'p95 (ms)': summary['p95_ms'],
+            'p99 (ms)': summary['p99_ms'],
+            'Max (ms)': round(summary['max_ms'], 2)
+        }
+        for name, summary in recorder.summary().items() if summary['count']
+    ]
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values('Total (ms)', ascending=False, ignore_index=True)
+
+def show_span_histogram(recorder, span_name, key):
+    """Bar chart of one span's duration buckets"""
+    cumulative = recorder.summary()[span_name]['buckets_ms']
+    bounds = list(cumulative)
+    counts = [cumulative[bound] - (cumulative[bounds[i - 1]] if i else 0) for i, bound in enumerate(bounds)]
+    labels = [f"≤ {bound}" if bound != '+Inf' else f"> {bounds[-2]}" for bound in bounds]
+    fig = px.bar(x=labels, y=counts, labels={'x': 'Duration (ms)', 'y': 'Spans'}, title=span_name)
+    st.plotly_chart(fig, use_container_width=True, key=key)
+
+def show_performance_panel(rerun_spans):
+    """Debug panel: which stages of this rerun, this session and all sessions cost time"""
+    scopes = {
+        "This Rerun": rerun_spans,
+        "This Session": st.session_state.session_spans,
+        "All Sessions": Spans.process
+    }
+    
+    st.markdown("---")
+    with st.expander("Performance - Span Timings", expanded=True):
+        for tab, (scope, recorder) in zip(st.tabs(list(scopes)), scopes.items()):
+            with tab:
+                summary_df = span_summary_frame(recorder)
+                if summary_df.empty:
+                    st.info("No spans recorded yet")
+                    continue
+                st.dataframe(summary_df, use_container_width=True, hide_index=True)
+                if scope != "This Rerun":
+                    span_name = st.selectbox("Histogram", summary_df['Span'].tolist(), key=f"span_histogram_{scope}")
+                    show_span_histogram(recorder, span_name, key=f"span_chart_{scope}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Reset Session Timings", use_container_width=True):
+                st.session_state.session_spans = SpanRecorder()
+                st.rerun()
+        with col2:
+            st.download_button(
+                label="Download Timings (JSON)",
+                data=json.dumps({scope: recorder.summary() for scope, recorder in scopes.items()}, indent=2),
+                file_name=f"span_timings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        st.caption("OpenTelemetry export: " + ("on" if tracing_enabled else "off (set FASTENER_TRACE_EXPORT=otlp to enable)"))
+
 # ======================================================
 # MAIN APPLICATION
 # ======================================================
@@ -5906,6 +4171,10 @@ def main():
     else:
         show_section(st.session_state.selected_section)
     
+    Spans.observe("rerun", time.perf_counter() - rerun_started)
+    if st.session_state.debug_mode:
+        show_performance_panel(rerun_spans)
+    
     st.markdown("""
         <hr>
         <div class="oracle11g-footer">
@@ -0,0 +1,165 @@
+"""Headless batch weight calculator for scheduled jobs.
+
+Runs CSV/XLSX batch files through the same engine as the Batch Calculator page and writes the
+same results workbook, or Parquet. Examples:
+
+    python fastener_batch.py erp_export.csv --output-dir results
+    python fastener_batch.py incoming/ --format parquet --workers 4
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from fastener_engine import (
+    OperationLog, configure_logging, configure_tracing, get_reference_snapshot,
+    StreamingBatchPipeline, BatchResultExport, BATCH_STREAM_CHUNK_ROWS, PARQUET_AVAILABLE, STANDARD_TABLE_KEYS
+)
+
+# ======================================================
+# INPUT AND OUTPUT FILES
+# ======================================================
+BATCH_INPUT_EXTENSIONS = ('.csv', '.xlsx')
+BATCH_OUTPUT_FORMATS = {'xlsx': '.xlsx', 'parquet': '.parquet'}
+
+def find_batch_files(inputs):
+    """Input files in the order given; a directory stands for its CSV/XLSX files, sorted by name"""
+    batch_files = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for name in sorted(os.listdir(input_path)):
+                # Skip Excel's "~$" lock files next to open workbooks
+                if name.lower().endswith(BATCH_INPUT_EXTENSIONS) and not name.startswith('~$'):
+                    batch_files.append(os.path.join(input_path, name))
+        elif os.path.isfile(input_path):
+            batch_files.append(input_path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {input_path}")
+    return batch_files
+
+def output_path_for(input_path, output_dir, output_format):
+    """<output_dir>/<input name>_weights.<format>, next to the input when no directory is given"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    directory = output_dir or os.path.dirname(os.path.abspath(input_path))
+    return os.path.join(directory, f"{stem}_weights{BATCH_OUTPUT_FORMATS[output_format]}")
+
+# ======================================================
+# BATCH RUN
+# ======================================================
+def execution_mode_for(workers):
+    """No worker count keeps the engine's own choice; 1 forces a single process"""
+    if workers is None:
+        return "auto"
+    return "parallel" if workers > 1 else "single"
+
+def run_batch_file(input_path, output_path, diameter_type="Blank Diameter", output_format="xlsx",
+                   workers=None, chunk_rows=BATCH_STREAM_CHUNK_ROWS, progress_callback=None):
+    """Calculate one batch file and write its results; returns the batch summary"""
+    results = errors = None
+    try:
+        with open(input_path, 'rb') as batch_file:
+            results, errors, summary = StreamingBatchPipeline.process(
+                batch_file, diameter_type, progress_callback, execution_mode_for(workers),
+                chunk_rows=chunk_rows, max_workers=workers
+            )
+        if output_format == "parquet":
+            BatchResultExport.write_parquet(results, errors, summary, output_path)
+        else:
+            BatchResultExport.write_workbook(results, errors, summary, output_path)
+        return summary
+    finally:
+        StreamingBatchPipeline.discard(results)
+        StreamingBatchPipeline.discard(errors)
+
+def missing_standard_tables(snapshot):
+    """Standards whose dimension table did not load; every row of those standards would fail"""
+    return [standard for standard, key in STANDARD_TABLE_KEYS.items()
+            if key not in snapshot.tables or snapshot.tables[key].empty]
+
+def build_parser():
+    """Command-line options"""
+    parser = argparse.ArgumentParser(
+        description="Calculate fastener weights for CSV/XLSX batch files without the web app."
+    )
+    parser.add_argument("inputs", nargs="+", help="batch files, or directories of .csv/.xlsx batch files")
+    parser.add_argument("-o", "--output-dir", help="where result files go (default: next to each input)")
+    parser.add_argument("-f", "--format", choices=sorted(BATCH_OUTPUT_FORMATS), default="xlsx",
+                        help="results workbook, or Parquet with _errors.parquet and _summary.json beside it")
+    parser.add_argument("-d", "--diameter-type", choices=["Blank Diameter", "Pitch Diameter"], default="Blank Diameter",
+                        help="diameter used for rows that do not name one")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="worker processes per file; 1 keeps everything in this process (default: by file size)")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_STREAM_CHUNK_ROWS,
+                        help="rows read and calculated at a time")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report failures")
+    return parser
+
+def main(argv=None):
+    """Run every batch file; exit status 2 when reference tables are missing, 1 when any file
+    could not be processed or calculated none of its rows"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be at least 1")
+    if args.format == "parquet" and not PARQUET_AVAILABLE:
+        parser.error("--format parquet needs the pyarrow package")
+    
+    try:
+        batch_files = find_batch_files(args.inputs)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not batch_files:
+        parser.error("no .csv or .xlsx batch files found")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    
+    configure_logging()
+    configure_tracing()
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    
+    # Load the reference tables once, before the first file, and say if any source failed
+    snapshot = get_reference_snapshot()
+    for level, message in snapshot.messages:
+        if level in ("warning", "error"):
+            print(f"Reference data {level}: {message}", file=sys.stderr)
+    missing_tables = missing_standard_tables(snapshot)
+    if missing_tables:
+        # Results would be all failures, which a scheduled job must not take for a finished run
+        OperationLog.log_operation("CLI Batch", False, f"Missing reference tables: {', '.join(missing_tables)}")
+        print(f"Reference tables missing for {', '.join(missing_tables)}; no files processed", file=sys.stderr)
+        return 2
+    
+    exit_code = 0
+    for input_path in batch_files:
+        output_path = output_path_for(input_path, args.output_dir, args.format)
+        start = time.perf_counter()
+        
+        def show_progress(fraction, status, input_path=input_path):
+            print(f"{input_path}: {status}", file=sys.stderr)
+        
+        try:
+            summary = run_batch_file(input_path, output_path, args.diameter_type, args.format,
+                                     args.workers, args.chunk_rows, None if args.quiet else show_progress)
+        except Exception as e:
+            exit_code = 1
+            OperationLog.log_operation(f"CLI Batch: {input_path}", False, str(e))
+            print(f"{input_path}: failed - {e}", file=sys.stderr)
+            continue
+        
+        calculated = summary['successful_calculations'] > 0 or summary['total_rows'] == 0
+        if not calculated:
+            exit_code = 1
+            print(f"{input_path}: no rows calculated", file=sys.stderr)
+        OperationLog.log_operation(f"CLI Batch: {input_path}", calculated,
+                                   f"Rows: {summary['total_rows']}, Success: {summary['successful_calculations']}, Output: {output_path}")
+        if not args.quiet:
+            print(f"{input_path}: {summary['successful_calculations']}/{summary['total_rows']} rows calculated, "
+                  f"{summary['failed_calculations']} failed, {summary['total_weight_kg']:.3f} kg total, "
+                  f"{time.perf_counter() - start:.1f}s -> {output_path}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,554 @@
+"""Benchmarks for the loader, lookup and batch hot paths.
+
+Runs against the reference workbooks bundled in the repository root and synthetic BOMs, prints a
+table and writes JSON results that can be compared between releases. Examples:
+
+    python fastener_bench.py --output before.json
+    python fastener_bench.py --stages batch --rows 1000 10000
+    python fastener_bench.py --compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import fastener_engine
+from fastener_engine import (
+    load_excel_source, get_bundled_reference_sources, use_reference_sources, get_reference_snapshot,
+    parse_fastener_size, size_to_float, cached_size_parser, get_hex_head_dimensions,
+    calculate_weight_rectified, BatchProcessor, WeightResultCache, STANDARD_TABLE_KEYS,
+    WeightCatalog, get_weight_catalog, WEIGHT_CATALOG_LENGTHS_MM, SnapshotManager,
+    ReferenceSnapshot, use_reference_snapshot, compute_weight_rectified
+)
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+BENCH_FORMAT_VERSION = 1
+BENCH_STAGES = ("loader", "size", "hex", "weight", "batch")
+BENCH_BATCH_ROWS = (1000, 10000, 100000, 1000000)
+BENCH_WEIGHT_CALLS = 2000
+# Big batches repeat fewer times: at most this many rows per batch size across all repeats
+BENCH_BATCH_ROW_BUDGET = 300000
+
+# ======================================================
+# PEAK MEMORY PER STAGE
+# ======================================================
+def current_rss_bytes():
+    """Resident set size of this process, or None where it cannot be read"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class PeakMemory:
+    """Peak RSS while a stage runs: the kernel high-water mark where it can be reset, sampling otherwise"""
+    
+    SAMPLE_SECONDS = 0.005
+    
+    def __init__(self):
+        self.peak_bytes = None
+        self.method = None
+        self._stop = threading.Event()
+        self._sampler = None
+    
+    @staticmethod
+    def reset_high_water_mark():
+        """Linux: writing 5 to clear_refs resets VmHWM to the current RSS"""
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return True
+        except OSError:
+            return False
+    
+    @staticmethod
+    def read_high_water_mark():
+        """VmHWM from /proc/self/status in bytes"""
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+        return None
+    
+    def _sample(self):
+        while not self._stop.wait(self.SAMPLE_SECONDS):
+            self.peak_bytes = max(self.peak_bytes or 0, current_rss_bytes() or 0)
+    
+    def __enter__(self):
+        gc.collect()
+        if self.reset_high_water_mark():
+            self.method = "hwm"
+        elif current_rss_bytes() is not None:
+            self.method = "sampled"
+            self.peak_bytes = max(self.peak_bytes or 0, current_rss_bytes())
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name="bench-rss", daemon=True)
+            self._sampler.start()
+        elif RESOURCE_AVAILABLE:
+            # Only the peak since the process started is available
+            self.method = "process_peak"
+        return self
+    
+    def __exit__(self, *exc_info):
+        # Entered once per repeat: keep the highest peak over all of them
+        peak_bytes = None
+        if self.method == "hwm":
+            peak_bytes = self.read_high_water_mark()
+        elif self.method == "sampled":
+            self._stop.set()
+            self._sampler.join()
+            peak_bytes = current_rss_bytes()
+        elif self.method == "process_peak":
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+        self.peak_bytes = max(self.peak_bytes or 0, peak_bytes or 0) or None
+        return False
+
+# ======================================================
+# TIMING AND RESULT RECORDS
+# ======================================================
+def timed_calls(function, arguments):
+    """Call function(*args) for every args tuple; returns the per-call latencies in seconds"""
+    latencies = []
+    clock = time.perf_counter
+    for args in arguments:
+        start = clock()
+        function(*args)
+        latencies.append(clock() - start)
+    return latencies
+
+def stage_record(stage, params, latencies, items, memory):
+    """One machine-readable result: throughput in items/s, latency percentiles per call in ms"""
+    latencies = np.asarray(latencies, dtype=float)
+    seconds = float(latencies.sum())
+    return {
+        'stage': stage,
+        'params': params,
+        'calls': int(len(latencies)),
+        'items': int(items),
+        'seconds': round(seconds, 6),
+        'throughput_per_s': round(items / seconds, 3) if seconds > 0 else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 4),
+        'mean_ms': round(float(latencies.mean()) * 1000, 4),
+        'max_ms': round(float(latencies.max()) * 1000, 4),
+        'peak_rss_mb': round(memory.peak_bytes / 2**20, 1) if memory.peak_bytes else None,
+        'rss_method': memory.method,
+    }
+
+def record_key(record):
+    """Stage name plus its parameters, e.g. process_batch_calculations[rows=1000]"""
+    params = ",".join(f"{name}={value}" for name, value in sorted(record['params'].items()))
+    return f"{record['stage']}[{params}]" if params else record['stage']
+
+def fresh_weight_cache():
+    """In-memory weight cache, so runs never read or fill the on-disk cache"""
+    fastener_engine.weight_result_cache = WeightResultCache(db_path=None)
+
+# ======================================================
+# SYNTHETIC INPUTS FROM THE BUNDLED TABLES
+# ======================================================
+# (product, standard, series) per product line; sizes come from the standard's table
+BENCH_PRODUCT_LINES = [
+    ('Hex Bolt', 'ASME B18.2.1', 'Inch'),
+    ('Heavy Hex Bolt', 'ASME B18.2.1', 'Inch'),
+    ('Hex Bolt', 'ISO 4014', 'Metric'),
+    ('Hexagon Socket Head Cap Screws', 'ASME B18.3', 'Inch'),
+    ('Hexagon Socket Countersunk Head Cap Screw', 'DIN-7991', 'Metric'),
+    ('Washer', 'ASME B18.2.1', 'Inch'),
+    ('Threaded Rod', 'Not Required', 'Inch'),
+]
+BENCH_MATERIALS = ['Carbon Steel', 'Stainless Steel', 'Alloy Steel', 'Brass', 'Aluminum']
+BENCH_LENGTHS_MM = [10, 16, 20, 25, 30, 40, 50, 60, 75, 80, 100, 120, 150, 200, 250, 300]
+
+def table_sizes(snapshot, standard):
+    """Distinct sizes of a standard's dimension table, as text"""
+    table = snapshot.tables.get(STANDARD_TABLE_KEYS.get(standard), pd.DataFrame())
+    if 'Size' not in table.columns:
+        return []
+    return [str(size).strip() for size in table['Size'].dropna().unique() if str(size).strip()]
+
+def product_catalog(snapshot):
+    """One entry per (product line, size) with the nominal diameter in mm"""
+    catalog = []
+    for product, standard, series in BENCH_PRODUCT_LINES:
+        sizes = table_sizes(snapshot, standard) if standard in STANDARD_TABLE_KEYS else ['1/4-20', '3/8-16', '1/2-13', '5/8-11', '3/4-10']
+        for size in sizes:
+            nominal_mm = parse_fastener_size(size).nominal_mm
+            if nominal_mm:
+                catalog.append((product, standard, series, size, round(nominal_mm, 3)))
+    return catalog
+
+def thread_catalog(snapshot):
+    """(thread standard, thread size, class) rows for pitch diameter rows"""
+    threads = []
+    for standard_name, df_thread in snapshot.threads.items():
+        if 'Thread' not in df_thread.columns:
+            continue
+        columns = ['Thread', 'Class'] if 'Class' in df_thread.columns else ['Thread']
+        for values in df_thread[columns].dropna().drop_duplicates().head(200).itertuples(index=False):
+            threads.append((standard_name, str(values[0]), str(values[1]) if len(values) > 1 else 'N/A'))
+    return threads
+
+def synthetic_bom(snapshot, rows, seed=0):
+    """Advanced-template BOM with realistic repetition, 10% pitch diameter rows and 1% bad values"""
+    rng = np.random.default_rng(seed)
+    catalog = product_catalog(snapshot)
+    threads = thread_catalog(snapshot)
+    lines = np.array(catalog, dtype=object)[rng.integers(0, len(catalog), rows)]
+    thread_rows = np.array(threads, dtype=object)[rng.integers(0, len(threads), rows)]
+    pitch = rng.random(rows) < 0.10
+    
+    bom = pd.DataFrame({
+        'Product_Type': lines[:, 0],
+        'Product_Code': [f"BOM-{index:07d}" for index in range(rows)],
+        'Series': lines[:, 2],
+        'Standard': lines[:, 1],
+        'Size': lines[:, 3],
+        'Grade': rng.choice(['N/A', 'A', 'B'], rows),
+        'Diameter_Type': np.where(pitch, 'Pitch Diameter', 'Blank Diameter'),
+        'Diameter_Value': lines[:, 4].astype(float),
+        'Diameter_Unit': 'mm',
+        'Thread_Standard': np.where(pitch, thread_rows[:, 0], 'N/A'),
+        'Thread_Size': np.where(pitch, thread_rows[:, 1], 'N/A'),
+        'Thread_Class': np.where(pitch, thread_rows[:, 2], 'N/A'),
+        'Length': rng.choice(BENCH_LENGTHS_MM, rows),
+        'Length_Unit': 'mm',
+        'Material': rng.choice(BENCH_MATERIALS, rows),
+        'Quantity': rng.integers(1, 1000, rows),
+    })
+    bad = rng.random(rows) < 0.01
+    bom['Diameter_Value'] = bom['Diameter_Value'].astype(object)
+    bom.loc[bad, 'Diameter_Value'] = 'n/a'
+    return bom
+
+def weight_parameters(snapshot, count, seed=0, diameter_ratio=1.0):
+    """Single-calculation parameter dicts drawn from the same catalog as the BOMs; blank diameter = ratio x nominal"""
+    rng = np.random.default_rng(seed)
+    catalog = product_catalog(snapshot)
+    parameters = []
+    for index in rng.integers(0, len(catalog), count):
+        product, standard, series, size, nominal_mm = catalog[index]
+        parameters.append({
+            'product_type': product, 'standard': standard, 'series': series, 'size': size, 'grade': 'All',
+            'diameter_type': 'Blank Diameter', 'diameter_value': round(nominal_mm * diameter_ratio, 3), 'diameter_unit': 'mm',
+            'length': int(rng.choice(BENCH_LENGTHS_MM)), 'length_unit': 'mm',
+            'material': str(rng.choice(BENCH_MATERIALS)),
+        })
+    return parameters
+
+def size_strings(snapshot):
+    """Every distinct size in the dimension and thread tables plus common hand-typed forms"""
+    sizes = set()
+    for standard in STANDARD_TABLE_KEYS:
+        sizes.update(table_sizes(snapshot, standard))
+    for standard_name, df_thread in snapshot.threads.items():
+        if 'Thread' in df_thread.columns:
+            sizes.update(str(size).strip() for size in df_thread['Thread'].dropna().unique())
+    sizes.update(['M10x1.5', 'M12 X 1.75', '1/2-13', '#10-24', '3/8"', '0.25', '1-1/4-7', 'M8', 'bad size'])
+    return sorted(sizes)
+
+# ======================================================
+# STAGES
+# ======================================================
+def snapshot_round_trip_mismatches(paths):
+    """Tables whose snapshot copy stringifies differently from the parsed workbook; df.equals misses None vs NaN"""
+    mismatches = []
+    for path in paths:
+        cold, _ = load_excel_source(path)
+        warm, _ = load_excel_source(path)
+        if not cold.astype(str).equals(warm.astype(str)):
+            mismatches.append(path)
+    
+    # Blank Thread/Class cells in a text column, which the bundled workbooks may not have
+    blanks = pd.DataFrame({'Thread': ['M6', np.nan, 'M8'], 'Class': ['6g', '6g', np.nan], 'Pitch Diameter': [5.3, np.nan, 7.2]})
+    digest = SnapshotManager.content_hash(b"bench-blank-cells")
+    SnapshotManager.save(digest, blanks)
+    if not blanks.astype(str).equals(SnapshotManager.load(digest).astype(str)):
+        mismatches.append("blank cells")
+    return mismatches
+
+def bench_loader(args, snapshot):
+    """load_excel_source (what the reference refresh runs per source) on every bundled workbook"""
+    paths = [path for path, _ in get_bundled_reference_sources().values()]
+    snapshot_dir = fastener_engine.SNAPSHOT_DIR
+    snapshot_root = tempfile.mkdtemp(prefix="fastener-bench-")
+    cold, warm = [], []
+    cold_memory, warm_memory = PeakMemory(), PeakMemory()
+    try:
+        # Cold and warm starts must see the same tables before their timings mean anything
+        fastener_engine.SNAPSHOT_DIR = os.path.join(snapshot_root, "check")
+        mismatches = snapshot_round_trip_mismatches(paths)
+        if mismatches:
+            raise RuntimeError(f"Snapshot tables differ from the parsed workbooks: {', '.join(mismatches)}")
+        for repeat in range(args.repeat):
+            # A new snapshot directory per repeat: the first pass parses the xlsx, the second hits the snapshot
+            fastener_engine.SNAPSHOT_DIR = os.path.join(snapshot_root, str(repeat))
+            with cold_memory:
+                cold.extend(timed_calls(load_excel_source, [(path,) for path in paths]))
+            with warm_memory:
+                warm.extend(timed_calls(load_excel_source, [(path,) for path in paths]))
+    finally:
+        fastener_engine.SNAPSHOT_DIR = snapshot_dir
+        shutil.rmtree(snapshot_root, ignore_errors=True)
+    workbooks = {'workbooks': len(paths)}
+    return [
+        stage_record("load_excel_parse", workbooks, cold, len(cold), cold_memory),
+        stage_record("load_excel_snapshot", workbooks, warm, len(warm), warm_memory),
+    ]
+
+def bench_size(args, snapshot):
+    """size_to_float with an empty parser cache, then with every size cached"""
+    arguments = [(size,) for size in size_strings(snapshot)] * args.repeat
+    uncached = []
+    with PeakMemory() as uncached_memory:
+        for args_tuple in arguments:
+            cached_size_parser.cache_clear()
+            uncached.extend(timed_calls(size_to_float, [args_tuple]))
+    with PeakMemory() as cached_memory:
+        cached = timed_calls(size_to_float, arguments)
+    sizes = {'sizes': len(arguments) // args.repeat}
+    return [
+        stage_record("size_to_float_uncached", sizes, uncached, len(uncached), uncached_memory),
+        stage_record("size_to_float_cached", sizes, cached, len(cached), cached_memory),
+    ]
+
+def bench_hex(args, snapshot):
+    """get_hex_head_dimensions for every hex product size, plus misses"""
+    arguments = [
+        (standard, product, size, "All")
+        for product, standard, _ in BENCH_PRODUCT_LINES if 'Hex' in product and standard in STANDARD_TABLE_KEYS
+        for size in table_sizes(snapshot, standard) + ['99/7']
+    ]
+    with PeakMemory() as memory:
+        latencies = timed_calls(get_hex_head_dimensions, arguments * args.repeat)
+    return [stage_record("get_hex_head_dimensions", {'lookups': len(arguments)}, latencies, len(latencies), memory)]
+
+def refreshed_catalog_mismatches(snapshot, parameter_list):
+    """Inputs whose weight disagrees with compute_weight_rectified after a refresh to doubled head dimensions"""
+    tables = {key: table.copy() for key, table in snapshot.tables.items()}
+    for standard, key in STANDARD_TABLE_KEYS.items():
+        schema = snapshot.schemas.get(standard, {})
+        for role in ('width_across_flats', 'head_height', 'socket_head_diameter', 'socket_head_height'):
+            column = schema.get(role)
+            if key in tables and column in tables[key].columns:
+                tables[key][column] = pd.to_numeric(tables[key][column], errors='coerce') * 2
+    changed = ReferenceSnapshot(tables, snapshot.threads, [])
+    
+    # As ReferenceDataRefresher._refresh does: derived values are built while the old snapshot is still served
+    changed.warm_from(snapshot)
+    refresher = fastener_engine.reference_refresher
+    use_reference_snapshot(changed)
+    try:
+        mismatches = []
+        for parameters in parameter_list:
+            served, computed = calculate_weight_rectified(parameters), compute_weight_rectified(parameters, changed)
+            if (served is None) != (computed is None) or (
+                    served is not None and not np.isclose(served['weight_kg'], computed['weight_kg'], rtol=1e-9)):
+                mismatches.append(parameters)
+        return mismatches
+    finally:
+        fastener_engine.reference_refresher = refresher
+
+def bench_weight(args, snapshot):
+    """Weight catalog build, catalog hits, then off-catalog calculate_weight_rectified on an empty and a filled result cache"""
+    with PeakMemory() as build_memory:
+        build = timed_calls(WeightCatalog, [(snapshot,)] * args.repeat)
+    get_weight_catalog(snapshot, wait=True)
+    mismatches = refreshed_catalog_mismatches(snapshot, weight_parameters(snapshot, 200, args.seed))
+    if mismatches:
+        raise RuntimeError(f"Weights served after a refresh differ from the new tables for {len(mismatches)} inputs, e.g. {mismatches[0]}")
+    
+    # Nominal diameters are catalog items; 90% of nominal is a typical blank diameter and misses the catalog
+    catalog_arguments = [(parameters,) for parameters in weight_parameters(snapshot, args.weight_calls, args.seed)]
+    arguments = [(parameters,) for parameters in weight_parameters(snapshot, args.weight_calls, args.seed, diameter_ratio=0.9)]
+    with PeakMemory() as catalog_memory:
+        catalog = timed_calls(calculate_weight_rectified, catalog_arguments * args.repeat)
+    uncached, cached = [], []
+    uncached_memory, cached_memory = PeakMemory(), PeakMemory()
+    for _ in range(args.repeat):
+        fresh_weight_cache()
+        with uncached_memory:
+            uncached.extend(timed_calls(calculate_weight_rectified, arguments))
+        with cached_memory:
+            cached.extend(timed_calls(calculate_weight_rectified, arguments))
+    calls = {'calls': len(arguments)}
+    return [
+        stage_record("weight_catalog_build", {'lengths': len(WEIGHT_CATALOG_LENGTHS_MM)}, build, len(build), build_memory),
+        stage_record("calculate_weight_catalog", calls, catalog, len(catalog), catalog_memory),
+        stage_record("calculate_weight_uncached", calls, uncached, len(uncached), uncached_memory),
+        stage_record("calculate_weight_cached", calls, cached, len(cached), cached_memory),
+    ]
+
+def bench_batch(args, snapshot):
+    """process_batch_calculations on synthetic BOMs, one call per repeat, on an empty result cache"""
+    records = []
+    for rows in args.rows:
+        bom = synthetic_bom(snapshot, rows, args.seed)
+        repeats = max(1, min(args.repeat, BENCH_BATCH_ROW_BUDGET // rows))
+        latencies = []
+        memory = PeakMemory()
+        for _ in range(repeats):
+            fresh_weight_cache()
+            with memory:
+                latencies.extend(timed_calls(
+                    BatchProcessor.process_batch_calculations, [(bom, "Blank Diameter", None, args.execution_mode)]
+                ))
+        records.append(stage_record(
+            "process_batch_calculations", {'rows': rows, 'execution_mode': args.execution_mode},
+            latencies, rows * repeats, memory
+        ))
+        del bom
+    return records
+
+BENCH_STAGE_FUNCTIONS = {
+    'loader': bench_loader,
+    'size': bench_size,
+    'hex': bench_hex,
+    'weight': bench_weight,
+    'batch': bench_batch,
+}
+
+# ======================================================
+# RUN, REPORT AND COMPARE
+# ======================================================
+def git_revision():
+    """Commit of the checkout being measured, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment_info(snapshot):
+    """What the numbers depend on besides the code"""
+    return {
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'reference_version': snapshot.version,
+    }
+
+def run_benchmarks(args):
+    """Load the bundled reference data, then run the selected stages in order"""
+    use_reference_sources(get_bundled_reference_sources())
+    start = time.perf_counter()
+    with PeakMemory() as memory:
+        snapshot = get_reference_snapshot()
+    results = [stage_record("reference_snapshot_load", {}, [time.perf_counter() - start], 1, memory)]
+    
+    for stage in args.stages:
+        if not args.quiet:
+            print(f"Running {stage}...", file=sys.stderr)
+        results.extend(BENCH_STAGE_FUNCTIONS[stage](args, snapshot))
+    
+    return {
+        'format_version': BENCH_FORMAT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(snapshot),
+        'settings': {'repeat': args.repeat, 'seed': args.seed, 'stages': list(args.stages)},
+        'results': results,
+    }
+
+def print_results(report):
+    """Human-readable table of a report"""
+    print(f"{'stage':<58} {'items/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}")
+    for record in report['results']:
+        throughput = record['throughput_per_s']
+        print(f"{record_key(record):<58} {throughput if throughput is not None else float('nan'):>12.1f} "
+              f"{record['p50_ms']:>10.3f} {record['p99_ms']:>10.3f} {record['peak_rss_mb'] or float('nan'):>9.1f}")
+
+def compare_reports(baseline, current):
+    """Per-stage change from baseline to current; throughput up and latency down are improvements"""
+    baseline_records = {record_key(record): record for record in baseline['results']}
+    print(f"{baseline['environment'].get('git_revision')} -> {current['environment'].get('git_revision')}")
+    print(f"{'stage':<58} {'items/s':>9} {'p50':>9} {'p99':>9} {'peak MB':>9}")
+    
+    def change(new, old):
+        if new is None or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+    
+    for record in current['results']:
+        old = baseline_records.get(record_key(record))
+        if old is None:
+            print(f"{record_key(record):<58} {'new':>9}")
+            continue
+        print(f"{record_key(record):<58} {change(record['throughput_per_s'], old['throughput_per_s']):>9} "
+              f"{change(record['p50_ms'], old['p50_ms']):>9} {change(record['p99_ms'], old['p99_ms']):>9} "
+              f"{change(record['peak_rss_mb'], old['peak_rss_mb']):>9}")
+
+def build_parser():
+    """Command-line options"""
+    parser = argparse.ArgumentParser(description="Benchmark the loader, lookup and batch hot paths.")
+    parser.add_argument("-s", "--stages", nargs="+", choices=BENCH_STAGES, default=list(BENCH_STAGES),
+                        help="stages to run (default: all)")
+    parser.add_argument("-r", "--rows", nargs="+", type=int, default=list(BENCH_BATCH_ROWS),
+                        help="synthetic BOM sizes for the batch stage")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="passes per stage")
+    parser.add_argument("--weight-calls", type=int, default=BENCH_WEIGHT_CALLS,
+                        help="distinct single weight calculations per pass")
+    parser.add_argument("--execution-mode", choices=["auto", "single", "parallel"], default="auto",
+                        help="batch execution mode")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic inputs")
+    parser.add_argument("-o", "--output", help="write the JSON results here")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two JSON result files instead of running")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress messages")
+    return parser
+
+def main(argv=None):
+    """Run the benchmarks, or compare two earlier runs"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError) as e:
+                parser.error(f"cannot read {path}: {e}")
+        compare_reports(*reports)
+        return 0
+    
+    if args.repeat < 1 or args.weight_calls < 1 or any(rows < 1 for rows in args.rows):
+        parser.error("--repeat, --weight-calls and --rows must be at least 1")
+    
+    report = run_benchmarks(args)
+    print_results(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4167 @@
+"""Fastener reference data, size parsing, dimension lookups and weight calculations, without any UI.
+
+Partha_s.py is the Streamlit page on top of this module. Scripts, batch workers and services import it
+directly; reference workbooks are only loaded when a calculation first needs them.
+"""
+import pandas as pd
+import os
+from fractions import Fraction
+from openpyxl import load_workbook
+import tempfile
+import re
+from datetime import datetime
+import time
+import json
+import numpy as np
+import math
+import logging
+import logging.handlers
+import queue
+import atexit
+import io
+import requests
+from io import BytesIO
+import hashlib
+import sqlite3
+import threading
+import uuid
+import gc
+from itertools import islice
+from bisect import bisect_left
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+from requests.adapters import HTTPAdapter
+from pandas.io.parsers import TextParser
+
+# ======================================================
+# LOGGING CONFIGURATION
+# ======================================================
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FILE = 'fastener_app.log'
+
+def build_log_handlers():
+    """Console and file handlers that do the actual log I/O"""
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(), logging.FileHandler(LOG_FILE)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def configure_logging():
+    """Callers only enqueue records; one listener thread writes them, once per process"""
+    root = logging.getLogger()
+    if any(isinstance(handler, logging.handlers.QueueHandler) for handler in root.handlers):
+        return
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *build_log_handlers(), respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+logger = logging.getLogger(__name__)
+
+# ======================================================
+# PATHS & FILES - UPDATED WITH GOOGLE SHEETS LINKS
+# ======================================================
+url = "https://docs.google.com/spreadsheets/d/11Icre8F3X8WA5BVwkJx75NOH3VzF6G7b/export?format=xlsx"
+local_excel_path = r"G:\My Drive\Streamlite\ASME B18.2.1 Hex Bolt and Heavy Hex Bolt.xlsx"
+
+# Mechanical and Chemical Properties paths
+me_chem_google_url = "https://docs.google.com/spreadsheets/d/12lBzI67Wb0yZyJKYxpDCLzHF9zvS2Fha/export?format=xlsx"
+me_chem_path = r"G:\My Drive\Streamlite\Mechanical and Chemical.xlsx"
+
+# ISO 4014 paths - local and Google Sheets
+iso4014_local_path = r"G:\My Drive\Streamlite\ISO 4014 Hex Bolt.xlsx"
+iso4014_file_url = "https://docs.google.com/spreadsheets/d/1d2hANwoMhuzwyKJ72c125Uy0ujB6QsV_/export?format=xlsx"
+
+# DIN-7991 paths - local and Google Sheets
+din7991_local_path = r"G:\My Drive\Streamlite\DIN-7991.xlsx"
+din7991_file_url = "https://docs.google.com/spreadsheets/d/1PjptIbFfebdF1h_Aj124fNgw5jNBWlvn/export?format=xlsx"
+
+# ASME B18.3 paths - local and Google Sheets
+asme_b18_3_local_path = r"G:\My Drive\Streamlite\ASME B18.3.xlsx"
+asme_b18_3_file_url = "https://docs.google.com/spreadsheets/d/1dPNGwf7bv5A77rMSPpl11dhcJTXQfob1/export?format=xlsx"
+
+# Thread files - UPDATED WITH GOOGLE SHEETS LINKS
+thread_files = {
+    "ASME B1.1": "https://docs.google.com/spreadsheets/d/1YHgUloNsFudxxqhWQV66D2DtSSKWFP_w/export?format=xlsx",
+    "ISO 965-2-98 Coarse": "https://docs.google.com/spreadsheets/d/1be5eEy9hbVfMg2sl1-Cz1NNCGGF8EB-L/export?format=xlsx",
+    "ISO 965-2-98 Fine": "https://docs.google.com/spreadsheets/d/1QGQ6SMWBSTsah-vq3zYnhOC3NXaBdKPe/export?format=xlsx",
+}
+
+# Copies of every reference workbook shipped next to this module (offline runs and benchmarks)
+BUNDLED_DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+bundled_workbooks = {
+    'main': "ASME B18.2.1 Hex Bolt and Heavy Hex Bolt.xlsx",
+    'mechem': "Mechanical and Chemical.xlsx",
+    'iso4014': "ISO 4014 Hex Bolt.xlsx",
+    'din7991': "DIN-7991.xlsx",
+    'asme_b18_3': "ASME B18.3.xlsx",
+    'thread:ASME B1.1': "ASME B1.1 New.xlsx",
+    'thread:ISO 965-2-98 Coarse': "ISO 965-2-98 Coarse.xlsx",
+    'thread:ISO 965-2-98 Fine': "ISO 965-2-98 Fine.xlsx",
+}
+
+# ======================================================
+# OPERATION LOGGING
+# ======================================================
+class OperationLog:
+    """Log calculation and loading operations"""
+    
+    # Per-thread log aggregation for batch runs, see aggregate_logs
+    _log_state = threading.local()
+    
+    @staticmethod
+    def log_operation(operation_name, success=True, details=""):
+        """Log operations with details"""
+        status = "SUCCESS" if success else "FAILED"
+        counts = getattr(OperationLog._log_state, 'counts', None)
+        if counts is not None:
+            entry = counts.setdefault((operation_name, status), [0, details])
+            entry[0] += 1
+            entry[1] = details
+            return
+        logger.info(f"{operation_name} - {status} - {details}")
+    
+    @staticmethod
+    @contextmanager
+    def aggregate_logs():
+        """Count repeated operations inside a batch and log one line per operation when it ends"""
+        state = OperationLog._log_state
+        if getattr(state, 'counts', None) is not None:
+            # Nested batch scope: the outermost one reports
+            yield
+            return
+        state.counts = {}
+        try:
+            yield
+        finally:
+            counts, state.counts = state.counts, None
+            for (operation_name, status), (count, details) in counts.items():
+                if count == 1:
+                    logger.info(f"{operation_name} - {status} - {details}")
+                else:
+                    logger.info(f"{operation_name} - {status} - {count} calls, last: {details}")
+
+def configure_worker_logging():
+    """Batch worker processes have no queue listener: write directly and start without inherited batch state"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    for handler in build_log_handlers():
+        root.addHandler(handler)
+    OperationLog._log_state = threading.local()
+    CalculationIssues._state = threading.local()
+
+# ======================================================
+# CALCULATION ISSUES - STRUCTURED WARNINGS INSTEAD OF UI CALLS
+# ======================================================
+class IssueList(list):
+    """(level, message) pairs collected during a calculation"""
+    
+    def __init__(self, debug=False):
+        super().__init__()
+        self.debug = debug
+
+class CalculationIssues:
+    """Warnings, errors and debug notes from calculation code; the page decides how to show them"""
+    
+    _state = threading.local()
+    
+    @staticmethod
+    def report(level, message):
+        """Hand an issue to the active collector, or to the log when running headless"""
+        collector = getattr(CalculationIssues._state, 'collector', None)
+        if collector is not None:
+            if level != "debug" or collector.debug:
+                collector.append((level, message))
+        elif level != "debug":
+            OperationLog.log_operation(f"Calculation {level.title()}", False, message)
+    
+    @staticmethod
+    def wants_debug():
+        """True when the active collector keeps debug notes, so callers can skip building them"""
+        collector = getattr(CalculationIssues._state, 'collector', None)
+        return collector is not None and collector.debug
+    
+    @staticmethod
+    @contextmanager
+    def collect(debug=False):
+        """Collect issues raised inside the block; they also reach the enclosing collector, or the log"""
+        state = CalculationIssues._state
+        previous = getattr(state, 'collector', None)
+        issues = IssueList(debug or (previous is not None and previous.debug))
+        state.collector = issues
+        try:
+            yield issues
+        finally:
+            state.collector = previous
+            if previous is not None:
+                previous.extend(issue for issue in issues if issue[0] != "debug" or previous.debug)
+            else:
+                for level, message in issues:
+                    if level != "debug":
+                        OperationLog.log_operation(f"Calculation {level.title()}", False, message)
+
+# ======================================================
+# TIMING SPANS
+# ======================================================
+SPAN_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Also export spans to OpenTelemetry: "otlp" (configured by the standard OTEL_EXPORTER_OTLP_* variables),
+# "console", or "global" to use a tracer provider the host process already installed
+TRACE_EXPORT = os.environ.get("FASTENER_TRACE_EXPORT", "").strip().lower()
+
+try:
+    from opentelemetry import trace as otel_trace
+    OPENTELEMETRY_AVAILABLE = True
+except ImportError:
+    OPENTELEMETRY_AVAILABLE = False
+
+class LatencyHistogram:
+    """Durations of one operation in fixed millisecond buckets"""
+    
+    def __init__(self, buckets_ms=SPAN_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds):
+        """Record one duration"""
+        elapsed_ms = seconds * 1000.0
+        with self._lock:
+            self.counts[bisect_left(self.buckets_ms, elapsed_ms)] += 1
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+    
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th duration (the maximum for the overflow bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets_ms, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.max_ms
+    
+    def summary(self):
+        """Counts per bucket (cumulative, by upper bound in ms), total, mean, max and p50/p95/p99"""
+        with self._lock:
+            cumulative = {}
+            seen = 0
+            for bound, bucket_count in zip(self.buckets_ms, self.counts):
+                seen += bucket_count
+                cumulative[str(bound)] = seen
+            cumulative['+Inf'] = self.count
+            return {
+                'count': self.count,
+                'total_ms': self.total_ms,
+                'mean_ms': self.total_ms / self.count if self.count else None,
+                'max_ms': self.max_ms,
+                'p50_ms': self.quantile(0.50),
+                'p95_ms': self.quantile(0.95),
+                'p99_ms': self.quantile(0.99),
+                'buckets_ms': cumulative
+            }
+
+class SpanRecorder:
+    """Latency histogram per span name, e.g. for one rerun, one session or the whole process"""
+    
+    def __init__(self, buckets_ms=SPAN_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.histograms = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, name, seconds):
+        """Record one span duration"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram(self.buckets_ms))
+        histogram.observe(seconds)
+    
+    def summary(self):
+        """{span name: histogram summary}"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+class Spans:
+    """Timed sections of the hot paths, recorded into histograms and optionally exported to OpenTelemetry"""
+    
+    _state = threading.local()
+    _tracer = None
+    # Every span in this process, whichever session or thread ran it
+    process = SpanRecorder()
+    
+    @staticmethod
+    @contextmanager
+    def span(name, **attributes):
+        """Time the block (or, as a decorator, each call) as one span"""
+        tracer = Spans._tracer
+        start = time.perf_counter()
+        try:
+            if tracer is None:
+                yield
+            else:
+                with tracer.start_as_current_span(name, attributes=attributes or None):
+                    yield
+        finally:
+            Spans.observe(name, time.perf_counter() - start)
+    
+    @staticmethod
+    def observe(name, seconds):
+        """Record a duration into the process recorder and the recorders active on this thread"""
+        Spans.process.observe(name, seconds)
+        for recorder in getattr(Spans._state, 'recorders', ()):
+            recorder.observe(name, seconds)
+    
+    @staticmethod
+    def activate(*recorders):
+        """Also record this thread's spans into these recorders, until the next activate call"""
+        Spans._state.recorders = recorders
+
+def configure_tracing(export=None):
+    """Export spans to OpenTelemetry as well, per export or FASTENER_TRACE_EXPORT; True when enabled"""
+    export = (export or TRACE_EXPORT).lower()
+    if Spans._tracer is not None or not export:
+        return Spans._tracer is not None
+    if not OPENTELEMETRY_AVAILABLE:
+        logger.warning(f"FASTENER_TRACE_EXPORT={export} needs the opentelemetry-sdk package; spans are not exported")
+        return False
+    
+    try:
+        if export != "global":
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+            if export == "otlp":
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+                exporter = OTLPSpanExporter()
+            elif export == "console":
+                exporter = ConsoleSpanExporter()
+            else:
+                raise ValueError(f"unknown trace export '{export}' (use otlp, console or global)")
+            provider = TracerProvider(resource=Resource.create({
+                "service.name": os.environ.get("OTEL_SERVICE_NAME", "fastener-engine")
+            }))
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+            otel_trace.set_tracer_provider(provider)
+            atexit.register(provider.shutdown)
+        Spans._tracer = otel_trace.get_tracer(__name__)
+        OperationLog.log_operation("Configure Tracing", True, f"Export: {export}")
+        return True
+    except Exception as e:
+        OperationLog.log_operation("Configure Tracing", False, str(e))
+        return False
+
+# ======================================================
+# COLUMNAR SNAPSHOT CACHE FOR STANDARDS WORKBOOKS
+# ======================================================
+SNAPSHOT_DIR = os.environ.get(
+    "FASTENER_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots")
+)
+SNAPSHOT_FORMAT_VERSION = 1
+
+try:
+    import pyarrow  # noqa: F401 - parquet engine for pandas
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+class SnapshotManager:
+    """Persist parsed workbooks as columnar snapshots keyed by a hash of the source bytes"""
+    
+    @staticmethod
+    def content_hash(data):
+        """SHA-256 of the raw workbook bytes"""
+        return hashlib.sha256(data).hexdigest()
+    
+    @staticmethod
+    def snapshot_paths(digest):
+        """Parquet and pickle snapshot paths for a content hash"""
+        base = os.path.join(SNAPSHOT_DIR, f"v{SNAPSHOT_FORMAT_VERSION}_{digest}")
+        return base + ".parquet", base + ".pkl"
+    
+    @staticmethod
+    def load(digest):
+        """Load a snapshot for the given hash, or None if there is none"""
+        parquet_path, pickle_path = SnapshotManager.snapshot_paths(digest)
+        try:
+            if PARQUET_AVAILABLE and os.path.exists(parquet_path):
+                return SnapshotManager.restore_missing(pd.read_parquet(parquet_path, memory_map=True))
+            if os.path.exists(pickle_path):
+                return pd.read_pickle(pickle_path)
+        except Exception as e:
+            # Corrupt or unreadable snapshot - rebuild it from the workbook
+            logger.warning(f"Discarding unreadable snapshot {digest[:12]}: {str(e)}")
+        return None
+    
+    @staticmethod
+    def restore_missing(df):
+        """Arrow reads blank cells of text columns back as None; put NaN back so astype(str) gives 'nan' as on a cold parse"""
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].notna(), np.nan)
+        return df
+    
+    @staticmethod
+    def save(digest, df):
+        """Write a snapshot atomically; Parquet when Arrow can represent the frame, pickle otherwise"""
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        parquet_path, pickle_path = SnapshotManager.snapshot_paths(digest)
+        
+        if PARQUET_AVAILABLE:
+            tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+            try:
+                df.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, parquet_path)
+                return parquet_path
+            except Exception:
+                # Mixed-type columns (e.g. Size holding both 1/4 and 0) cannot be stored in Arrow
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        
+        tmp_path = f"{pickle_path}.{os.getpid()}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, pickle_path)
+        return pickle_path
+    
+    @staticmethod
+    def read_excel_bytes(data, source_label="", digest=None):
+        """Return the parsed workbook, parsing the xlsx only when no snapshot matches its hash"""
+        digest = digest or SnapshotManager.content_hash(data)
+        df = SnapshotManager.load(digest)
+        if df is not None:
+            OperationLog.log_operation(f"Snapshot Hit: {source_label}", True, f"Hash: {digest[:12]}")
+            return df
+        
+        df = pd.read_excel(BytesIO(data))
+        try:
+            snapshot_path = SnapshotManager.save(digest, df)
+            OperationLog.log_operation(f"Snapshot Write: {source_label}", True, os.path.basename(snapshot_path))
+        except OSError as e:
+            OperationLog.log_operation(f"Snapshot Write: {source_label}", False, str(e))
+        return df
+
+class SourceValidatorStore:
+    """HTTP validators (ETag / Last-Modified) and content hashes for remote sheets, kept next to the snapshots"""
+    
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def manifest_path():
+        return os.path.join(SNAPSHOT_DIR, "sources.json")
+    
+    @staticmethod
+    def _read_manifest():
+        try:
+            with open(SourceValidatorStore.manifest_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def get(source_url):
+        """Stored validators for a URL, only if its snapshot still exists"""
+        entry = SourceValidatorStore._read_manifest().get(source_url)
+        if not entry or not entry.get('sha256'):
+            return None
+        parquet_path, pickle_path = SnapshotManager.snapshot_paths(entry['sha256'])
+        if not (os.path.exists(parquet_path) or os.path.exists(pickle_path)):
+            return None
+        return entry
+    
+    @staticmethod
+    def conditional_headers(entry):
+        """If-None-Match / If-Modified-Since headers for a stored entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    @staticmethod
+    def record(source_url, response, digest):
+        """Persist the validators returned with a full response"""
+        with SourceValidatorStore._lock:
+            manifest = SourceValidatorStore._read_manifest()
+            manifest[source_url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': digest,
+                'checked_at': datetime.now().isoformat()
+            }
+            try:
+                os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+                tmp_path = f"{SourceValidatorStore.manifest_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2)
+                os.replace(tmp_path, SourceValidatorStore.manifest_path())
+            except OSError as e:
+                OperationLog.log_operation(f"Record Validators: {source_url}", False, str(e))
+
+# ======================================================
+# ENHANCED CONFIGURATION & ERROR HANDLING
+# ======================================================
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+def load_excel_source(path_or_url, max_retries=3, timeout=30, session=None, deadline=None):
+    """Load one workbook without touching the UI; returns (df, messages) where messages are (level, text)"""
+    messages = []
+    http = session or requests
+    
+    for attempt in range(max_retries):
+        attempt_timeout = timeout
+        if deadline is not None:
+            attempt_timeout = min(timeout, deadline - time.monotonic())
+            if attempt_timeout <= 0:
+                messages.append(("error", f"Deadline exceeded loading {path_or_url}"))
+                OperationLog.log_operation(f"Load Excel File: {path_or_url}", False, "Deadline exceeded")
+                return pd.DataFrame(), messages
+        
+        try:
+            if path_or_url.startswith('http'):
+                validators = SourceValidatorStore.get(path_or_url)
+                headers = dict(HTTP_HEADERS, **SourceValidatorStore.conditional_headers(validators))
+                response = http.get(path_or_url, headers=headers, timeout=attempt_timeout)
+                
+                if response.status_code == 304 and validators:
+                    # Unchanged upstream - serve the stored snapshot without downloading or parsing
+                    df = SnapshotManager.load(validators['sha256'])
+                    if df is None:
+                        SourceValidatorStore.record(path_or_url, response, None)
+                        continue
+                    OperationLog.log_operation(f"Revalidated (304): {path_or_url}", True, f"Hash: {validators['sha256'][:12]}")
+                else:
+                    response.raise_for_status()
+                    
+                    if len(response.content) < 100:
+                        messages.append(("warning", f"File seems too small: {path_or_url}"))
+                        continue
+                    
+                    digest = SnapshotManager.content_hash(response.content)
+                    df = SnapshotManager.read_excel_bytes(response.content, path_or_url, digest=digest)
+                    SourceValidatorStore.record(path_or_url, response, digest)
+            else:
+                if os.path.exists(path_or_url):
+                    file_size = os.path.getsize(path_or_url)
+                    if file_size < 100:
+                        messages.append(("warning", f"File seems too small: {path_or_url}"))
+                        continue
+                    with open(path_or_url, 'rb') as f:
+                        df = SnapshotManager.read_excel_bytes(f.read(), path_or_url)
+                else:
+                    messages.append(("error", f"File not found: {path_or_url}"))
+                    return pd.DataFrame(), messages
+            
+            if df.empty:
+                messages.append(("warning", f"Empty dataframe loaded from: {path_or_url}"))
+                return pd.DataFrame(), messages
+            
+            if len(df.columns) < 2:
+                messages.append(("warning", f"Dataframe has too few columns: {path_or_url}"))
+                return pd.DataFrame(), messages
+            
+            OperationLog.log_operation(f"Load Excel File: {path_or_url}", True, f"Rows: {len(df)}, Columns: {len(df.columns)}")
+            return df, messages
+        
+        except Exception as e:
+            if attempt == max_retries - 1:
+                messages.append(("error", f"Error loading {path_or_url}: {str(e)}"))
+                OperationLog.log_operation(f"Load Excel File: {path_or_url}", False, str(e))
+                return pd.DataFrame(), messages
+            time.sleep(1)
+    
+    return pd.DataFrame(), messages
+
+# ======================================================
+# CONCURRENT REFERENCE DATA LOADING
+# ======================================================
+STARTUP_FETCH_DEADLINE = 60  # seconds for the whole set of sheets, not per sheet
+
+def get_reference_sources():
+    """All reference workbooks as {key: (primary, fallback)}"""
+    sources = {
+        'main': (url, local_excel_path),
+        'mechem': (me_chem_google_url, me_chem_path),
+        'iso4014': (iso4014_file_url, iso4014_local_path),
+        'din7991': (din7991_file_url, din7991_local_path),
+        'asme_b18_3': (asme_b18_3_file_url, asme_b18_3_local_path),
+    }
+    for standard_name, thread_url in thread_files.items():
+        sources[f"thread:{standard_name}"] = (thread_url, None)
+    return sources
+
+def get_bundled_reference_sources():
+    """The bundled workbooks as {key: (path, None)}, same keys as get_reference_sources"""
+    return {key: (os.path.join(BUNDLED_DATA_DIR, name), None) for key, name in bundled_workbooks.items()}
+
+def _close_session_when_done(futures, session):
+    """Close the shared session only after fetches that outlived the deadline have returned"""
+    wait(futures)
+    session.close()
+
+def load_reference_sources_concurrently(sources, deadline_seconds=STARTUP_FETCH_DEADLINE):
+    """Fetch all sources at once over a shared connection pool, bounded by one global deadline,
+    then read the local copy of every source the fetch did not deliver"""
+    deadline = time.monotonic() + deadline_seconds
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=len(sources), pool_maxsize=len(sources))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    tables = {key: pd.DataFrame() for key in sources}
+    messages = []
+    pool = ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix="reference-fetch")
+    futures = {
+        pool.submit(load_excel_source, primary, session=session, deadline=deadline): key
+        for key, (primary, fallback) in sources.items() if primary
+    }
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+    
+    for future in done:
+        key = futures[future]
+        try:
+            tables[key], source_messages = future.result()
+            messages.extend(source_messages)
+        except Exception as e:
+            messages.append(("error", f"Error loading {key}: {str(e)}"))
+    
+    for future in not_done:
+        future.cancel()
+        messages.append(("error", f"Timed out loading {futures[future]} after {deadline_seconds}s"))
+    pool.shutdown(wait=False, cancel_futures=True)
+    if not_done:
+        threading.Thread(target=_close_session_when_done, args=(list(not_done), session),
+                         name="reference-fetch-close", daemon=True).start()
+    else:
+        session.close()
+    
+    # The deadline only bounds the network; local copies are always read
+    for key, (primary, fallback) in sources.items():
+        if tables[key].empty and fallback:
+            messages.append(("info", f"Online file not accessible, trying local version: {fallback}"))
+            tables[key], fallback_messages = load_excel_source(fallback)
+            messages.extend(fallback_messages)
+    
+    loaded = sum(not table.empty for table in tables.values())
+    OperationLog.log_operation("Concurrent Reference Load", loaded == len(sources), f"Sources: {len(sources)}, Loaded: {loaded}")
+    return tables, messages
+
+
+# ======================================================
+# BACKGROUND REFRESH OF REFERENCE DATA (STALE-WHILE-REVALIDATE)
+# ======================================================
+REFERENCE_REFRESH_INTERVAL = 3600
+
+def prepare_thread_table(standard_name, df_thread):
+    """Standardize a raw thread workbook to Thread/Class/Standard columns"""
+    df_thread = df_thread.copy()
+    df_thread.columns = [str(col).strip() for col in df_thread.columns]
+    
+    # Handle different column naming patterns
+    thread_col = None
+    class_col = None
+    
+    # Find thread size column
+    possible_thread_cols = ['Thread', 'Size', 'Thread Size', 'Nominal Size', 'Basic Major Diameter']
+    for col in df_thread.columns:
+        col_lower = str(col).lower()
+        for possible in possible_thread_cols:
+            if possible.lower() in col_lower:
+                thread_col = col
+                break
+        if thread_col:
+            break
+    
+    # Find class/tolerance column
+    possible_class_cols = ['Class', 'Tolerance', 'Tolerance Class', 'Thread Class']
+    for col in df_thread.columns:
+        col_lower = str(col).lower()
+        for possible in possible_class_cols:
+            if possible.lower() in col_lower:
+                class_col = col
+                break
+        if class_col:
+            break
+    
+    # If no specific class column found, check for columns containing tolerance info
+    if not class_col:
+        for col in df_thread.columns:
+            if 'tolerance' in str(col).lower() or 'class' in str(col).lower():
+                class_col = col
+                break
+    
+    # Standardize column names for consistent processing
+    if thread_col:
+        df_thread = df_thread.rename(columns={thread_col: 'Thread'})
+    
+    if class_col:
+        df_thread = df_thread.rename(columns={class_col: 'Class'})
+    
+    # Clean data - convert all to string and handle NaN
+    if 'Thread' in df_thread.columns:
+        df_thread['Thread'] = df_thread['Thread'].astype(str).str.strip()
+        df_thread = df_thread[df_thread['Thread'] != 'nan']
+        df_thread = df_thread[df_thread['Thread'] != '']
+    
+    if 'Class' in df_thread.columns:
+        df_thread['Class'] = df_thread['Class'].astype(str).str.strip()
+        df_thread = df_thread[df_thread['Class'] != 'nan']
+        df_thread = df_thread[df_thread['Class'] != '']
+    
+    # Add standard identifier
+    df_thread['Standard'] = standard_name
+    
+    return df_thread
+
+def normalize_reference_tables(raw_tables):
+    """Build the served tables from raw workbooks without touching the originals"""
+    tables = {key: table.copy() for key, table in raw_tables.items() if not key.startswith("thread:")}
+    messages = []
+    
+    df_din = tables.get('din7991', pd.DataFrame())
+    if not df_din.empty:
+        if 'Product' not in df_din.columns:
+            df_din['Product'] = "Hexagon Socket Countersunk Head Cap Screw"
+        if 'Standards' not in df_din.columns:
+            df_din['Standards'] = "DIN-7991"
+    
+    df_b18_3 = tables.get('asme_b18_3', pd.DataFrame())
+    if not df_b18_3.empty:
+        if 'Product' not in df_b18_3.columns:
+            df_b18_3['Product'] = "Hexagon Socket Head Cap Screws"
+        if 'Standards' not in df_b18_3.columns:
+            df_b18_3['Standards'] = "ASME B18.3"
+    
+    df_iso = tables.get('iso4014', pd.DataFrame())
+    if not df_iso.empty:
+        product_col = None
+        for col in df_iso.columns:
+            if 'product' in col.lower():
+                product_col = col
+                break
+        
+        if product_col:
+            df_iso['Product'] = df_iso[product_col]
+        else:
+            df_iso['Product'] = "Hex Bolt"
+        
+        df_iso['Standards'] = "ISO-4014-2011"
+        
+        grade_col = None
+        for col in df_iso.columns:
+            if 'grade' in col.lower():
+                grade_col = col
+                break
+        
+        if grade_col and grade_col != 'Product Grade':
+            df_iso['Product Grade'] = df_iso[grade_col]
+    
+    threads = {}
+    for key, raw_thread in raw_tables.items():
+        if not key.startswith("thread:"):
+            continue
+        standard_name = key.split(":", 1)[1]
+        if raw_thread.empty:
+            threads[standard_name] = pd.DataFrame()
+            continue
+        try:
+            threads[standard_name] = prepare_thread_table(standard_name, raw_thread)
+            OperationLog.log_operation(f"Load Thread Data: {standard_name}", True, f"Records: {len(threads[standard_name])}")
+        except Exception as e:
+            threads[standard_name] = pd.DataFrame()
+            messages.append(("error", f"Error loading thread data for {standard_name}: {str(e)}"))
+            OperationLog.log_operation(f"Load Thread Data: {standard_name}", False, str(e))
+    
+    return tables, threads, messages
+
+def compute_reference_version(tables, threads):
+    """Content hash over every served table, stable across processes"""
+    hasher = hashlib.sha256()
+    for key, table in sorted(list(tables.items()) + [(f"thread:{k}", v) for k, v in threads.items()]):
+        hasher.update(key.encode())
+        hasher.update(",".join(map(str, table.columns)).encode())
+        try:
+            row_hashes = pd.util.hash_pandas_object(table, index=False)
+        except TypeError:
+            row_hashes = pd.util.hash_pandas_object(table.astype(str), index=False)
+        hasher.update(row_hashes.values.tobytes())
+    return hasher.hexdigest()[:16]
+
+# ======================================================
+# DIMENSION LOOKUP INDEX
+# ======================================================
+STANDARD_TABLE_KEYS = {
+    "ASME B18.2.1": 'main',
+    "ISO 4014": 'iso4014',
+    "DIN-7991": 'din7991',
+    "ASME B18.3": 'asme_b18_3',
+}
+
+STANDARD_UNITS = {
+    "ASME B18.2.1": "inch",
+    "ISO 4014": "mm",
+    "DIN-7991": "mm",
+    "ASME B18.3": "inch",
+}
+
+STANDARD_SERIES = {
+    "ASME B18.2.1": "Inch",
+    "ISO 4014": "Metric",
+    "DIN-7991": "Metric",
+    "ASME B18.3": "Inch",
+}
+
+class DimensionIndex:
+    """Row positions keyed by (standard, product, size, grade), built once per snapshot"""
+    
+    EMPTY = np.array([], dtype=np.intp)
+    
+    def __init__(self, tables):
+        self.tables = {}
+        self._positions = {}
+        for standard, key in STANDARD_TABLE_KEYS.items():
+            table = tables.get(key, pd.DataFrame())
+            self.tables[standard] = table
+            if not table.empty:
+                self._index_table(standard, table)
+        self._positions = {key: np.array(rows, dtype=np.intp) for key, rows in self._positions.items()}
+    
+    @staticmethod
+    def normalize_size(size):
+        """Size key used for matching, same as the old astype(str).str.strip() comparison"""
+        return str(size).strip()
+    
+    @staticmethod
+    def _key_options(value):
+        """A row is reachable by its own value and by the "All" wildcard"""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return ("All",)
+        return (value, "All")
+    
+    def _index_table(self, standard, table):
+        """Register every row under each combination of exact and wildcard keys"""
+        row_count = len(table)
+        products = table['Product'].tolist() if 'Product' in table.columns else [None] * row_count
+        sizes = table['Size'].map(self.normalize_size).tolist() if 'Size' in table.columns else [None] * row_count
+        if standard == "ISO 4014" and 'Product Grade' in table.columns:
+            grades = table['Product Grade'].tolist()
+        else:
+            grades = [None] * row_count
+        
+        for position, (product, size, grade) in enumerate(zip(products, sizes, grades)):
+            for product_key in self._key_options(product):
+                for size_key in self._key_options(size):
+                    for grade_key in self._key_options(grade):
+                        self._positions.setdefault((standard, product_key, size_key, grade_key), []).append(position)
+    
+    def filter_key(self, standard, product="All", size="All", grade="All"):
+        """Index key for a filter, with filters on missing columns widened to All"""
+        table = self.tables.get(standard)
+        if 'Product' not in table.columns:
+            product = "All"
+        size_key = self.normalize_size(size) if size != "All" and 'Size' in table.columns else "All"
+        if standard != "ISO 4014" or 'Product Grade' not in table.columns:
+            grade = "All"
+        return (standard, product, size_key, grade)
+    
+    def positions(self, standard, product="All", size="All", grade="All"):
+        """Matching row positions in table order"""
+        table = self.tables.get(standard)
+        if table is None or table.empty:
+            return self.EMPTY
+        try:
+            return self._positions.get(self.filter_key(standard, product, size, grade), self.EMPTY)
+        except TypeError:
+            return self.EMPTY
+
+# ======================================================
+# RESULT VIEWS - ROW POSITIONS INTO SHARED TABLES
+# ======================================================
+class ResultView:
+    """Query result kept as row positions into a shared table; materialized only to render or export"""
+    
+    def __init__(self, table=None, positions=None, parts=None):
+        self.table = table if table is not None else pd.DataFrame()  # shared frame, never modified
+        self.positions = positions  # None means every row
+        self.parts = parts  # [(section label, ResultView)] for combined results
+    
+    @staticmethod
+    def combine(labelled_views):
+        """One view over several section results, tagged with a Section column when materialized"""
+        return ResultView(parts=[(label, view) for label, view in labelled_views if not view.empty])
+    
+    def __len__(self):
+        if self.parts is not None:
+            return sum(len(view) for _, view in self.parts)
+        if self.table.columns.empty:
+            return 0
+        return len(self.table) if self.positions is None else len(self.positions)
+    
+    @property
+    def empty(self):
+        return len(self) == 0
+    
+    def frame(self):
+        """The result rows as a DataFrame"""
+        if self.parts is not None:
+            frames = [view.frame().assign(Section=label) for label, view in self.parts]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if self.positions is None:
+            return self.table
+        return self.table.iloc[self.positions]
+
+# ======================================================
+# STANDARDS TABLE QUERIES
+# ======================================================
+def query_standard_table(standard, product="All", size="All", grade="All", series="All", snapshot=None):
+    """Rows of a dimensional standard matching product, size, grade and series, as a view over the shared table"""
+    dimension_index = (snapshot or get_reference_snapshot()).dimension_index
+    table = dimension_index.tables.get(standard)
+    if table is None:
+        return ResultView()
+    
+    # Series is a property of the whole standard, so it either keeps or drops every row
+    if series not in ("All", None) and STANDARD_SERIES.get(standard) != series:
+        return ResultView(table, DimensionIndex.EMPTY)
+    
+    return ResultView(table, dimension_index.positions(standard, product, size, grade))
+
+def get_thread_row_positions(df_thread, thread_size=None, thread_class=None):
+    """Positions of thread rows matching the size and class filters"""
+    mask = np.ones(len(df_thread), dtype=bool)
+    
+    if thread_size and thread_size != "All" and "Thread" in df_thread.columns:
+        # Use exact match for thread size including TPI (e.g., "3/8-16")
+        mask &= (df_thread["Thread"].astype(str).str.strip() == str(thread_size).strip()).to_numpy()
+    
+    if thread_class and thread_class != "All" and "Class" in df_thread.columns:
+        mask &= (
+            df_thread["Class"].astype(str).str.strip().str.upper() == 
+            str(thread_class).strip().upper()
+        ).to_numpy()
+    
+    return np.flatnonzero(mask)
+
+# ======================================================
+# COLUMN ROLE RESOLUTION - ONE SCHEMA MAP PER TABLE
+# ======================================================
+class TableSchemaResolver:
+    """Resolve which column plays each role once per loaded table, so lookups skip keyword scans"""
+    
+    PROPERTY_CLASS_KEYWORDS = ['Grade', 'Class', 'Property Class', 'Material Grade', 'Type', 'Designation', 'Material']
+    STANDARD_KEYWORDS = ['Standard', 'Specification', 'Norm', 'Type', 'Designation']
+    
+    @staticmethod
+    def _prefer(candidates, keyword):
+        """First candidate containing keyword, else the first candidate"""
+        for col in candidates:
+            if keyword in col.lower():
+                return col
+        return candidates[0] if candidates else None
+    
+    @staticmethod
+    def _keyword_columns(columns, keywords):
+        """Columns whose name contains any keyword, in table order"""
+        matches = []
+        for col in columns:
+            col_lower = str(col).lower()
+            for possible in keywords:
+                if possible.lower() in col_lower:
+                    matches.append(col)
+                    break
+        return matches
+    
+    @staticmethod
+    def hex_head_roles(columns):
+        """Width across flats and head height columns for hex products, preferring min"""
+        width_cols = [col for col in columns if any(keyword in col.lower() for keyword in ['width', 'across', 'flats', 'w_'])]
+        height_cols = [col for col in columns if any(keyword in col.lower() for keyword in ['head', 'height', 'head_height'])]
+        return {
+            'width_across_flats': TableSchemaResolver._prefer(width_cols, 'min'),
+            'head_height': TableSchemaResolver._prefer(height_cols, 'min'),
+        }
+    
+    @staticmethod
+    def asme_b18_3_roles(columns):
+        """Head diameter (min) and head height (min) columns for ASME B18.3, plus ordered fallbacks"""
+        head_dia_columns = [
+            'Head Diameter (Min)', 'Head_Diameter_Min', 'Head Dia Min', 
+            'Head Diameter Min', 'Head_Dia_Min', 'dk_min', 'Head_D_Min'
+        ]
+        head_height_columns = [
+            'Head Height (Min)', 'Head_Height_Min', 'Head Height Min',
+            'Head_Ht_Min', 'k_min', 'Head_H_Min'
+        ]
+        
+        def exact_or_partial(targets, words):
+            for col in columns:
+                col_clean = str(col).strip().lower()
+                if any(target.lower() == col_clean for target in targets):
+                    return col
+            for col in columns:
+                col_lower = str(col).lower()
+                if all(word in col_lower for word in words):
+                    return col
+            return None
+        
+        return {
+            'socket_head_diameter': exact_or_partial(head_dia_columns, ['head', 'diameter', 'min']),
+            'socket_head_height': exact_or_partial(head_height_columns, ['head', 'height', 'min']),
+            'socket_head_diameter_fallbacks': [
+                col for col in columns
+                if 'head' in str(col).lower() and 'diameter' in str(col).lower()
+                and 'thread' not in str(col).lower() and 'body' not in str(col).lower()
+            ],
+            'socket_head_height_fallbacks': [
+                col for col in columns if 'head' in str(col).lower() and 'height' in str(col).lower()
+            ],
+        }
+    
+    @staticmethod
+    def din7991_roles(columns):
+        """Head diameter (dk) and head height (k) columns for DIN-7991"""
+        head_dia_cols = [col for col in columns if any(keyword in col.lower() for keyword in ['dk', 'head diameter', 'head_dia'])]
+        head_dia_col = None
+        for col in head_dia_cols:
+            if 'dk' in col.lower():
+                head_dia_col = col
+                break
+        if not head_dia_col:
+            head_dia_col = TableSchemaResolver._prefer(head_dia_cols, 'min')
+        
+        head_height_cols = [col for col in columns if any(keyword in col.lower() for keyword in ['k', 'head height', 'head_height'])]
+        head_height_col = None
+        for col in head_height_cols:
+            if col.lower() == 'k' or 'head height' in col.lower():
+                head_height_col = col
+                break
+        if not head_height_col:
+            head_height_col = TableSchemaResolver._prefer(head_height_cols, 'max')
+        
+        return {'socket_head_diameter': head_dia_col, 'socket_head_height': head_height_col}
+    
+    @staticmethod
+    def thread_roles(columns):
+        """Pitch diameter column for thread tables, preferring the minimum"""
+        pitch_dia_cols = [col for col in columns if 'pitch' in col.lower() and 'diameter' in col.lower() and 'min' in col.lower()]
+        pitch_dia_cols.extend([col for col in columns if 'pitch' in col.lower() and 'diameter' in col.lower() and col not in pitch_dia_cols])
+        if not pitch_dia_cols:
+            for col in columns:
+                col_lower = col.lower()
+                if 'diameter' in col_lower and 'pitch' not in col_lower and 'major' not in col_lower and 'minor' not in col_lower:
+                    pitch_dia_cols.append(col)
+        return {'pitch_diameter': pitch_dia_cols[0] if pitch_dia_cols else None}
+    
+    @staticmethod
+    def mechem_roles(df_mechem):
+        """Property class and standard columns for the Mechanical & Chemical table"""
+        property_class_cols = TableSchemaResolver._keyword_columns(df_mechem.columns, TableSchemaResolver.PROPERTY_CLASS_KEYWORDS)
+        
+        # Without named class columns, fall back to the first text column among the first three
+        text_fallback_cols = []
+        for col in df_mechem.columns[:3]:
+            if df_mechem[col].dtype == 'object':
+                text_fallback_cols.append(col)
+                break
+        
+        standard_cols = TableSchemaResolver._keyword_columns(df_mechem.columns, TableSchemaResolver.STANDARD_KEYWORDS)
+        
+        # Without named standard columns, fall back to the first column named after a standards body
+        standard_fallback_cols = []
+        for col in df_mechem.columns:
+            if any(word in col.lower() for word in ['iso', 'astm', 'asme', 'din', 'bs', 'jis', 'gb']):
+                standard_fallback_cols.append(col)
+                break
+        
+        return {
+            'property_class_columns': property_class_cols,
+            'property_class_columns_or_fallback': property_class_cols or text_fallback_cols,
+            'standard_columns': standard_cols,
+            'standard_columns_or_fallback': standard_cols or standard_fallback_cols,
+        }
+    
+    @staticmethod
+    def resolve_all(tables, threads):
+        """Schema map for every served table, keyed like the dimension index and thread tables"""
+        schemas = {}
+        for standard, key in STANDARD_TABLE_KEYS.items():
+            columns = tables.get(key, pd.DataFrame()).columns
+            roles = TableSchemaResolver.hex_head_roles(columns)
+            if standard == "ASME B18.3":
+                roles.update(TableSchemaResolver.asme_b18_3_roles(columns))
+            elif standard == "DIN-7991":
+                roles.update(TableSchemaResolver.din7991_roles(columns))
+            schemas[standard] = roles
+        for standard_name, df_thread in threads.items():
+            schemas[f"thread:{standard_name}"] = TableSchemaResolver.thread_roles(df_thread.columns)
+        schemas['mechem'] = TableSchemaResolver.mechem_roles(tables.get('mechem', pd.DataFrame()))
+        return schemas
+
+# ======================================================
+# PITCH DIAMETER RESOLVER - PRECOMPUTED PER SNAPSHOT
+# ======================================================
+PITCH_CACHE_MAX_ENTRIES = 50000
+
+class PitchDiameterResolver:
+    """(thread standard, size, class) -> pitch diameter, with nominal-size fallback and cached misses"""
+    
+    def __init__(self, threads, schemas):
+        self._tables = {
+            standard_name: PitchDiameterResolver._first_values(df_thread, schemas.get(f"thread:{standard_name}", {}).get('pitch_diameter'))
+            for standard_name, df_thread in threads.items()
+            if not df_thread.empty
+        }
+        self._memo = {}
+    
+    @staticmethod
+    def size_key(thread_size):
+        """Normalized size filter; None means the size is not filtered"""
+        if not thread_size or thread_size == "All":
+            return None
+        return str(thread_size).strip()
+    
+    @staticmethod
+    def class_key(thread_class):
+        """Normalized class filter; None means the class is not filtered"""
+        if not thread_class or thread_class == "All":
+            return None
+        return str(thread_class).strip().upper()
+    
+    @staticmethod
+    def _first_values(df_thread, pitch_col):
+        """First pitch diameter value for every size/class filter combination, in table order"""
+        values = df_thread[pitch_col].tolist() if pitch_col and pitch_col in df_thread.columns else [None] * len(df_thread)
+        sizes = df_thread["Thread"].astype(str).str.strip().tolist() if "Thread" in df_thread.columns else None
+        classes = df_thread["Class"].astype(str).str.strip().str.upper().tolist() if "Class" in df_thread.columns else None
+        
+        first = {}
+        for position, value in enumerate(values):
+            size = sizes[position] if sizes is not None else None
+            thread_class = classes[position] if classes is not None else None
+            for key in ((size, thread_class), (size, None), (None, thread_class), (None, None)):
+                first.setdefault(key, value)
+        return {
+            'first': first,
+            'filters_size': sizes is not None,
+            'filters_class': classes is not None
+        }
+    
+    def _lookup(self, standard, size_key, class_key):
+        """(found, value) for the first row matching the filters"""
+        table = self._tables.get(standard)
+        if table is None:
+            return False, None
+        key = (size_key if table['filters_size'] else None, class_key if table['filters_class'] else None)
+        if key in table['first']:
+            return True, table['first'][key]
+        return False, None
+    
+    def resolve(self, thread_standard, thread_size, thread_class):
+        """Raw pitch diameter value, or None when the thread is unknown or has no value"""
+        memo_key = (thread_standard, PitchDiameterResolver.size_key(thread_size), PitchDiameterResolver.class_key(thread_class))
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        
+        found, value = self._lookup(*memo_key)
+        if not found and '-' in str(thread_size):
+            # Try with just the nominal size if full size not found
+            nominal_size = str(thread_size).split('-')[0].strip()
+            found, value = self._lookup(thread_standard, PitchDiameterResolver.size_key(nominal_size), memo_key[2])
+        if not found or pd.isna(value):
+            value = None
+        
+        if len(self._memo) >= PITCH_CACHE_MAX_ENTRIES:
+            self._memo.clear()
+        self._memo[memo_key] = value
+        return value
+
+# ======================================================
+# DROPDOWN OPTION CATALOG - PRECOMPUTED PER SNAPSHOT
+# ======================================================
+class OptionCatalog:
+    """Every cascading selector's option list, computed once per snapshot and never mutated"""
+    
+    def __init__(self, dimension_index, threads):
+        self.dimension_index = dimension_index
+        self.sizes = {}
+        for key, positions in dimension_index._positions.items():
+            standard, product, size, grade = key
+            if size == "All":
+                self.sizes[key] = tuple(get_safe_size_options(dimension_index.tables[standard].iloc[positions]))
+        
+        # Only ISO 4014 Hex Bolt has product grades A and B
+        self.grades = {
+            ("ISO 4014", "Hex Bolt"): tuple(OptionCatalog.grade_options(dimension_index.tables["ISO 4014"], "Hex Bolt"))
+        }
+        self.thread_sizes = {
+            standard_name: tuple(OptionCatalog.thread_size_options(standard_name, df_thread))
+            for standard_name, df_thread in threads.items()
+        }
+        self.thread_classes = {
+            standard_name: tuple(OptionCatalog.thread_class_options(standard_name, df_thread))
+            for standard_name, df_thread in threads.items()
+        }
+    
+    @staticmethod
+    def grade_options(temp_df, product):
+        """Grade options for one product of a grade-carrying table"""
+        grade_options = ["All"]
+        
+        # Filter by product if specified
+        if product != "All" and 'Product' in temp_df.columns:
+            temp_df = temp_df[temp_df['Product'] == product]
+        
+        # Get grade options from the data
+        if 'Product Grade' in temp_df.columns:
+            unique_grades = temp_df['Product Grade'].dropna().unique()
+            unique_grades = [str(grade).strip() for grade in unique_grades if str(grade).strip() != '']
+            if len(unique_grades) > 0:
+                grade_options.extend(sorted(unique_grades))
+        else:
+            # Default grades for ISO 4014 Hex Bolt
+            grade_options.extend(["A", "B"])
+        
+        return grade_options
+    
+    @staticmethod
+    def thread_size_options(standard_name, df_thread):
+        """Sorted thread sizes of one thread table"""
+        if df_thread.empty or "Thread" not in df_thread.columns:
+            return ["All"]
+        
+        try:
+            # Get unique sizes and handle NaN values properly
+            unique_sizes = df_thread['Thread'].dropna().unique()
+            
+            # Convert all sizes to string and filter out empty strings
+            unique_sizes = [str(size).strip() for size in unique_sizes if str(size).strip() != '']
+            
+            if len(unique_sizes) > 0:
+                return ["All"] + safe_sort_sizes(unique_sizes)
+            return ["All"]
+        except Exception as e:
+            CalculationIssues.report("warning", f"Thread size processing warning for {standard_name}: {str(e)}")
+            return ["All"]
+    
+    @staticmethod
+    def thread_class_options(standard_name, df_thread):
+        """Sorted thread classes of one thread table"""
+        if df_thread.empty or "Class" not in df_thread.columns:
+            return ["All"]
+        
+        try:
+            # Get unique classes and handle NaN values properly
+            unique_classes = df_thread['Class'].dropna().unique()
+            
+            # Convert all classes to string and filter out empty strings
+            unique_classes = [str(cls).strip() for cls in unique_classes if str(cls).strip() != '']
+            
+            if len(unique_classes) > 0:
+                return ["All"] + sorted(unique_classes)
+            return ["All"]
+        except Exception as e:
+            CalculationIssues.report("warning", f"Thread class processing warning for {standard_name}: {str(e)}")
+            return ["All"]
+    
+    def size_options(self, standard, product="All", grade="All"):
+        """["All", sizes...] for a standard/product/grade selection"""
+        if standard not in self.dimension_index.tables:
+            return ["All"]
+        try:
+            key = self.dimension_index.filter_key(standard, product, "All", grade)
+            return list(self.sizes.get(key, ("All",)))
+        except TypeError:
+            return ["All"]
+    
+    def grade_options_for(self, standard, product):
+        """["All", grades...] for a standard/product selection"""
+        return list(self.grades.get((standard, product), ("All",)))
+    
+    def thread_sizes_for(self, standard_name):
+        """["All", thread sizes...] for a thread standard"""
+        return list(self.thread_sizes.get(standard_name, ("All",)))
+    
+    def thread_classes_for(self, standard_name):
+        """["All", thread classes...] for a thread standard"""
+        return list(self.thread_classes.get(standard_name, ("All",)))
+
+class ReferenceSnapshot:
+    """Immutable set of reference tables served to every session"""
+    
+    def __init__(self, tables, threads, messages):
+        self.tables = tables
+        self.threads = threads
+        self.messages = messages
+        self.version = compute_reference_version(tables, threads)
+        self.dimension_index = DimensionIndex(tables)
+        self.schemas = TableSchemaResolver.resolve_all(tables, threads)
+        self.pitch_diameters = PitchDiameterResolver(threads, self.schemas)
+        self.loaded_at = time.monotonic()
+        self.loaded_on = datetime.now()
+        self._derived = {}
+        self._builders = {}
+        self._derived_lock = threading.RLock()
+        self._building = set()
+        self._building_lock = threading.Lock()
+    
+    def derived(self, name, build):
+        """Value computed once from this snapshot by build(snapshot) and shared by every session"""
+        if name not in self._derived:
+            with self._derived_lock:
+                if name not in self._derived:
+                    self._derived[name] = build(self)
+                    self._builders[name] = build
+        return self._derived[name]
+    
+    def derived_in_background(self, name, build):
+        """Like derived, but never waits: None until a background thread has built the value"""
+        if name in self._derived:
+            return self._derived[name]
+        with self._building_lock:
+            if name in self._building:
+                return self._derived.get(name)
+            self._building.add(name)
+        threading.Thread(target=self._derive_logged, args=(name, build), name=f"derive-{name}", daemon=True).start()
+        return None
+    
+    def _derive_logged(self, name, build):
+        """Background worker for derived_in_background"""
+        try:
+            self.derived(name, build)
+        except Exception as e:
+            OperationLog.log_operation(f"Build {name}", False, str(e))
+    
+    def warm_from(self, previous):
+        """Build every derived value the previous snapshot had, so no rerun pays for it"""
+        for name, build in list(previous._builders.items()):
+            self.derived(name, build)
+    
+    @property
+    def options(self):
+        """Dropdown option catalog, built on first use and kept for the snapshot's lifetime"""
+        return self.derived("options", lambda snapshot: OptionCatalog(snapshot.dimension_index, snapshot.threads))
+
+class ReferenceDataRefresher:
+    """Serve the current snapshot and rebuild a stale one in a background thread"""
+    
+    def __init__(self, max_age=REFERENCE_REFRESH_INTERVAL, sources=None):
+        self.max_age = max_age
+        self.sources = sources
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+    
+    @Spans.span("reference_load")
+    def _build(self, previous=None):
+        """Fetch and normalize every source, keeping previous tables for sources that failed"""
+        raw_tables, messages = load_reference_sources_concurrently(self.sources or get_reference_sources())
+        tables, threads, normalize_messages = normalize_reference_tables(raw_tables)
+        messages.extend(normalize_messages)
+        
+        if previous is not None:
+            for key, table in previous.tables.items():
+                if tables.get(key, pd.DataFrame()).empty and not table.empty:
+                    tables[key] = table
+                    OperationLog.log_operation("Reference Refresh", False, f"Keeping previous {key} table")
+            for key, table in previous.threads.items():
+                if threads.get(key, pd.DataFrame()).empty and not table.empty:
+                    threads[key] = table
+                    OperationLog.log_operation("Reference Refresh", False, f"Keeping previous thread:{key} table")
+            # Failures were covered by the previous data, so don't surface them to users
+            messages = [(level, text) for level, text in messages if level == "info"]
+        
+        return ReferenceSnapshot(tables, threads, messages)
+    
+    def _refresh(self):
+        """Background worker: rebuild and swap in the new snapshot"""
+        try:
+            snapshot = self._build(previous=self._snapshot)
+            if self._snapshot is not None:
+                # Build catalogs here, not on a user's rerun
+                snapshot.warm_from(self._snapshot)
+            self._snapshot = snapshot
+            OperationLog.log_operation("Reference Refresh", True, f"Version: {snapshot.version}")
+        except Exception as e:
+            OperationLog.log_operation("Reference Refresh", False, str(e))
+        finally:
+            with self._lock:
+                self._refreshing = False
+    
+    def refresh_in_background(self):
+        """Start a single refresh thread unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="reference-refresh", daemon=True).start()
+        return True
+    
+    def get(self):
+        """Current snapshot; only the very first call waits for a load"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                snapshot = self._snapshot
+        elif time.monotonic() - snapshot.loaded_at > self.max_age:
+            self.refresh_in_background()
+        return snapshot
+
+# Process-wide; nothing is fetched until the first snapshot is requested
+reference_refresher = ReferenceDataRefresher()
+
+def get_reference_refresher():
+    """Process-wide refresher shared by every session and caller"""
+    return reference_refresher
+
+def get_reference_snapshot():
+    """Reference snapshot currently being served"""
+    return get_reference_refresher().get()
+
+def use_reference_snapshot(snapshot):
+    """Serve this snapshot from now on without refreshing it, e.g. in a batch worker process"""
+    global reference_refresher
+    reference_refresher = ReferenceDataRefresher(max_age=float('inf'))
+    reference_refresher._snapshot = snapshot
+    return reference_refresher
+
+def use_reference_sources(sources):
+    """Serve reference data from these sources from now on, e.g. get_bundled_reference_sources()"""
+    global reference_refresher
+    reference_refresher = ReferenceDataRefresher(sources=sources)
+    return reference_refresher
+
+# ======================================================
+# ENHANCED BATCH CALCULATOR TEMPLATES WITH DIAMETER TYPE SUPPORT
+# ======================================================
+class BatchTemplateManager:
+    """Manage batch calculator templates with diameter type support"""
+    
+    @staticmethod
+    def extract_thread_info_from_size(size_str):
+        """PROPERLY extract thread size, pitch, and TPI from formats like '3/8-16'"""
+        try:
+            # Handle formats: "3/8-16", "1/2-13", "M10-1.5", "M10 X 1.5"
+            record = parse_fastener_size(size_str)
+            
+            if record.series == 'Metric' and record.pitch_mm is not None:
+                return f"M{record.nominal_mm:g}", None, record.pitch_mm
+            if record.series == 'Inch' and record.tpi is not None:
+                return size_str.rsplit('-', 1)[0].strip(), record.tpi, None
+            
+            return size_str, None, None
+        
+        except Exception as e:
+            CalculationIssues.report("warning", f"Error extracting thread info from '{size_str}': {str(e)}")
+            return size_str, None, None
+    
+    @staticmethod
+    def get_basic_template(diameter_type="Blank Diameter"):
+        """Get basic template with Product_Type column and diameter type support"""
+        if diameter_type == "Blank Diameter":
+            template_data = {
+                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
+                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
+                'Size': ['1/4', 'M10', '1/2-13', '5/16'],
+                'Length': [50, 75, 200, 100],
+                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
+                'Diameter_Value': [6.35, 10.0, 12.7, 7.94],
+                'Diameter_Unit': ['mm', 'mm', 'mm', 'mm'],
+                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
+                'Quantity': [100, 50, 25, 200]
+            }
+        else:  # Pitch Diameter
+            template_data = {
+                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
+                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
+                'Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
+                'Length': [50, 75, 200, 100],
+                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
+                'Thread_Standard': ['ASME B1.1', 'ASME B1.1', 'ASME B1.1', 'ASME B1.1'],
+                'Product_Standard': ['ASME B18.2.1', 'ASME B18.2.1', 'Not Required', 'ASME B18.2.1'],
+                'Thread_Class': ['2A', '3A', '2A', '1A'],  # Different classes for demonstration
+                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
+                'Quantity': [100, 50, 25, 200]
+            }
+        return pd.DataFrame(template_data)
+    
+    @staticmethod
+    def get_advanced_template(diameter_type="Blank Diameter"):
+        """Get advanced template with all parameters and diameter type support"""
+        if diameter_type == "Blank Diameter":
+            template_data = {
+                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hexagon Socket Head Cap Screws', 'Hex Bolt'],
+                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'SHS-001', 'HB-003'],
+                'Series': ['Inch', 'Metric', 'Inch', 'Inch', 'Metric'],
+                'Standard': ['ASME B18.2.1', 'ISO 4014', 'Not Required', 'ASME B18.3', 'ISO 4014'],
+                'Size': ['1/4', 'M10', '1/2-13', '1/4', 'M12'],
+                'Grade': ['N/A', 'A', 'N/A', 'N/A', 'B'],
+                'Diameter_Type': ['Blank Diameter', 'Blank Diameter', 'Blank Diameter', 'Blank Diameter', 'Blank Diameter'],
+                'Diameter_Value': [6.35, 10.0, 12.7, 6.35, 12.0],
+                'Diameter_Unit': ['mm', 'mm', 'mm', 'mm', 'mm'],
+                'Thread_Standard': ['N/A', 'N/A', 'ASME B1.1', 'N/A', 'N/A'],
+                'Thread_Size': ['N/A', 'N/A', '1/2-13', 'N/A', 'N/A'],
+                'Thread_Class': ['N/A', 'N/A', '2A', 'N/A', 'N/A'],
+                'Length': [50, 75, 200, 50, 100],
+                'Length_Unit': ['mm', 'mm', 'mm', 'mm', 'mm'],
+                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel', 'Carbon Steel'],
+                'Quantity': [100, 50, 25, 75, 150]
+            }
+        else:  # Pitch Diameter
+            template_data = {
+                'Product_Type': ['Hex Bolt', 'Hex Bolt', 'Threaded Rod', 'Hex Bolt'],
+                'Product_Code': ['HB-001', 'HB-002', 'TR-001', 'HB-003'],
+                'Series': ['Inch', 'Inch', 'Inch', 'Inch'],
+                'Standard': ['ASME B18.2.1', 'ASME B18.2.1', 'Not Required', 'ASME B18.2.1'],
+                'Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
+                'Grade': ['N/A', 'N/A', 'N/A', 'N/A'],
+                'Diameter_Type': ['Pitch Diameter', 'Pitch Diameter', 'Pitch Diameter', 'Pitch Diameter'],
+                'Thread_Standard': ['ASME B1.1', 'ASME B1.1', 'ASME B1.1', 'ASME B1.1'],
+                'Thread_Size': ['1/4-20', '5/16-18', '1/2-13', '3/8-16'],
+                'Thread_Class': ['2A', '3A', '2A', '1A'],
+                'Length': [50, 75, 200, 100],
+                'Length_Unit': ['mm', 'mm', 'mm', 'mm'],
+                'Material': ['Carbon Steel', 'Carbon Steel', 'Stainless Steel', 'Carbon Steel'],
+                'Quantity': [100, 50, 25, 200]
+            }
+        return pd.DataFrame(template_data)
+    
+    @staticmethod
+    def detect_input_mode(row):
+        """Detect whether row is in basic or advanced mode"""
+        basic_columns = ['Product_Type', 'Size', 'Length']
+        advanced_columns = ['Product_Type', 'Series', 'Standard', 'Diameter_Type']
+        
+        # Check if advanced columns are populated
+        advanced_mode = any(pd.notna(row.get(col, None)) for col in advanced_columns if col in row)
+        
+        # Check if basic columns are populated
+        basic_mode = all(pd.notna(row.get(col, None)) for col in basic_columns if col in row)
+        
+        if advanced_mode:
+            return "advanced"
+        elif basic_mode:
+            return "basic"
+        else:
+            return "invalid"
+    
+    @staticmethod
+    def infer_parameters_basic_mode(row, diameter_type="Blank Diameter"):
+        """Intelligently infer parameters from basic mode with diameter type support"""
+        try:
+            product_type = row.get('Product_Type', 'Hex Bolt')
+            product_code = row.get('Product_Code', '')
+            size = row.get('Size')
+            length = row.get('Length', 50.0)
+            length_unit = row.get('Length_Unit', 'mm')
+            material = row.get('Material', 'Carbon Steel')
+            quantity = row.get('Quantity', 1)
+            thread_standard = row.get('Thread_Standard', 'ASME B1.1')
+            product_standard = row.get('Product_Standard', 'ASME B18.2.1')
+            thread_class = row.get('Thread_Class', '2A')  # Use provided thread class, not hardcoded
+            
+            # Initialize default parameters
+            params = {
+                'product_type': product_type,
+                'product_code': product_code,
+                'size': str(size),
+                'material': material,
+                'length': length,
+                'length_unit': length_unit,
+                'quantity': quantity,
+                'diameter_type': diameter_type,
+                'thread_standard': thread_standard,
+                'product_standard': product_standard,
+                'thread_class': thread_class  # Use the provided thread class
+            }
+            
+            # Analyze size pattern (M10, M10 X 1.5, 3/8, 1-1/2, 3/8-16, #10)
+            size_str = str(size).strip().upper()
+            size_record = parse_fastener_size(size)
+            
+            # Metric detection (M10, M12, M16, etc.)
+            if size_record.series == 'Metric':
+                params['series'] = 'Metric'
+                params['standard'] = 'ISO 4014' if product_standard == 'All' else product_standard
+                
+                # Diameter from metric size (M10 -> 10.0 mm), 10 mm when it cannot be read
+                params['diameter_value'] = size_record.nominal_mm if size_record.nominal_mm is not None else 10.0
+                params['diameter_unit'] = 'mm'
+                params['grade'] = 'A'  # Default grade for metric
+            
+            # Inch detection (fractions or numbers) - INCLUDING THREADED ROD WITH THREAD SIZES
+            elif size_record.series == 'Inch':
+                params['series'] = 'Inch'
+                params['standard'] = 'ASME B18.2.1' if product_standard == 'All' else product_standard
+                params['grade'] = 'N/A'
+                
+                # SPECIAL HANDLING FOR THREADED ROD WITH THREAD SIZES LIKE "3/8-16"
+                if product_type == "Threaded Rod" and '-' in size_str and diameter_type == "Pitch Diameter":
+                    # Extract thread size for pitch diameter lookup - USE FULL SIZE "3/8-16"
+                    params['thread_size'] = size_str  # Use full size like "3/8-16"
+                
+                # Convert inches to mm for calculation, 1/4" when the size cannot be read
+                params['diameter_value'] = size_record.nominal_mm if size_record.nominal_mm is not None else 6.35
+                params['diameter_unit'] = 'mm'
+            
+            else:
+                # Default fallback
+                params['series'] = 'Inch'
+                params['standard'] = 'ASME B18.2.1'
+                params['diameter_value'] = 10.0
+                params['diameter_unit'] = 'mm'
+                params['grade'] = 'N/A'
+            
+            # Handle diameter type specific parameters
+            if diameter_type == "Pitch Diameter":
+                # For pitch diameter, we need thread information
+                # For Threaded Rod, extract thread size from Size column if it contains thread info
+                if product_type == "Threaded Rod" and '-' in str(size):
+                    # Use the FULL thread size like "3/8-16" for lookup
+                    params['thread_size'] = str(size)
+                    # Use the provided thread class, not hardcoded
+                    params['thread_class'] = thread_class
+                    params['thread_standard'] = thread_standard
+                
+                # Get pitch diameter from database - USE FULL THREAD SIZE
+                pitch_diameter = get_pitch_diameter_from_thread_data(
+                    params.get('thread_standard', 'ASME B1.1'),
+                    params.get('thread_size', size),  # Use full size like "3/8-16"
+                    params.get('thread_class', thread_class)  # Use provided thread class
+                )
+                
+                if pitch_diameter is not None:
+                    params['diameter_value'] = pitch_diameter
+                    params['diameter_unit'] = 'inch' if params.get('series') == 'Inch' else 'mm'
+                    params['pitch_diameter_found'] = True
+                else:
+                    # Fallback to blank diameter calculation
+                    CalculationIssues.report("warning", f"Pitch diameter not found for {params.get('thread_size', size)}, using blank diameter")
+                    params['diameter_type'] = 'Blank Diameter'
+                    params['pitch_diameter_found'] = False
+            
+            elif diameter_type == "Blank Diameter":
+                # Use the provided diameter values
+                params['diameter_value'] = row.get('Diameter_Value', params.get('diameter_value', 10.0))
+                params['diameter_unit'] = row.get('Diameter_Unit', params.get('diameter_unit', 'mm'))
+            
+            return params
+        
+        except Exception as e:
+            CalculationIssues.report("error", f"Error inferring parameters for size {size}: {str(e)}")
+            # Return safe defaults
+            return {
+                'product_type': 'Hex Bolt',
+                'product_code': product_code,
+                'series': 'Inch',
+                'standard': 'ASME B18.2.1',
+                'size': str(size),
+                'grade': 'N/A',
+                'diameter_type': diameter_type,
+                'diameter_value': 10.0,
+                'diameter_unit': 'mm',
+                'material': material,
+                'length': length,
+                'length_unit': length_unit,
+                'quantity': quantity,
+                'thread_standard': thread_standard,
+                'product_standard': product_standard,
+                'thread_class': thread_class
+            }
+
+# ======================================================
+# BATCH PROCESSING ENGINE WITH DIAMETER TYPE SUPPORT
+# ======================================================
+class BatchProcessor:
+    """Handle batch weight calculations with diameter type support"""
+    
+    # Advanced mode: calculation parameter -> (input column, default when the column is absent)
+    ADVANCED_PARAMETER_COLUMNS = {
+        'product_type': ('Product_Type', 'Hex Bolt'),
+        'product_code': ('Product_Code', ''),
+        'series': ('Series', 'Inch'),
+        'standard': ('Standard', 'ASME B18.2.1'),
+        'size': ('Size', None),
+        'grade': ('Grade', 'N/A'),
+        'diameter_type': ('Diameter_Type', None),  # defaults to the batch diameter type
+        'diameter_value': ('Diameter_Value', 10.0),
+        'diameter_unit': ('Diameter_Unit', 'mm'),
+        'thread_standard': ('Thread_Standard', 'N/A'),
+        'thread_size': ('Thread_Size', 'N/A'),
+        'thread_class': ('Thread_Class', 'N/A'),
+        'length': ('Length', None),
+        'length_unit': ('Length_Unit', 'mm'),
+        'material': ('Material', 'Carbon Steel'),
+        'quantity': ('Quantity', 1)
+    }
+    
+    @staticmethod
+    def build_row_parameters(row, input_mode, diameter_type="Blank Diameter"):
+        """Calculation parameters for one valid row in basic or advanced mode"""
+        if input_mode == "basic":
+            params = BatchTemplateManager.infer_parameters_basic_mode(row, diameter_type)
+        else:  # advanced mode
+            params = {
+                param: row.get(column, diameter_type if param == 'diameter_type' else default)
+                for param, (column, default) in BatchProcessor.ADVANCED_PARAMETER_COLUMNS.items()
+            }
+        
+        # For Threaded Rod in basic mode, extract thread info from Size column if needed
+        if (params['diameter_type'] == 'Pitch Diameter' and
+            params['product_type'] == 'Threaded Rod' and 
+            input_mode == 'basic' and 
+            '-' in str(params.get('size', '')) and
+            params.get('thread_standard') == 'N/A'):
+            
+            # Extract thread information from Size column (e.g., "3/8-16")
+            params['thread_size'] = str(params.get('size', ''))  # Use full size like "3/8-16"
+            params['thread_standard'] = 'ASME B1.1'
+            # Use the thread class from the row, don't hardcode to '2A'
+            params['thread_class'] = row.get('Thread_Class', '2A')
+        
+        return params
+    
+    @staticmethod
+    def required_columns(mode="basic", diameter_type="Blank Diameter"):
+        """Columns a batch file must provide for the chosen mode"""
+        if mode == "advanced":
+            return ['Product_Type', 'Size', 'Length', 'Diameter_Type']
+        if diameter_type == "Blank Diameter":
+            return ['Product_Type', 'Size', 'Length', 'Diameter_Value', 'Diameter_Unit']
+        return ['Product_Type', 'Size', 'Length', 'Thread_Standard', 'Product_Standard', 'Thread_Class']
+    
+    @staticmethod
+    def validate_batch_file(df, mode="basic", diameter_type="Blank Diameter"):
+        """Validate batch file structure and data with diameter type support"""
+        errors = []
+        warnings = []
+        
+        if df.empty:
+            errors.append("Uploaded file is empty")
+            return False, errors, warnings
+        
+        # Basic mode validation
+        if mode == "basic":
+            required_columns = BatchProcessor.required_columns(mode, diameter_type)
+            
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            if missing_columns:
+                errors.append(f"Missing required columns for basic mode with {diameter_type}: {', '.join(missing_columns)}")
+            
+            # Check for empty values in required columns
+            for col in required_columns:
+                if col in df.columns and df[col].isna().any():
+                    empty_count = df[col].isna().sum()
+                    warnings.append(f"Column '{col}' has {empty_count} empty values")
+        
+        # Advanced mode validation
+        elif mode == "advanced":
+            required_columns = BatchProcessor.required_columns(mode, diameter_type)
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            if missing_columns:
+                errors.append(f"Missing required columns for advanced mode: {', '.join(missing_columns)}")
+        
+        # Check data types
+        if 'Length' in df.columns:
+            try:
+                pd.to_numeric(df['Length'], errors='coerce')
+            except:
+                errors.append("Length column contains non-numeric values")
+        
+        if 'Quantity' in df.columns:
+            try:
+                pd.to_numeric(df['Quantity'], errors='coerce')
+            except:
+                warnings.append("Quantity column contains non-numeric values - will use default of 1")
+        
+        if 'Diameter_Value' in df.columns:
+            try:
+                pd.to_numeric(df['Diameter_Value'], errors='coerce')
+            except:
+                errors.append("Diameter_Value column contains non-numeric values")
+        
+        return len(errors) == 0, errors, warnings
+    
+    @staticmethod
+    @Spans.span("batch_calculation")
+    def process_batch_calculations(batch_df, diameter_type="Blank Diameter", progress_callback=None, execution_mode="auto", max_workers=None):
+        """Process batch calculations for all rows with diameter type support"""
+        # Per-row lookups and calculations log once per operation for the whole batch
+        with OperationLog.aggregate_logs():
+            try:
+                if ShardedBatchExecutor.should_shard(batch_df, execution_mode):
+                    return ShardedBatchExecutor.process(batch_df, diameter_type, progress_callback, max_workers=max_workers)
+                return VectorizedBatchEngine.process(batch_df, diameter_type, progress_callback)
+            except Exception as e:
+                OperationLog.log_operation("Vectorized Batch Engine", False, f"Falling back to row-by-row processing: {str(e)}")
+                return BatchProcessor.process_batch_calculations_rowwise(batch_df, diameter_type, progress_callback)
+    
+    @staticmethod
+    def process_batch_calculations_rowwise(batch_df, diameter_type="Blank Diameter", progress_callback=None):
+        """Reference row-by-row implementation of process_batch_calculations"""
+        results = []
+        errors = []
+        summary = {
+            'total_rows': len(batch_df),
+            'successful_calculations': 0,
+            'failed_calculations': 0,
+            'total_weight_kg': 0.0,
+            'total_weight_lb': 0.0,
+            'start_time': datetime.now(),
+            'diameter_type_used': diameter_type
+        }
+        
+        for index, row in batch_df.iterrows():
+            try:
+                # Determine input mode and prepare parameters
+                input_mode = BatchTemplateManager.detect_input_mode(row)
+                
+                if input_mode == "invalid":
+                    errors.append({
+                        'row_index': index,
+                        'input_data': row.to_dict(),
+                        'error': 'Invalid input - missing required columns',
+                        'status': 'failed'
+                    })
+                    continue
+                
+                # Prepare calculation parameters based on mode
+                params = BatchProcessor.build_row_parameters(row, input_mode, diameter_type)
+                
+                # Handle pitch diameter thread data
+                if params['diameter_type'] == 'Pitch Diameter':
+                    # Get pitch diameter from database - USE FULL THREAD SIZE
+                    pitch_diameter = get_pitch_diameter_from_thread_data(
+                        params.get('thread_standard', 'ASME B1.1'),
+                        params.get('thread_size', params.get('size')),
+                        params.get('thread_class', row.get('Thread_Class', '2A'))
+                    )
+                    
+                    if pitch_diameter is not None:
+                        params['diameter_value'] = pitch_diameter
+                        params['diameter_unit'] = 'inch' if params.get('series') == 'Inch' else 'mm'
+                        params['pitch_diameter_found'] = True
+                    else:
+                        # Fallback to blank diameter calculation
+                        errors.append({
+                            'row_index': index,
+                            'input_data': row.to_dict(),
+                            'error': f"Pitch diameter not found for thread size: {params.get('thread_size', params.get('size'))} with class: {params.get('thread_class', 'N/A')}",
+                            'status': 'failed'
+                        })
+                        summary['failed_calculations'] += 1
+                        continue
+                
+                # Perform calculation
+                calculation_result = calculate_weight_rectified(params)
+                
+                if calculation_result:
+                    # Add batch-specific information
+                    result_record = {
+                        'row_index': index,
+                        'input_data': row.to_dict(),
+                        'calculation_result': calculation_result,
+                        'status': 'success',
+                        'input_mode': input_mode,
+                        'quantity': params.get('quantity', 1)
+                    }
+                    
+                    results.append(result_record)
+                    summary['successful_calculations'] += 1
+                    summary['total_weight_kg'] += calculation_result['weight_kg'] * result_record['quantity']
+                    summary['total_weight_lb'] += calculation_result['weight_lb'] * result_record['quantity']
+                    
+                    # Update progress
+                    if progress_callback and index % max(1, len(batch_df) // 10) == 0:
+                        progress = (index + 1) / len(batch_df)
+                        progress_callback(progress, f"Processed {index + 1}/{len(batch_df)} rows")
+                
+                else:
+                    errors.append({
+                        'row_index': index,
+                        'input_data': row.to_dict(),
+                        'error': 'Calculation returned no result',
+                        'status': 'failed',
+                        'input_mode': input_mode
+                    })
+                    summary['failed_calculations'] += 1
+            
+            except Exception as e:
+                errors.append({
+                    'row_index': index,
+                    'input_data': row.to_dict(),
+                    'error': str(e),
+                    'status': 'failed',
+                    'input_mode': input_mode if 'input_mode' in locals() else 'unknown'
+                })
+                summary['failed_calculations'] += 1
+        
+        summary['end_time'] = datetime.now()
+        summary['processing_time'] = (summary['end_time'] - summary['start_time']).total_seconds()
+        
+        return results, errors, summary
+
+# ======================================================
+# WEIGHT RESULT CACHE
+# ======================================================
+WEIGHT_CACHE_MAX_ENTRIES = 200000
+WEIGHT_CACHE_FORMAT_VERSION = 1
+WEIGHT_CACHE_DB = os.environ.get("FASTENER_RESULT_CACHE_DB", "")
+
+# The only parameters calculate_weight_rectified reads, with its defaults
+WEIGHT_KEY_FIELDS = (
+    ('product_type', 'Hex Bolt'),
+    ('standard', 'ASME B18.2.1'),
+    ('size', 'All'),
+    ('grade', 'All'),
+    ('diameter_value', 0.0),
+    ('diameter_unit', 'mm'),
+    ('length', 0.0),
+    ('length_unit', 'mm'),
+    ('material', 'Carbon Steel'),
+)
+
+class WeightResultCache:
+    """Weight results keyed by their normalized inputs and the reference version; LRU in memory, optional SQLite on disk"""
+    
+    def __init__(self, max_entries=WEIGHT_CACHE_MAX_ENTRIES, db_path=WEIGHT_CACHE_DB):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._disk_version = None
+    
+    @staticmethod
+    def key(values, version):
+        """Content address for one set of WEIGHT_KEY_FIELDS values; repr keeps 10, 10.0 and '10' distinct"""
+        normalized = tuple(value.item() if isinstance(value, np.generic) else value for value in values)
+        payload = repr((WEIGHT_CACHE_FORMAT_VERSION, version, normalized))
+        return hashlib.sha1(payload.encode()).hexdigest()
+    
+    @staticmethod
+    def parameter_key(parameters, version):
+        """Cache key for a calculate_weight_rectified parameter dict"""
+        return WeightResultCache.key([parameters.get(field, default) for field, default in WEIGHT_KEY_FIELDS], version)
+    
+    def _connection(self):
+        """SQLite tier, opened lazily once per process (batch workers get their own)"""
+        if not self.db_path:
+            return None
+        if self._db_pid != os.getpid():
+            self._db_pid = os.getpid()
+            try:
+                self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS weight_results (key TEXT PRIMARY KEY, version TEXT, result TEXT)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                OperationLog.log_operation("Weight Result Cache", False, f"Disk tier disabled: {str(e)}")
+                self._db = None
+                self.db_path = ""
+        return self._db
+    
+    def _remember(self, key, result):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get_many(self, keys):
+        """Cached results for the given keys, as {key: result}"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = result
+            
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            db = self._connection() if missing else None
+            if db is not None:
+                try:
+                    for start in range(0, len(missing), 500):
+                        batch = missing[start:start + 500]
+                        rows = db.execute(
+                            f"SELECT key, result FROM weight_results WHERE key IN ({','.join('?' * len(batch))})", batch
+                        ).fetchall()
+                        for key, result_json in rows:
+                            found[key] = json.loads(result_json)
+                            self._remember(key, found[key])
+                except sqlite3.Error as e:
+                    OperationLog.log_operation("Weight Result Cache", False, f"Disk read failed: {str(e)}")
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+    
+    def put_many(self, items, version):
+        """Store (key, result) pairs in memory and, when enabled, on disk"""
+        with self._lock:
+            for key, result in items:
+                self._remember(key, result)
+            db = self._connection() if items else None
+            if db is not None:
+                try:
+                    if self._disk_version != str(version):
+                        # First write under a new reference version: entries for other versions can never hit again
+                        db.execute("DELETE FROM weight_results WHERE version != ?", (str(version),))
+                        self._disk_version = str(version)
+                    db.executemany(
+                        "INSERT OR REPLACE INTO weight_results (key, version, result) VALUES (?, ?, ?)",
+                        [(key, str(version), json.dumps(result, default=spill_default)) for key, result in items]
+                    )
+                    db.commit()
+                except sqlite3.Error as e:
+                    OperationLog.log_operation("Weight Result Cache", False, f"Disk write failed: {str(e)}")
+
+# One result cache per process; the disk store opens on first use
+weight_result_cache = WeightResultCache()
+
+# ======================================================
+# VECTORIZED BATCH WEIGHT ENGINE
+# ======================================================
+# Input columns that can change a row's outcome; Quantity and Product_Code never do
+BATCH_RESULT_INPUT_COLUMNS = {
+    column for param, (column, _) in BatchProcessor.ADVANCED_PARAMETER_COLUMNS.items()
+    if param not in ('product_code', 'quantity')
+} | {'Product_Standard'}
+
+class VectorizedBatchEngine:
+    """Columnar batch weights: bulk parameter parsing, one lookup per distinct key, NumPy volume math"""
+    
+    UNIT_TO_MM = {'mm': 1.0, 'inch': 25.4, 'ft': 304.8, 'meter': 1000.0}
+    
+    @staticmethod
+    def detect_input_modes(batch_df):
+        """Vectorized BatchTemplateManager.detect_input_mode for every row"""
+        row_count = len(batch_df)
+        advanced_cols = [col for col in ['Product_Type', 'Series', 'Standard', 'Diameter_Type'] if col in batch_df.columns]
+        basic_cols = [col for col in ['Product_Type', 'Size', 'Length'] if col in batch_df.columns]
+        
+        advanced = batch_df[advanced_cols].notna().any(axis=1).to_numpy() if advanced_cols else np.zeros(row_count, dtype=bool)
+        basic = batch_df[basic_cols].notna().all(axis=1).to_numpy() if basic_cols else np.ones(row_count, dtype=bool)
+        
+        return np.where(advanced, "advanced", np.where(basic, "basic", "invalid")).astype(object)
+    
+    @staticmethod
+    def build_parameter_columns(batch_df, input_modes, diameter_type):
+        """Parameter name -> object array; advanced rows column-wise, basic rows through the row inference"""
+        row_count = len(batch_df)
+        params = {}
+        for param, (column, default) in BatchProcessor.ADVANCED_PARAMETER_COLUMNS.items():
+            if param == 'diameter_type':
+                default = diameter_type
+            if column in batch_df.columns:
+                params[param] = batch_df[column].to_numpy(dtype=object, copy=True)
+            else:
+                params[param] = np.full(row_count, default, dtype=object)
+        
+        # Basic mode only applies when the upload has no Product_Type column, so this loop is rare
+        for position in np.flatnonzero(input_modes == "basic"):
+            row = batch_df.iloc[position]
+            row_params = BatchProcessor.build_row_parameters(row, "basic", diameter_type)
+            for param in params:
+                if param == 'thread_size':
+                    params[param][position] = row_params.get('thread_size', row_params.get('size'))
+                else:
+                    params[param][position] = row_params.get(param)
+        
+        return params
+    
+    @staticmethod
+    def distinct_rows(columns, mask):
+        """Masked positions, their distinct-key codes and the first row of each key"""
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            return positions, positions, positions
+        
+        # Factorize values and their types (1, 1.0 and '1' are different sizes, NaN/None stay distinct),
+        # folding each column into one running key code
+        key_codes = np.zeros(len(positions), dtype=np.int64)
+        for column in columns:
+            values = pd.Series(column[positions], dtype=object)
+            column_codes = [pd.factorize(values)[0]]
+            if pd.api.types.infer_dtype(values, skipna=False) not in ('string', 'floating', 'integer', 'boolean'):
+                column_codes.append(pd.factorize(values.map(type))[0])  # only mixed columns need the type split
+            for codes in column_codes:
+                key_codes = pd.factorize(key_codes * (codes.max() + 2) + (codes + 1))[0]
+        _, first_rows = np.unique(key_codes, return_index=True)
+        return positions, key_codes, first_rows
+    
+    @staticmethod
+    def lookup_distinct(columns, mask, lookup):
+        """Call lookup once per distinct key among masked rows and broadcast the answers back"""
+        answers = np.empty(len(mask), dtype=object)
+        positions, key_codes, first_rows = VectorizedBatchEngine.distinct_rows(columns, mask)
+        if len(positions) == 0:
+            return answers
+        
+        distinct_answers = np.empty(len(first_rows), dtype=object)
+        for key_code, row in enumerate(first_rows):
+            distinct_answers[key_code] = lookup(*(column[positions[row]] for column in columns))
+        answers[positions] = distinct_answers[key_codes]
+        return answers
+    
+    @staticmethod
+    def branch_numbers(field_arrays, fields, rows):
+        """Positions and per-row number dicts (in result field order) for one formula branch"""
+        positions = np.flatnonzero(rows)
+        value_lists = [field_arrays[field][positions].tolist() for field in fields]
+        return positions.tolist(), [dict(zip(fields, values)) for values in zip(*value_lists)]
+    
+    @staticmethod
+    def is_number(values):
+        """Mask of values usable in the calculation (numbers, including NaN)"""
+        return np.fromiter(
+            (isinstance(value, (int, float, np.integer, np.floating)) for value in values),
+            dtype=bool, count=len(values)
+        )
+    
+    @staticmethod
+    def to_mm(values, units, mask):
+        """Vectorized convert_to_mm: NaN -> 0.0, unknown units are treated as mm"""
+        numeric = np.full(len(values), np.nan)
+        numeric[mask] = pd.to_numeric(pd.Series(values[mask], dtype=object), errors='coerce').to_numpy(dtype=float)
+        factors = pd.Series(units, dtype=object).map(VectorizedBatchEngine.UNIT_TO_MM).fillna(1.0).to_numpy(dtype=float)
+        return np.where(np.isnan(numeric), 0.0, numeric * factors)
+    
+    @staticmethod
+    def unpack_dimensions(dimensions, mask, row_count):
+        """Split (first, second, unit) lookup answers into value arrays plus found masks"""
+        first = np.full(row_count, np.nan)
+        second = np.full(row_count, np.nan)
+        first_found = np.zeros(row_count, dtype=bool)
+        second_found = np.zeros(row_count, dtype=bool)
+        units = np.full(row_count, "mm", dtype=object)
+        for position in np.flatnonzero(mask):
+            first_value, second_value, unit = dimensions[position]
+            units[position] = unit
+            if first_value is not None:
+                first[position] = first_value
+                first_found[position] = True
+            if second_value is not None:
+                second[position] = second_value
+                second_found[position] = True
+        return first, second, first_found, second_found, units
+    
+    @staticmethod
+    def head_dimensions_mm(dimensions, mask, diameter_mm):
+        """Head dimensions in mm with the calculate_weight_rectified estimates for missing values, plus which rows were estimated"""
+        first, second, first_found, second_found, units = VectorizedBatchEngine.unpack_dimensions(dimensions, mask, len(mask))
+        
+        # Missing first dimension: 1.5 × diameter, reported in mm; missing height: 0.65 × diameter
+        first = np.where(first_found, first, diameter_mm * 1.5)
+        units = np.where(first_found, units, "mm").astype(object)
+        second = np.where(second_found, second, diameter_mm * 0.65)
+        
+        factors = pd.Series(units, dtype=object).map(VectorizedBatchEngine.UNIT_TO_MM).fillna(1.0).to_numpy(dtype=float)
+        first_mm = np.where(np.isnan(first), 0.0, first * factors)
+        second_mm = np.where(np.isnan(second), 0.0, second * factors)
+        estimated = mask & ~(first_found & second_found)
+        return first, second, units, first_mm, second_mm, estimated
+    
+    @staticmethod
+    def process(batch_df, diameter_type="Blank Diameter", progress_callback=None):
+        """Same results, errors and summary as the row-by-row processor, computed column-wise"""
+        # Building one result dict per row creates millions of containers; the cyclic collector
+        # would rescan them repeatedly, and none of them form reference cycles
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with OperationLog.aggregate_logs():
+                return VectorizedBatchEngine._process(batch_df, diameter_type, progress_callback)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    
+    @staticmethod
+    def evaluate(batch_df, diameter_type, progress_callback=None):
+        """Outcome of every row: input mode, (error message, with input mode, counts as failed) or None, result dict"""
+        row_count = len(batch_df)
+        errors = [None] * row_count
+        
+        input_modes = VectorizedBatchEngine.detect_input_modes(batch_df)
+        valid = input_modes != "invalid"
+        for position in np.flatnonzero(~valid):
+            errors[position] = ('Invalid input - missing required columns', False, False)
+        
+        params = VectorizedBatchEngine.build_parameter_columns(batch_df, input_modes, diameter_type)
+        if progress_callback:
+            progress_callback(0.2, f"Parsed parameters for {row_count} distinct rows")
+        
+        # Pitch diameters: one thread table lookup per (standard, size, class)
+        pitch_rows = valid & (params['diameter_type'] == 'Pitch Diameter')
+        pitch_diameters = VectorizedBatchEngine.lookup_distinct(
+            [params['thread_standard'], params['thread_size'], params['thread_class']],
+            pitch_rows, get_pitch_diameter_from_thread_data
+        )
+        pitch_missing = pitch_rows & np.array([value is None for value in pitch_diameters], dtype=bool)
+        pitch_found = pitch_rows & ~pitch_missing
+        for position in np.flatnonzero(pitch_missing):
+            errors[position] = (
+                f"Pitch diameter not found for thread size: {params['thread_size'][position]} with class: {params['thread_class'][position]}",
+                False, True
+            )
+        params['diameter_value'][pitch_found] = pitch_diameters[pitch_found]
+        params['diameter_unit'][pitch_found] = np.where(params['series'][pitch_found] == 'Inch', 'inch', 'mm')
+        
+        # Rows whose diameter or length is not a number cannot be formatted and fail as "no result"
+        candidates = valid & ~pitch_missing
+        numeric_inputs = VectorizedBatchEngine.is_number(params['diameter_value']) & VectorizedBatchEngine.is_number(params['length'])
+        calculable = candidates & numeric_inputs
+        for position in np.flatnonzero(candidates & ~numeric_inputs):
+            errors[position] = ('Calculation returned no result', True, True)
+        
+        diameter_mm = VectorizedBatchEngine.to_mm(params['diameter_value'], params['diameter_unit'], calculable)
+        length_mm = VectorizedBatchEngine.to_mm(params['length'], params['length_unit'], calculable)
+        density = pd.Series(params['material'], dtype=object).map(
+            lambda material: get_material_density_rectified(material)
+        ).to_numpy(dtype=float)
+        
+        product_types = pd.Series(params['product_type'], dtype=object)
+        socket_rows = calculable & product_types.isin(SOCKET_HEAD_PRODUCTS).to_numpy()
+        hex_rows = calculable & ~socket_rows & product_types.isin(HEX_PRODUCTS).to_numpy()
+        rod_rows = calculable & ~socket_rows & (product_types == "Threaded Rod").to_numpy()
+        other_rows = calculable & ~socket_rows & ~hex_rows & ~rod_rows
+        
+        # Head dimensions: one index lookup per (standard, product, size, grade)
+        dimension_keys = [params['standard'], params['product_type'], params['size'], params['grade']]
+        socket_dimensions = VectorizedBatchEngine.lookup_distinct(dimension_keys, socket_rows, get_socket_head_dimensions)
+        hex_dimensions = VectorizedBatchEngine.lookup_distinct(dimension_keys, hex_rows, get_hex_head_dimensions)
+        if progress_callback:
+            progress_callback(0.5, "Joined head dimensions and pitch diameters")
+        
+        head_first, head_second, head_units, head_first_mm, head_second_mm, head_estimated = VectorizedBatchEngine.head_dimensions_mm(
+            np.where(socket_rows, socket_dimensions, hex_dimensions), socket_rows | hex_rows, diameter_mm
+        )
+        
+        # Volumes and weights for the whole frame
+        shank_volume = 0.7853 * (diameter_mm ** 2) * length_mm
+        side_length = head_first_mm * 1.1547
+        head_volume = np.where(
+            socket_rows,
+            0.7853 * (head_first_mm ** 2) * head_second_mm,
+            0.65 * (side_length ** 2) * head_second_mm
+        )
+        head_volume = np.where(socket_rows | hex_rows, head_volume, 0.0)
+        total_volume = np.where(socket_rows | hex_rows, shank_volume + head_volume, shank_volume)
+        total_volume_cm3 = total_volume / 1000
+        weight_g = total_volume_cm3 * density
+        weight_kg = weight_g / 1000
+        weight_lb = weight_kg * 2.20462
+        if progress_callback:
+            progress_callback(0.6, "Computed volumes and weights")
+        
+        field_arrays = {
+            'weight_kg': weight_kg, 'weight_g': weight_g, 'weight_lb': weight_lb,
+            'shank_volume_mm3': shank_volume, 'head_volume_mm3': head_volume,
+            'total_volume_mm3': total_volume, 'total_volume_cm3': total_volume_cm3,
+            'volume_mm3': shank_volume, 'volume_cm3': total_volume_cm3,
+            'diameter_mm': diameter_mm, 'length_mm': length_mm, 'density_g_cm3': density,
+            'head_diameter_mm': head_first_mm, 'width_across_flats_mm': head_first_mm,
+            'head_height_mm': head_second_mm, 'side_length_mm': side_length,
+        }
+        diameter_values = params['diameter_value'].tolist()
+        diameter_units = params['diameter_unit'].tolist()
+        lengths = params['length'].tolist()
+        length_units = params['length_unit'].tolist()
+        head_first = head_first.tolist()
+        head_second = head_second.tolist()
+        head_units = head_units.tolist()
+        
+        # One result per distinct calculation input: cached results are reused, the rest are built once
+        key_columns = [params[field] for field, _ in WEIGHT_KEY_FIELDS]
+        positions, key_codes, first_rows = VectorizedBatchEngine.distinct_rows(key_columns, calculable)
+        representatives = positions[first_rows]
+        reference_version = get_reference_snapshot().version
+        cache_keys = [
+            WeightResultCache.key([column[position] for column in key_columns], reference_version)
+            for position in representatives.tolist()
+        ]
+        cached_results = weight_result_cache.get_many(cache_keys)
+        build_rows = np.zeros(row_count, dtype=bool)
+        build_rows[[position for position, key in zip(representatives.tolist(), cache_keys) if key not in cached_results]] = True
+        socket_rows, hex_rows, rod_rows, other_rows = (
+            socket_rows & build_rows, hex_rows & build_rows, rod_rows & build_rows, other_rows & build_rows
+        )
+        
+        # Result dicts through the same builders as the single-item calculator
+        calculation_results = [None] * row_count
+        for position, numbers in zip(*VectorizedBatchEngine.branch_numbers(field_arrays, SOCKET_RESULT_FIELDS, socket_rows)):
+            calculation_results[position] = build_socket_weight_result(
+                numbers, diameter_values[position], diameter_units[position], lengths[position], length_units[position],
+                head_first[position], head_second[position], head_units[position])
+        for position, numbers in zip(*VectorizedBatchEngine.branch_numbers(field_arrays, HEX_RESULT_FIELDS, hex_rows)):
+            calculation_results[position] = build_hex_weight_result(
+                numbers, diameter_values[position], diameter_units[position], lengths[position], length_units[position],
+                head_first[position], head_second[position], head_units[position])
+        for method, branch_rows in (('Threaded Rod Cylinder Formula', rod_rows), ('Standard Cylinder Formula', other_rows)):
+            for position, numbers in zip(*VectorizedBatchEngine.branch_numbers(field_arrays, CYLINDER_RESULT_FIELDS, branch_rows)):
+                calculation_results[position] = build_cylinder_weight_result(
+                    numbers, diameter_values[position], diameter_units[position], lengths[position], length_units[position], method)
+        
+        # Like calculate_weight_rectified, leave estimated head dimensions uncached so a single calculation still warns
+        new_results = [(key, calculation_results[position]) for position, key in zip(representatives.tolist(), cache_keys)
+                       if key not in cached_results and not head_estimated[position]]
+        weight_result_cache.put_many(new_results, reference_version)
+        distinct_results = [cached_results.get(key) or calculation_results[position]
+                            for position, key in zip(representatives.tolist(), cache_keys)]
+        for position, key_code in zip(positions.tolist(), key_codes.tolist()):
+            calculation_results[position] = distinct_results[key_code]
+        
+        distinct_counts = (len(cache_keys), len(cached_results))
+        return input_modes, errors, calculation_results, distinct_counts
+    
+    @staticmethod
+    def _process(batch_df, diameter_type, progress_callback):
+        """Column-wise processing body, see process"""
+        start_time = datetime.now()
+        row_count = len(batch_df)
+        summary = {
+            'total_rows': row_count,
+            'successful_calculations': 0,
+            'failed_calculations': 0,
+            'total_weight_kg': 0.0,
+            'total_weight_lb': 0.0,
+            'start_time': start_time,
+            'diameter_type_used': diameter_type
+        }
+        row_labels = batch_df.index.tolist()
+        input_columns = batch_df.columns.tolist()
+        records = [dict(zip(input_columns, values)) for values in zip(*(batch_df[column].tolist() for column in input_columns))]
+        if not input_columns:
+            records = [{} for _ in range(row_count)]
+        
+        # Rows that differ only in Quantity, Product_Code or columns the calculation never reads
+        # share one outcome: evaluate one row per group and broadcast it back
+        group_columns = [column for column in input_columns if column in BATCH_RESULT_INPUT_COLUMNS]
+        _, group_codes, representatives = VectorizedBatchEngine.distinct_rows(
+            [batch_df[column].to_numpy(dtype=object) for column in group_columns], np.ones(row_count, dtype=bool)
+        )
+        group_modes, group_errors, group_results, (distinct_count, cached_count) = VectorizedBatchEngine.evaluate(
+            batch_df.iloc[representatives], diameter_type, progress_callback
+        )
+        if progress_callback:
+            progress_callback(0.7, f"Evaluated {len(representatives)} distinct rows")
+        
+        if 'Quantity' in batch_df.columns:
+            quantities = batch_df['Quantity'].to_numpy(dtype=object)
+        else:
+            quantities = np.full(row_count, 1, dtype=object)
+        numeric_quantities = VectorizedBatchEngine.is_number(quantities)
+        
+        results = []
+        errors = []
+        group_codes = group_codes.tolist()
+        group_modes = group_modes.tolist()
+        quantity_list = quantities.tolist()
+        irregular_kg = 0.0
+        irregular_lb = 0.0
+        for position, group in enumerate(group_codes):
+            error = group_errors[group]
+            if error is not None:
+                message, with_input_mode, counts_as_failed = error
+                error_record = {
+                    'row_index': row_labels[position],
+                    'input_data': records[position],
+                    'error': message,
+                    'status': 'failed'
+                }
+                if with_input_mode:
+                    error_record['input_mode'] = group_modes[group]
+                errors.append(error_record)
+                if counts_as_failed:
+                    summary['failed_calculations'] += 1
+                continue
+            
+            calculation_result = group_results[group]
+            quantity = quantity_list[position]
+            results.append({
+                'row_index': row_labels[position],
+                'input_data': records[position],
+                'calculation_result': calculation_result,
+                'status': 'success',
+                'input_mode': group_modes[group],
+                'quantity': quantity
+            })
+            
+            # Numeric quantities go into the grouped totals below; anything else is multiplied
+            # here so it fails exactly like the row-by-row totals
+            if not numeric_quantities[position]:
+                try:
+                    line_kg = calculation_result['weight_kg'] * quantity
+                    line_lb = calculation_result['weight_lb'] * quantity
+                    irregular_kg += line_kg
+                    irregular_lb += line_lb
+                except Exception as e:
+                    errors.append({
+                        'row_index': row_labels[position],
+                        'input_data': records[position],
+                        'error': str(e),
+                        'status': 'failed',
+                        'input_mode': group_modes[group]
+                    })
+                    summary['failed_calculations'] += 1
+        
+        # Totals: per-group weight × the group's summed quantity
+        group_count = len(representatives)
+        group_ok = np.array([error is None for error in group_errors], dtype=bool)
+        codes = np.array(group_codes, dtype=np.intp)
+        summed = group_ok[codes] & numeric_quantities
+        quantity_sums = np.bincount(codes[summed], weights=np.array(quantities[summed], dtype=float), minlength=group_count)
+        summed_groups = np.bincount(codes[summed], minlength=group_count) > 0
+        group_kg = np.array([group_results[group]['weight_kg'] if summed_groups[group] else 0.0 for group in range(group_count)], dtype=float)
+        group_lb = np.array([group_results[group]['weight_lb'] if summed_groups[group] else 0.0 for group in range(group_count)], dtype=float)
+        summary['total_weight_kg'] = float(np.sum(group_kg[summed_groups] * quantity_sums[summed_groups])) + irregular_kg
+        summary['total_weight_lb'] = float(np.sum(group_lb[summed_groups] * quantity_sums[summed_groups])) + irregular_lb
+        summary['successful_calculations'] = len(results)
+        
+        if progress_callback:
+            progress_callback(1.0, f"Processed {row_count}/{row_count} rows")
+        
+        summary['end_time'] = datetime.now()
+        summary['processing_time'] = (summary['end_time'] - summary['start_time']).total_seconds()
+        OperationLog.log_operation("Vectorized Batch Calculation", True,
+                                     f"Rows: {row_count}, Success: {len(results)}, Failed: {summary['failed_calculations']}, "
+                                     f"Groups: {group_count}, Distinct: {distinct_count}, Cached: {cached_count}, Time: {summary['processing_time']:.3f}s")
+        return results, errors, summary
+
+# ======================================================
+# MULTI-PROCESS SHARDED BATCH EXECUTION
+# ======================================================
+BATCH_SHARD_MIN_ROWS = 100000
+BATCH_SHARD_CHUNK_ROWS = 50000
+BATCH_SHARD_STALL_TIMEOUT = 300  # seconds without a finished chunk before the pool is abandoned
+
+class ShardedBatchExecutor:
+    """Split very large batches into row chunks and run them in fresh worker processes"""
+    
+    @staticmethod
+    def available():
+        """Sharding only pays off with more than one core"""
+        return (os.cpu_count() or 1) > 1
+    
+    @staticmethod
+    def should_shard(batch_df, execution_mode="auto"):
+        """Pick multi-process execution for "parallel", or for "auto" on very large uploads"""
+        if execution_mode == "single" or not ShardedBatchExecutor.available():
+            return False
+        if execution_mode == "parallel":
+            return True
+        return len(batch_df) >= BATCH_SHARD_MIN_ROWS
+    
+    @staticmethod
+    def chunk_bounds(row_count, chunk_rows=BATCH_SHARD_CHUNK_ROWS):
+        """(start, stop) row ranges covering the frame in order"""
+        return [(start, min(start + chunk_rows, row_count)) for start in range(0, row_count, chunk_rows)]
+    
+    @staticmethod
+    def worker_context():
+        """forkserver/spawn workers start clean; a fork from this threaded process could inherit held locks"""
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('forkserver')
+        return multiprocessing.get_context('spawn')
+    
+    @staticmethod
+    def initialize_worker(tables, threads, messages):
+        """Worker: serve the parent's reference tables instead of loading them again"""
+        configure_worker_logging()
+        use_reference_snapshot(ReferenceSnapshot(tables, threads, messages))
+    
+    @staticmethod
+    def process_chunk(chunk_df, diameter_type):
+        """Worker: run the vectorized engine on one slice of the batch"""
+        return VectorizedBatchEngine.process(chunk_df, diameter_type)
+    
+    @staticmethod
+    def stop_pool(pool):
+        """Kill workers that are still running, e.g. a hung one, and cancel the queued chunks"""
+        # ProcessPoolExecutor has no public terminate; dead workers make it drop its queues instead of blocking on them
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            if process.is_alive():
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def combine_summaries(chunk_summaries, diameter_type, start_time):
+        """Add up per-chunk batch summaries into one summary for the whole batch"""
+        summary = {
+            'total_rows': 0,
+            'successful_calculations': 0,
+            'failed_calculations': 0,
+            'total_weight_kg': 0.0,
+            'total_weight_lb': 0.0,
+            'start_time': start_time,
+            'diameter_type_used': diameter_type
+        }
+        for chunk_summary in chunk_summaries:
+            for key in ('total_rows', 'successful_calculations', 'failed_calculations', 'total_weight_kg', 'total_weight_lb'):
+                summary[key] += chunk_summary[key]
+        summary['end_time'] = datetime.now()
+        summary['processing_time'] = (summary['end_time'] - summary['start_time']).total_seconds()
+        return summary
+    
+    @staticmethod
+    def merge_chunk_outputs(chunk_outputs, diameter_type, start_time):
+        """Concatenate chunk results and errors in row order and add up the summaries"""
+        results = []
+        errors = []
+        for chunk_results, chunk_errors, chunk_summary in chunk_outputs:
+            results.extend(chunk_results)
+            errors.extend(chunk_errors)
+        summary = ShardedBatchExecutor.combine_summaries([output[2] for output in chunk_outputs], diameter_type, start_time)
+        return results, errors, summary
+    
+    @staticmethod
+    def open_pool(max_workers=None):
+        """Worker pool serving the current reference tables; one pool can run many batches"""
+        snapshot = get_reference_snapshot()
+        return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                                   mp_context=ShardedBatchExecutor.worker_context(),
+                                   initializer=ShardedBatchExecutor.initialize_worker,
+                                   initargs=(snapshot.tables, snapshot.threads, snapshot.messages))
+    
+    @staticmethod
+    def run_chunks(pool, batch_df, diameter_type, progress_callback=None, chunk_rows=BATCH_SHARD_CHUNK_ROWS):
+        """Chunk outputs in row order; raises when a chunk fails or none finishes within the stall timeout"""
+        bounds = ShardedBatchExecutor.chunk_bounds(len(batch_df), chunk_rows)
+        chunk_outputs = [None] * len(bounds)
+        futures = {
+            pool.submit(ShardedBatchExecutor.process_chunk, batch_df.iloc[start:stop], diameter_type): chunk_number
+            for chunk_number, (start, stop) in enumerate(bounds)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=BATCH_SHARD_STALL_TIMEOUT, return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"No chunk finished within {BATCH_SHARD_STALL_TIMEOUT}s")
+            for future in done:
+                chunk_outputs[futures[future]] = future.result()
+            if progress_callback:
+                done_count = len(bounds) - len(pending)
+                progress_callback(done_count / len(bounds), f"Processed {done_count}/{len(bounds)} chunks")
+        return chunk_outputs
+    
+    @staticmethod
+    def process(batch_df, diameter_type="Blank Diameter", progress_callback=None, max_workers=None, chunk_rows=BATCH_SHARD_CHUNK_ROWS):
+        """Process the batch in parallel chunks; same results, errors and summary as a single run"""
+        start_time = datetime.now()
+        chunk_count = len(ShardedBatchExecutor.chunk_bounds(len(batch_df), chunk_rows))
+        max_workers = max_workers or min(chunk_count, os.cpu_count() or 1)
+        
+        try:
+            pool = ShardedBatchExecutor.open_pool(max_workers)
+            try:
+                chunk_outputs = ShardedBatchExecutor.run_chunks(pool, batch_df, diameter_type, progress_callback, chunk_rows)
+            except BaseException:
+                ShardedBatchExecutor.stop_pool(pool)
+                raise
+            pool.shutdown()
+        except Exception as e:
+            # A broken pool must not lose the upload: finish it in this process instead
+            OperationLog.log_operation("Sharded Batch Calculation", False, f"Worker pool failed, running in-process: {str(e)}")
+            return VectorizedBatchEngine.process(batch_df, diameter_type, progress_callback)
+        
+        results, errors, summary = ShardedBatchExecutor.merge_chunk_outputs(chunk_outputs, diameter_type, start_time)
+        OperationLog.log_operation("Sharded Batch Calculation", True,
+                                     f"Rows: {summary['total_rows']}, Chunks: {chunk_count}, Workers: {max_workers}, Time: {summary['processing_time']:.3f}s")
+        return results, errors, summary
+
+# ======================================================
+# STREAMING BATCH FILE INGESTION
+# ======================================================
+BATCH_STREAM_CHUNK_ROWS = 200000
+BATCH_DISPLAY_ROWS = 1000
+# The calculation_result fields BatchResultsDisplay and BatchResultExport read; formula and
+# dimension text is per-row bulk that would dominate the spill files
+BATCH_SPILLED_RESULT_FIELDS = ('weight_kg', 'weight_lb', 'calculation_method')
+
+def spill_default(value):
+    """JSON fallback for numpy scalars and timestamps found in uploaded rows"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+class SpilledRecords:
+    """Append-only JSON-lines file that keeps batch results or errors on disk instead of in memory"""
+    
+    def __init__(self, prefix="batch_records_"):
+        handle = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.jsonl', prefix=prefix, encoding='utf-8')
+        handle.close()
+        self.path = handle.name
+        self.count = 0
+    
+    def extend(self, records):
+        """Append records to the spill file"""
+        with open(self.path, 'a', encoding='utf-8') as spill_file:
+            for record in records:
+                spill_file.write(json.dumps(record, default=spill_default))
+                spill_file.write('\n')
+        self.count += len(records)
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as spill_file:
+            for line in spill_file:
+                yield json.loads(line)
+    
+    def head(self, count):
+        """First records, for on-screen display"""
+        return list(islice(self, count))
+    
+    def discard(self):
+        """Delete the spill file"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.count = 0
+
+class StreamingBatchReader:
+    """Read uploaded CSV/XLSX batch files in fixed-size row chunks"""
+    
+    @staticmethod
+    def excel_cell(value):
+        """Convert an openpyxl cell value the way pd.read_excel does"""
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+    
+    @staticmethod
+    def parse_excel_rows(header, rows, start):
+        """Parse raw rows with the same NA and dtype inference as pd.read_excel"""
+        chunk = TextParser([header] + rows, header=0).read()
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        return chunk
+    
+    @staticmethod
+    def iter_excel_chunks(uploaded_file, chunk_rows):
+        """Row chunks from the first worksheet, read with openpyxl in read-only mode"""
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [StreamingBatchReader.excel_cell(value) for value in header]
+            width = len(header)
+            start = 0
+            buffer = []
+            blank_run = []
+            for row in rows:
+                values = [StreamingBatchReader.excel_cell(value) for value in row[:width]]
+                values.extend([""] * (width - len(values)))
+                # Like read_excel, blank rows count only when data follows them
+                if all(value == "" for value in values):
+                    blank_run.append(values)
+                    continue
+                buffer.extend(blank_run)
+                blank_run = []
+                buffer.append(values)
+                if len(buffer) >= chunk_rows:
+                    yield StreamingBatchReader.parse_excel_rows(header, buffer[:chunk_rows], start)
+                    start += chunk_rows
+                    buffer = buffer[chunk_rows:]
+            if buffer:
+                yield StreamingBatchReader.parse_excel_rows(header, buffer, start)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def iter_chunks(uploaded_file, chunk_rows=BATCH_STREAM_CHUNK_ROWS):
+        """Row chunks of the upload; index labels continue across chunks"""
+        uploaded_file.seek(0)
+        if uploaded_file.name.endswith('.xlsx'):
+            yield from StreamingBatchReader.iter_excel_chunks(uploaded_file, chunk_rows)
+        else:
+            yield from pd.read_csv(uploaded_file, chunksize=chunk_rows)
+    
+    @staticmethod
+    def scan(uploaded_file, mode="basic", diameter_type="Blank Diameter", chunk_rows=BATCH_STREAM_CHUNK_ROWS):
+        """One streaming pass: row count, preview rows and validation over the whole file"""
+        total_rows = 0
+        preview_df = None
+        columns = []
+        empty_counts = {}
+        errors = []
+        warnings = []
+        for chunk in StreamingBatchReader.iter_chunks(uploaded_file, chunk_rows):
+            if preview_df is None:
+                preview_df = chunk.head(10).copy()
+                columns = list(chunk.columns)
+                _, errors, _ = BatchProcessor.validate_batch_file(chunk, mode, diameter_type)
+            total_rows += len(chunk)
+            if mode == "basic":
+                for col in BatchProcessor.required_columns(mode, diameter_type):
+                    if col in chunk.columns:
+                        empty_counts[col] = empty_counts.get(col, 0) + int(chunk[col].isna().sum())
+        
+        if preview_df is None or total_rows == 0:
+            errors = ["Uploaded file is empty"]
+            preview_df = pd.DataFrame(columns=columns)
+        for col, empty_count in empty_counts.items():
+            if empty_count:
+                warnings.append(f"Column '{col}' has {empty_count} empty values")
+        
+        return {
+            'total_rows': total_rows,
+            'columns': columns,
+            'preview_df': preview_df,
+            'is_valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings
+        }
+
+class StreamingBatchPipeline:
+    """Validate, calculate and spill an uploaded batch file one chunk at a time"""
+    
+    @staticmethod
+    def should_shard(execution_mode, total_rows, first_chunk_rows):
+        """Decide once per file: "auto" shards by the file's row count, or by the first chunk when the count is unknown"""
+        if execution_mode == "single" or not ShardedBatchExecutor.available():
+            return False
+        if execution_mode == "parallel":
+            return True
+        return (total_rows or first_chunk_rows) >= BATCH_SHARD_MIN_ROWS
+    
+    @staticmethod
+    def chunk_progress(progress_callback, rows_done, chunk_size, total_rows):
+        """Progress callback for one chunk, scaled to the rows of the whole file"""
+        if not progress_callback:
+            return None
+        
+        def report(fraction, status):
+            rows = rows_done + int(fraction * chunk_size)
+            progress = min(rows / total_rows, 1.0) if total_rows else 0.0
+            progress_callback(progress, f"Rows {rows_done + 1}-{rows_done + chunk_size} of {total_rows or '?'}: {status}")
+        
+        return report
+    
+    @staticmethod
+    def calculate_chunk(chunk, diameter_type, pool, progress):
+        """Chunk results through the shared worker pool, or in this process"""
+        if pool is not None:
+            start_time = datetime.now()
+            chunk_outputs = ShardedBatchExecutor.run_chunks(pool, chunk, diameter_type, progress)
+            return ShardedBatchExecutor.merge_chunk_outputs(chunk_outputs, diameter_type, start_time)
+        return BatchProcessor.process_batch_calculations(chunk, diameter_type, progress, "single")
+    
+    @staticmethod
+    def process(uploaded_file, diameter_type="Blank Diameter", progress_callback=None, execution_mode="auto",
+                total_rows=None, chunk_rows=BATCH_STREAM_CHUNK_ROWS, max_workers=None):
+        """Stream the upload through the batch engine; results and errors go to spill files"""
+        start_time = datetime.now()
+        results = SpilledRecords("batch_results_")
+        errors = SpilledRecords("batch_errors_")
+        chunk_summaries = []
+        rows_done = 0
+        pool = None
+        
+        # One set of aggregated log lines for the whole upload, not one per chunk
+        try:
+            with OperationLog.aggregate_logs():
+                for chunk in StreamingBatchReader.iter_chunks(uploaded_file, chunk_rows):
+                    # One worker pool for the whole file, not one per stream chunk
+                    if rows_done == 0 and StreamingBatchPipeline.should_shard(execution_mode, total_rows, len(chunk)):
+                        pool = ShardedBatchExecutor.open_pool(max_workers)
+                    progress = StreamingBatchPipeline.chunk_progress(progress_callback, rows_done, len(chunk), total_rows)
+                    try:
+                        chunk_results, chunk_errors, chunk_summary = StreamingBatchPipeline.calculate_chunk(
+                            chunk, diameter_type, pool, progress
+                        )
+                    except Exception as e:
+                        if pool is None:
+                            raise
+                        # A broken pool must not lose the upload: finish it in this process instead
+                        OperationLog.log_operation("Sharded Batch Calculation", False, f"Worker pool failed, running in-process: {str(e)}")
+                        ShardedBatchExecutor.stop_pool(pool)
+                        pool = None
+                        chunk_results, chunk_errors, chunk_summary = StreamingBatchPipeline.calculate_chunk(
+                            chunk, diameter_type, None, progress
+                        )
+                    results.extend([StreamingBatchPipeline.spill_record(result) for result in chunk_results])
+                    errors.extend(chunk_errors)
+                    chunk_summaries.append(chunk_summary)
+                    rows_done += len(chunk)
+                    del chunk, chunk_results, chunk_errors
+                    
+                    if progress_callback:
+                        progress = min(rows_done / total_rows, 1.0) if total_rows else 0.0
+                        progress_callback(progress, f"Processed {rows_done}/{total_rows or '?'} records")
+        except BaseException:
+            if pool is not None:
+                ShardedBatchExecutor.stop_pool(pool)
+                pool = None
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        
+        summary = ShardedBatchExecutor.combine_summaries(chunk_summaries, diameter_type, start_time)
+        OperationLog.log_operation("Streaming Batch Calculation", True,
+                                     f"Rows: {summary['total_rows']}, Chunks: {len(chunk_summaries)}, Time: {summary['processing_time']:.3f}s")
+        return results, errors, summary
+    
+    @staticmethod
+    def spill_record(result):
+        """Batch result with only the calculation fields the results page and exports read"""
+        calculation_result = result['calculation_result']
+        return dict(result, calculation_result={
+            field: calculation_result[field] for field in BATCH_SPILLED_RESULT_FIELDS if field in calculation_result
+        })
+    
+    @staticmethod
+    def discard(records):
+        """Remove spill files left by a previous batch"""
+        if isinstance(records, SpilledRecords):
+            records.discard()
+
+# ======================================================
+# BATCH RESULT EXPORT - WORKBOOK AND PARQUET
+# ======================================================
+BATCH_EXPORT_CHUNK_ROWS = 50000
+
+BATCH_DETAILED_COLUMNS = [
+    'Row_Index', 'Product_Type', 'Product_Code', 'Series', 'Standard', 'Size', 'Grade', 'Diameter_Type',
+    'Diameter_Value', 'Diameter_Unit', 'Length', 'Length_Unit', 'Material', 'Input_Mode',
+    'Weight_kg', 'Weight_lb', 'Quantity', 'Total_Weight_kg', 'Total_Weight_lb', 'Status'
+]
+# Parquet column types; every other Detailed_Results column is written as text
+BATCH_PARQUET_NUMERIC_COLUMNS = ('Quantity', 'Weight_kg', 'Weight_lb', 'Total_Weight_kg', 'Total_Weight_lb')
+
+class BatchResultExport:
+    """Write batch results, errors and summary as the results workbook or as Parquet files"""
+    
+    @staticmethod
+    def line_total(weight, quantity):
+        """weight × quantity, or None when the quantity is not a number"""
+        try:
+            return weight * quantity
+        except TypeError:
+            return None
+    
+    @staticmethod
+    def detailed_record(result):
+        """One Detailed_Results row for a successful batch result"""
+        calc = result['calculation_result']
+        input_data = result['input_data']
+        quantity = result.get('quantity', 1)
+        
+        return {
+            'Row_Index': result['row_index'] + 1,
+            'Product_Type': input_data.get('Product_Type', 'Auto-detected'),
+            'Product_Code': input_data.get('Product_Code', ''),
+            'Series': input_data.get('Series', 'Auto-detected'),
+            'Standard': input_data.get('Standard', 'Auto-detected'),
+            'Size': input_data.get('Size', 'N/A'),
+            'Grade': input_data.get('Grade', 'N/A'),
+            'Diameter_Type': input_data.get('Diameter_Type', 'Auto-detected'),
+            'Diameter_Value': input_data.get('Diameter_Value', 'Auto-calculated'),
+            'Diameter_Unit': input_data.get('Diameter_Unit', 'mm'),
+            'Length': input_data.get('Length', 'N/A'),
+            'Length_Unit': input_data.get('Length_Unit', 'mm'),
+            'Material': input_data.get('Material', 'Carbon Steel'),
+            'Input_Mode': result.get('input_mode', 'basic'),
+            'Weight_kg': calc['weight_kg'],
+            'Weight_lb': calc['weight_lb'],
+            'Quantity': quantity,
+            'Total_Weight_kg': BatchResultExport.line_total(calc['weight_kg'], quantity),
+            'Total_Weight_lb': BatchResultExport.line_total(calc['weight_lb'], quantity),
+            'Status': 'Success'
+        }
+    
+    @staticmethod
+    def detailed_frames(results, chunk_rows=BATCH_EXPORT_CHUNK_ROWS):
+        """Detailed_Results rows in frames of at most chunk_rows, so spilled results are never all in memory"""
+        records = []
+        for result in results:
+            records.append(BatchResultExport.detailed_record(result))
+            if len(records) >= chunk_rows:
+                yield pd.DataFrame(records, columns=BATCH_DETAILED_COLUMNS)
+                records = []
+        if records:
+            yield pd.DataFrame(records, columns=BATCH_DETAILED_COLUMNS)
+    
+    @staticmethod
+    def error_frames(errors, chunk_rows=BATCH_EXPORT_CHUNK_ROWS):
+        """Error records in frames of at most chunk_rows"""
+        iterator = iter(errors)
+        while True:
+            records = list(islice(iterator, chunk_rows))
+            if not records:
+                return
+            yield pd.DataFrame(records)
+    
+    @staticmethod
+    def processing_log(summary):
+        """The one-row Processing_Log sheet"""
+        success_rate = (summary['successful_calculations'] / summary['total_rows']) * 100 if summary['total_rows'] else 0.0
+        return pd.DataFrame({
+            'Timestamp': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+            'Total_Rows': [summary['total_rows']],
+            'Successful': [summary['successful_calculations']],
+            'Failed': [summary['failed_calculations']],
+            'Success_Rate': [f"{success_rate:.2f}%"],
+            'Total_Weight_kg': [summary['total_weight_kg']],
+            'Total_Weight_lb': [summary['total_weight_lb']],
+            'Processing_Time_seconds': [summary['processing_time']],
+            'Diameter_Type': [summary.get('diameter_type_used', 'Blank Diameter')]
+        })
+    
+    @staticmethod
+    def write_sheet(writer, sheet_name, frames):
+        """Write frames one below the other on a single sheet, with one header row"""
+        next_row = 0
+        for frame in frames:
+            frame.to_excel(writer, sheet_name=sheet_name, index=False, header=next_row == 0, startrow=next_row)
+            next_row += len(frame) + (1 if next_row == 0 else 0)
+    
+    @staticmethod
+    @Spans.span("export.batch_workbook")
+    def write_workbook(results, errors, summary, path):
+        """Summary, Detailed_Results, Error_Report and Processing_Log sheets in one workbook"""
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            pd.DataFrame([summary]).to_excel(writer, sheet_name='Summary', index=False)
+            if results:
+                BatchResultExport.write_sheet(writer, 'Detailed_Results', BatchResultExport.detailed_frames(results))
+            if errors:
+                BatchResultExport.write_sheet(writer, 'Error_Report', BatchResultExport.error_frames(errors))
+            BatchResultExport.processing_log(summary).to_excel(writer, sheet_name='Processing_Log', index=False)
+        return path
+    
+    @staticmethod
+    def parquet_detailed_frame(frame):
+        """Fixed column types, so every chunk matches the file schema"""
+        frame = frame.copy()
+        for column in frame.columns:
+            if column == 'Row_Index':
+                frame[column] = frame[column].astype('int64')
+            elif column in BATCH_PARQUET_NUMERIC_COLUMNS:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+            else:
+                frame[column] = [None if pd.isna(value) else str(value) for value in frame[column]]
+        return frame
+    
+    @staticmethod
+    def parquet_error_frame(frame):
+        """Error records with the row's input kept as one JSON text column"""
+        return pd.DataFrame({
+            'Row_Index': (frame['row_index'].astype('int64') + 1).tolist(),
+            'Input_Mode': [None if pd.isna(value) else str(value) for value in frame.get('input_mode', pd.Series([None] * len(frame)))],
+            'Error': frame['error'].astype(str).tolist(),
+            'Status': frame['status'].astype(str).tolist(),
+            'Input_Data': [json.dumps(value, default=spill_default) for value in frame['input_data']]
+        })
+    
+    @staticmethod
+    def write_parquet_frames(frames, path, schema):
+        """Stream frames into one Parquet file; an empty file still gets the schema"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        with pq.ParquetWriter(path, schema) as writer:
+            for frame in frames:
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+        return path
+    
+    @staticmethod
+    @Spans.span("export.batch_parquet")
+    def write_parquet(results, errors, summary, path):
+        """Detailed results to path; errors and the summary to <name>_errors.parquet and <name>_summary.json"""
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("Parquet output needs the pyarrow package")
+        import pyarrow as pa
+        
+        stem = os.path.splitext(path)[0]
+        detailed_schema = pa.schema([('Row_Index', pa.int64())] + [
+            (column, pa.float64() if column in BATCH_PARQUET_NUMERIC_COLUMNS else pa.string())
+            for column in BATCH_DETAILED_COLUMNS[1:]
+        ])
+        error_schema = pa.schema([('Row_Index', pa.int64())] + [(column, pa.string()) for column in ('Input_Mode', 'Error', 'Status', 'Input_Data')])
+        
+        BatchResultExport.write_parquet_frames(
+            (BatchResultExport.parquet_detailed_frame(frame) for frame in BatchResultExport.detailed_frames(results)),
+            path, detailed_schema
+        )
+        errors_path = BatchResultExport.write_parquet_frames(
+            (BatchResultExport.parquet_error_frame(frame) for frame in BatchResultExport.error_frames(errors)),
+            f"{stem}_errors.parquet", error_schema
+        )
+        summary_path = f"{stem}_summary.json"
+        with open(summary_path, 'w', encoding='utf-8') as summary_file:
+            json.dump(summary, summary_file, indent=2, default=str)
+        return path, errors_path, summary_path
+
+# ======================================================
+# BACKGROUND BATCH JOBS
+# ======================================================
+BATCH_JOB_WORKERS = 2
+BATCH_JOB_POLL_SECONDS = 1.0
+BATCH_JOB_RETENTION_SECONDS = 3600
+
+class BatchJob:
+    """One submitted batch file; the worker thread updates it and the UI polls it"""
+    
+    def __init__(self, job_id, file_name, total_rows, diameter_type):
+        self.job_id = job_id
+        self.file_name = file_name
+        self.total_rows = total_rows
+        self.diameter_type = diameter_type
+        self.status = "queued"
+        self.progress = 0.0
+        self.status_text = "Waiting for a free worker"
+        self.results = None
+        self.errors = None
+        self.summary = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+    
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+    
+    def update_progress(self, progress, status):
+        """Progress callback handed to the batch pipeline"""
+        self.progress = progress
+        self.status_text = status
+
+class BatchJobManager:
+    """Server-wide worker pool for batch files; jobs outlive the script run and the page that started them"""
+    
+    def __init__(self, max_workers=BATCH_JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, uploaded_file, diameter_type="Blank Diameter", execution_mode="auto", total_rows=None):
+        """Queue a batch file and return its job ID"""
+        # The widget's buffer is shared with later reruns, so the job reads its own copy
+        job_file = io.BytesIO(uploaded_file.getvalue())
+        job_file.name = uploaded_file.name
+        job = BatchJob(uuid.uuid4().hex[:12], uploaded_file.name, total_rows, diameter_type)
+        
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job.job_id] = job
+        self._pool.submit(self._run, job, job_file, execution_mode)
+        OperationLog.log_operation("Batch Job Submitted", True, f"Job: {job.job_id}, File: {job.file_name}, Rows: {total_rows}")
+        return job.job_id
+    
+    def _run(self, job, job_file, execution_mode):
+        """Worker: stream the file through the batch pipeline"""
+        job.status = "running"
+        job.update_progress(0.0, "Starting")
+        try:
+            job.results, job.errors, job.summary = StreamingBatchPipeline.process(
+                job_file, job.diameter_type, job.update_progress, execution_mode, job.total_rows
+            )
+            job.status = "completed"
+            OperationLog.log_operation("Batch Job", True, f"Job: {job.job_id}, Rows: {job.summary['total_rows']}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            OperationLog.log_operation("Batch Job", False, f"Job: {job.job_id}, Error: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+    
+    def get(self, job_id):
+        """Job by ID, or None if it was released or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def release(self, job_id):
+        """Forget a finished job once its session has taken the results"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+    
+    def active_count(self):
+        """Jobs queued or running on this server"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+    
+    def _purge_expired(self):
+        """Drop finished jobs nobody collected, with their spill files"""
+        cutoff = time.time() - BATCH_JOB_RETENTION_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                StreamingBatchPipeline.discard(job.results)
+                StreamingBatchPipeline.discard(job.errors)
+                del self._jobs[job_id]
+
+# ======================================================
+# PITCH DIAMETER LOOKUP - FIXED VERSION
+# ======================================================
+def get_pitch_diameter_from_thread_data(thread_standard, thread_size, thread_class):
+    """Get pitch diameter from thread data for threaded rod calculation - FIXED VERSION"""
+    try:
+        # Precomputed per snapshot, including the nominal-size fallback; misses are cached too
+        pitch_diameter = get_reference_snapshot().pitch_diameters.resolve(thread_standard, thread_size, thread_class)
+        if pitch_diameter is not None:
+            return float(pitch_diameter)
+        
+        return None
+    
+    except Exception as e:
+        CalculationIssues.report("warning", f"Could not retrieve pitch diameter: {str(e)}")
+        return None
+
+# ======================================================
+# COMPLETELY BULLETPROOF SIZE HANDLING - FIXED VERSION
+# ======================================================
+SIZE_PARSE_CACHE_SIZE = 4096
+
+# Series, nominal diameter in inch and mm, TPI or metric pitch, canonical key and sort value
+# (nominal inches for inch sizes, nominal mm for metric ones)
+SizeRecord = namedtuple('SizeRecord', ['text', 'series', 'nominal_in', 'nominal_mm', 'tpi', 'pitch_mm', 'key', 'sort_value'])
+
+METRIC_SIZE_PATTERN = re.compile(r'^M\s*(\d+(?:\.\d+)?)(?:\s*[X\-]\s*(\d+(?:\.\d+)?))?')
+# "#10", "1/2", "1-1/2", "1 1/2", "0.75", each optionally followed by "-TPI" ("3/8-16", "10-24", "2-1/4-4.5")
+INCH_SIZE_PATTERN = re.compile(
+    r'^(#)?\s*(?:(\d+)(?:\s*-\s*|\s+)(\d+)\s*/\s*(\d+)|(\d+)\s*/\s*(\d+)|(\d+(?:\.\d+)?))(?:\s*-\s*(\d+(?:\.\d+)?))?$'
+)
+
+def is_numbered_screw_size(designation, tpi):
+    """#0 and #5-#12 never clash with inch sizes; #1-#4 only when the thread is 36 TPI or finer"""
+    if not float(designation).is_integer():
+        return False
+    return designation == 0 or 5 <= designation <= 12 or (1 <= designation <= 4 and tpi is not None and tpi >= 36)
+
+def plain_size_value(text):
+    """Last-resort numeric value of a size string, 0.0 when it is not a number"""
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+def parse_size_text(text):
+    """Parse one stripped size string into a SizeRecord"""
+    upper = text.upper()
+    if not upper:
+        return SizeRecord(text, None, None, None, None, None, "", 0.0)
+    
+    if upper.startswith('M'):
+        match = METRIC_SIZE_PATTERN.match(upper)
+        if not match:
+            return SizeRecord(text, 'Metric', None, None, None, None, re.sub(r'\s+', '', upper), 0.0)
+        nominal_mm = float(match.group(1))
+        pitch_mm = float(match.group(2)) if match.group(2) else None
+        key = f"M{nominal_mm:g}" + (f"X{pitch_mm:g}" if pitch_mm is not None else "")
+        return SizeRecord(text, 'Metric', nominal_mm / 25.4, nominal_mm, None, pitch_mm, key, nominal_mm)
+    
+    if '/' not in upper and not any(char.isdigit() for char in upper):
+        return SizeRecord(text, None, None, None, None, None, upper, plain_size_value(text))
+    
+    match = INCH_SIZE_PATTERN.match(upper)
+    key = re.sub(r'\s+', '', upper)
+    if not match:
+        return SizeRecord(text, 'Inch', None, None, None, None, key, plain_size_value(text))
+    
+    gauge, whole, mixed_num, mixed_den, num, den, number, tpi = match.groups()
+    try:
+        if mixed_den:
+            designation = int(whole) + float(Fraction(int(mixed_num), int(mixed_den)))
+        elif den:
+            designation = float(Fraction(int(num), int(den)))
+        else:
+            designation = float(number)
+    except ZeroDivisionError:
+        return SizeRecord(text, 'Inch', None, None, None, None, key, 0.0)
+    
+    tpi = float(tpi) if tpi else None
+    if tpi is not None and tpi.is_integer():
+        tpi = int(tpi)
+    
+    # Numbered machine screw sizes: "#10" and "10-24" are 0.190"; "1-8" stays 1 inch
+    if gauge or (not mixed_den and not den and is_numbered_screw_size(designation, tpi)):
+        nominal_in = 0.060 + 0.013 * designation
+    else:
+        nominal_in = designation
+    pitch_mm = 25.4 / tpi if tpi else None
+    return SizeRecord(text, 'Inch', nominal_in, nominal_in * 25.4, tpi, pitch_mm, key, nominal_in)
+
+# Sizes sort by series first, so inch and metric sizes never interleave; unparsed text comes first
+SIZE_SERIES_ORDER = {'Inch': 1, 'Metric': 2}
+
+# Process-wide LRU-cached size parser, kept across reruns
+cached_size_parser = lru_cache(maxsize=SIZE_PARSE_CACHE_SIZE)(parse_size_text)
+
+def parse_fastener_size(size):
+    """Structured size record for "1-1/2", "3/8-16", "M10", "M10 X 1.5", "#10" and plain numbers"""
+    if not isinstance(size, (str, int, float)) or pd.isna(size):
+        return SizeRecord("", None, None, None, None, None, "", 0.0)
+    return cached_size_parser(str(size).strip())
+
+def parse_fastener_sizes(sizes):
+    """Vectorized parse of a whole column: one parse per distinct value, one row per input"""
+    sizes = pd.Series(sizes)
+    codes, uniques = pd.factorize(sizes)
+    records = [parse_fastener_size(size) for size in uniques]
+    records.append(parse_fastener_size(None))  # missing values (code -1)
+    parsed = pd.DataFrame.from_records(records, columns=SizeRecord._fields)
+    parsed = parsed.iloc[np.where(codes < 0, len(records) - 1, codes)]
+    parsed.index = sizes.index
+    return parsed
+
+def size_to_float(size_str):
+    """Convert size string to float for sorting - ULTRA ROBUST VERSION"""
+    try:
+        return parse_fastener_size(size_str).sort_value
+    except Exception as e:
+        return 0.0
+
+def safe_sort_sizes(size_list):
+    """Safely sort size list with multiple fallbacks"""
+    if not size_list or len(size_list) == 0:
+        return []
+    
+    try:
+        parsed = parse_fastener_sizes(list(size_list))
+        series_ranks = parsed['series'].map(SIZE_SERIES_ORDER).fillna(0).tolist()
+        sort_keys = zip(series_ranks, parsed['sort_value'].tolist(), [str(x) for x in size_list])
+        return [size for _, size in sorted(zip(sort_keys, size_list), key=lambda item: item[0])]
+    except:
+        try:
+            return sorted(size_list, key=str)
+        except:
+            return list(size_list)
+
+def get_safe_size_options(temp_df):
+    """Completely safe way to get size options - FIXED VERSION"""
+    size_options = ["All"]
+    
+    if temp_df is None or temp_df.empty:
+        return size_options
+    
+    if 'Size' not in temp_df.columns:
+        return size_options
+    
+    try:
+        # Get unique sizes and handle NaN values properly
+        unique_sizes = temp_df['Size'].dropna().unique()
+        
+        # Convert all sizes to string and filter out empty strings
+        unique_sizes = [str(size) for size in unique_sizes if str(size).strip() != '']
+        
+        if len(unique_sizes) > 0:
+            parsed = parse_fastener_sizes(unique_sizes)
+            parsed['size'] = unique_sizes
+            parsed['series_rank'] = parsed['series'].map(SIZE_SERIES_ORDER).fillna(0)
+            size_options.extend(parsed.sort_values(['series_rank', 'sort_value', 'size'], kind='stable')['size'].tolist())
+        else:
+            return ["All"]
+    except Exception as e:
+        CalculationIssues.report("warning", f"Size processing warning: {str(e)}")
+        try:
+            unique_sizes = temp_df['Size'].dropna().unique()
+            unique_sizes = [str(size) for size in unique_sizes if str(size).strip() != '']
+            size_options.extend(list(unique_sizes))
+        except:
+            pass
+    
+    return size_options
+
+# ======================================================
+# RECTIFIED UNIT CONVERSION FUNCTIONS - FIXED VERSION
+# ======================================================
+def convert_to_mm(value, from_unit):
+    """Convert any unit to millimeters - FIXED: No unnecessary conversion"""
+    try:
+        if pd.isna(value):
+            return 0.0
+        
+        value = float(value)
+        
+        # Only convert if the unit is NOT mm
+        if from_unit == 'mm':
+            return value  # Already in mm, no conversion needed
+        elif from_unit == 'inch':
+            return value * 25.4  # Convert inches to mm
+        elif from_unit == 'ft':
+            return value * 304.8  # Convert feet to mm
+        elif from_unit == 'meter':
+            return value * 1000  # Convert meters to mm
+        else:
+            return value  # Assume mm if unknown unit
+    except Exception as e:
+        CalculationIssues.report("warning", f"Unit conversion error: {str(e)}")
+        return value
+
+# ======================================================
+# FIXED: SEPARATE DATA FETCHING FOR SOCKET HEAD PRODUCTS
+# ======================================================
+
+def get_asme_b18_3_dimensions(product, size, snapshot=None):
+    """FIXED VERSION: Get head diameter and head height for ASME B18.3 socket head cap screws"""
+    try:
+        original_unit = "inch"  # ASME B18.3 data is in inches
+        snapshot = snapshot or get_reference_snapshot()
+        
+        # Indexed size lookup, then narrow the few matching rows to socket head products
+        temp_df = query_standard_table("ASME B18.3", size=size, snapshot=snapshot).frame()
+        if 'Product' in temp_df.columns and product != "All":
+            temp_df = temp_df[temp_df['Product'].str.contains('Socket Head', na=False, case=False)]
+        
+        if temp_df.empty:
+            CalculationIssues.report("warning", f"No ASME B18.3 data found for {product} size {size}")
+            return None, None, original_unit
+        
+        # SPECIFIC ASME B18.3 COLUMN MAPPING FOR HEAD DIAMETER (MIN) AND HEAD HEIGHT (MIN)
+        schema = snapshot.schemas["ASME B18.3"]
+        head_dia_col = schema['socket_head_diameter']
+        head_height_col = schema['socket_head_height']
+        
+        # Debug: Show available columns
+        if CalculationIssues.wants_debug():
+            CalculationIssues.report("debug", f"ASME B18.3 Debug - Size: {size}")
+            CalculationIssues.report("debug", f"All columns: {temp_df.columns.tolist()}")
+        
+        # Debug: Show found columns
+        if CalculationIssues.wants_debug():
+            CalculationIssues.report("debug", f"Head Diameter Column: {head_dia_col}")
+            CalculationIssues.report("debug", f"Head Height Column: {head_height_col}")
+        
+        head_diameter = None
+        head_height = None
+        
+        # Get Head Diameter (Min) value
+        if head_dia_col and head_dia_col in temp_df.columns:
+            head_diameter_val = temp_df[head_dia_col].iloc[0]
+            if pd.notna(head_diameter_val):
+                try:
+                    head_diameter = float(head_diameter_val)
+                    if CalculationIssues.wants_debug():
+                        CalculationIssues.report("debug", f"Head Diameter from {head_dia_col}: {head_diameter}")
+                except (ValueError, TypeError) as e:
+                    CalculationIssues.report("warning", f"Could not convert head diameter value: {head_diameter_val}")
+        
+        # Get Head Height (Min) value
+        if head_height_col and head_height_col in temp_df.columns:
+            head_height_val = temp_df[head_height_col].iloc[0]
+            if pd.notna(head_height_val):
+                try:
+                    head_height = float(head_height_val)
+                    if CalculationIssues.wants_debug():
+                        CalculationIssues.report("debug", f"Head Height from {head_height_col}: {head_height}")
+                except (ValueError, TypeError) as e:
+                    CalculationIssues.report("warning", f"Could not convert head height value: {head_height_val}")
+        
+        # If still no values found, try alternative approaches
+        if head_diameter is None:
+            # Try any other head diameter column
+            for col in schema['socket_head_diameter_fallbacks']:
+                try:
+                    head_diameter = float(temp_df[col].iloc[0])
+                    head_dia_col = col
+                    break
+                except:
+                    continue
+        
+        if head_height is None:
+            # Try any other head height column
+            for col in schema['socket_head_height_fallbacks']:
+                try:
+                    head_height = float(temp_df[col].iloc[0])
+                    head_height_col = col
+                    break
+                except:
+                    continue
+        
+        # Final debug information
+        if CalculationIssues.wants_debug():
+            CalculationIssues.report("debug", f"ASME B18.3 Final Head Diameter: {head_diameter}")
+            CalculationIssues.report("debug", f"ASME B18.3 Final Head Height: {head_height}")
+            CalculationIssues.report("debug", f"Head Diameter Column Used: {head_dia_col}")
+            CalculationIssues.report("debug", f"Head Height Column Used: {head_height_col}")
+        
+        OperationLog.log_operation(f"Get ASME B18.3 Dimensions", True, f"Head Dia: {head_diameter}, Head Height: {head_height}")
+        return head_diameter, head_height, original_unit
+    
+    except Exception as e:
+        CalculationIssues.report("error", f"Error getting ASME B18.3 dimensions: {str(e)}")
+        OperationLog.log_operation("Get ASME B18.3 Dimensions", False, str(e))
+        return None, None, "inch"
+
+def get_din7991_dimensions(product, size, snapshot=None):
+    """SEPARATE FUNCTION: Get head diameter and head height for DIN-7991 socket countersunk head cap screws"""
+    try:
+        original_unit = "mm"  # DIN-7991 data is in mm
+        snapshot = snapshot or get_reference_snapshot()
+        
+        temp_df = query_standard_table("DIN-7991", product, size, snapshot=snapshot).frame()
+        
+        if temp_df.empty:
+            return None, None, original_unit
+        
+        # SPECIFIC COLUMN MAPPING FOR DIN-7991 (dk / k), resolved at load time
+        schema = snapshot.schemas["DIN-7991"]
+        head_dia_col = schema['socket_head_diameter']
+        head_height_col = schema['socket_head_height']
+        
+        head_diameter = None
+        head_height = None
+        
+        if head_dia_col and head_dia_col in temp_df.columns:
+            head_diameter = temp_df[head_dia_col].iloc[0]
+            if pd.notna(head_diameter):
+                head_diameter = float(head_diameter)
+        
+        if head_height_col and head_height_col in temp_df.columns:
+            head_height = temp_df[head_height_col].iloc[0]
+            if pd.notna(head_height):
+                head_height = float(head_height)
+        
+        # Debug information
+        if CalculationIssues.wants_debug():
+            CalculationIssues.report("debug", f"DIN-7991 Debug - Size: {size}")
+            CalculationIssues.report("debug", f"Head Diameter Column: {head_dia_col}, Value: {head_diameter}")
+            CalculationIssues.report("debug", f"Head Height Column: {head_height_col}, Value: {head_height}")
+            CalculationIssues.report("debug", f"Available columns: {temp_df.columns.tolist()}")
+        
+        OperationLog.log_operation(f"Get DIN-7991 Dimensions", True, f"Head Dia: {head_diameter}, Head Height: {head_height}")
+        return head_diameter, head_height, original_unit
+    
+    except Exception as e:
+        CalculationIssues.report("warning", f"Error getting DIN-7991 dimensions: {str(e)}")
+        OperationLog.log_operation("Get DIN-7991 Dimensions", False, str(e))
+        return None, None, "mm"
+
+@Spans.span("dimension_lookup")
+def get_socket_head_dimensions(standard, product, size, grade="All", snapshot=None):
+    """MAIN FUNCTION: Route to appropriate socket head dimension function based on standard"""
+    try:
+        if standard == "ASME B18.3":
+            return get_asme_b18_3_dimensions(product, size, snapshot)
+        elif standard == "DIN-7991":
+            return get_din7991_dimensions(product, size, snapshot)
+        else:
+            return None, None, "unknown"
+    except Exception as e:
+        CalculationIssues.report("warning", f"Error in get_socket_head_dimensions for {standard}: {str(e)}")
+        return None, None, "unknown"
+
+@Spans.span("dimension_lookup")
+def get_hex_head_dimensions(standard, product, size, grade="All", snapshot=None):
+    """RECTIFIED: Get width across flats and head height for hex products from database with proper unit tracking"""
+    try:
+        if standard not in STANDARD_UNITS:
+            return None, None, "unknown"
+        original_unit = STANDARD_UNITS[standard]
+        snapshot = snapshot or get_reference_snapshot()
+        
+        temp_df = query_standard_table(standard, product, size, grade, snapshot=snapshot).frame()
+        
+        if temp_df.empty:
+            return None, None, original_unit
+        
+        # Column roles resolved once when the table was loaded
+        schema = snapshot.schemas[standard]
+        width_col = schema['width_across_flats']
+        height_col = schema['head_height']
+        
+        width_across_flats = None
+        head_height = None
+        
+        if width_col and width_col in temp_df.columns:
+            width_across_flats = temp_df[width_col].iloc[0]
+            if pd.notna(width_across_flats):
+                width_across_flats = float(width_across_flats)
+        
+        if height_col and height_col in temp_df.columns:
+            head_height = temp_df[height_col].iloc[0]
+            if pd.notna(head_height):
+                head_height = float(head_height)
+        
+        OperationLog.log_operation(f"Get Hex Head Dimensions", True, f"Width: {width_across_flats}, Height: {head_height}")
+        return width_across_flats, head_height, original_unit
+    
+    except Exception as e:
+        CalculationIssues.report("warning", f"Error getting hex head dimensions: {str(e)}")
+        OperationLog.log_operation("Get Hex Head Dimensions", False, str(e))
+        return None, None, "unknown"
+
+# ======================================================
+# FIXED: VOLUME CALCULATION FUNCTIONS FOR SOCKET HEAD PRODUCTS
+# ======================================================
+
+def calculate_socket_head_volume_rectified(head_diameter_mm, head_height_mm):
+    """Calculate volume for socket head using cylinder formula - FIXED: No head angle"""
+    try:
+        # For socket head, we use cylinder volume formula: V = 0.7853 × d² × h
+        head_volume_mm3 = 0.7853 * (head_diameter_mm ** 2) * head_height_mm
+        return head_volume_mm3
+    except Exception as e:
+        CalculationIssues.report("warning", f"Error calculating socket head volume: {str(e)}")
+        return 0.0
+
+def calculate_shank_volume_rectified(diameter_mm, length_mm):
+    """Calculate shank volume using cylinder formula"""
+    try:
+        # Shank volume formula: V = 0.7853 × d² × L
+        shank_volume_mm3 = 0.7853 * (diameter_mm ** 2) * length_mm
+        return shank_volume_mm3
+    except Exception as e:
+        CalculationIssues.report("warning", f"Error calculating shank volume: {str(e)}")
+        return 0.0
+
+# ======================================================
+# WEIGHT RESULT BUILDERS - SHARED BY SINGLE AND BATCH CALCULATIONS
+# ======================================================
+SOCKET_HEAD_PRODUCTS = ["Hexagon Socket Head Cap Screws", "Hexagon Socket Countersunk Head Cap Screw"]
+HEX_PRODUCTS = ["Hex Bolt", "Heavy Hex Bolt", "Hex Cap Screws", "Heavy Hex Screws"]
+
+SOCKET_RESULT_FIELDS = (
+    'weight_kg', 'weight_g', 'weight_lb', 'shank_volume_mm3', 'head_volume_mm3', 'total_volume_mm3',
+    'total_volume_cm3', 'diameter_mm', 'length_mm', 'head_diameter_mm', 'head_height_mm', 'density_g_cm3'
+)
+HEX_RESULT_FIELDS = (
+    'weight_kg', 'weight_g', 'weight_lb', 'shank_volume_mm3', 'head_volume_mm3', 'total_volume_mm3',
+    'total_volume_cm3', 'diameter_mm', 'length_mm', 'width_across_flats_mm', 'head_height_mm',
+    'side_length_mm', 'density_g_cm3'
+)
+CYLINDER_RESULT_FIELDS = (
+    'weight_kg', 'weight_g', 'weight_lb', 'volume_mm3', 'volume_cm3', 'density_g_cm3', 'diameter_mm', 'length_mm'
+)
+
+SOCKET_FORMULA_DETAILS = {
+    'shank_volume_formula': '0.7853 × (diameter)² × length (mm³)',
+    'head_volume_formula': '0.7853 × (head_diameter_min)² × head_height_min (mm³)',
+    'total_volume_formula': 'shank_volume + head_volume (mm³)',
+    'volume_conversion': 'mm³ to cm³: divide by 1000',
+    'weight_formula': 'total_volume_cm³ × density_g/cm³'
+}
+HEX_FORMULA_DETAILS = {
+    'shank_volume_formula': '0.7853 × (diameter)² × length (mm³)',
+    'head_volume_formula': '0.65 × side_length² × head_height (mm³)',
+    'side_length_formula': 'width_across_flats × 1.1547 (mm)',
+    'total_volume_formula': 'shank_volume + head_volume (mm³)',
+    'volume_conversion': 'mm³ to cm³: divide by 1000',
+    'weight_formula': 'total_volume_cm³ × density_g/cm³'
+}
+FORMULA_DETAILS_BY_METHOD = {
+    'Socket Head Formula': SOCKET_FORMULA_DETAILS,
+    'Hex Product Formula': HEX_FORMULA_DETAILS,
+}
+
+def formula_details_for(calculation_method):
+    """Formula text for a calculation method, for results that were stored without it"""
+    return dict(FORMULA_DETAILS_BY_METHOD.get(calculation_method, {}))
+
+def build_socket_weight_result(numbers, diameter_value, diameter_unit, length, length_unit, head_diameter, head_height, original_unit):
+    """Socket head result dict from computed numbers (SOCKET_RESULT_FIELDS) and the raw inputs"""
+    result = dict(numbers)
+    result.update({
+        'original_diameter': f"{diameter_value} {diameter_unit}",
+        'original_length': f"{length} {length_unit}",
+        'original_head_diameter': f"{head_diameter} {original_unit}" if head_diameter else "N/A",
+        'original_head_height': f"{head_height} {original_unit}" if head_height else "N/A",
+        'calculation_method': 'Socket Head Formula',
+        'formula_details': dict(SOCKET_FORMULA_DETAILS),
+        'dimensions_used': {
+            'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
+            'diameter_calculation_mm': f"{numbers['diameter_mm']:.4f}",
+            'length_input': f"{length:.4f} {length_unit}",
+            'length_calculation_mm': f"{numbers['length_mm']:.4f}",
+            'head_diameter_input': f"{head_diameter:.4f} {original_unit}" if head_diameter else "Estimated",
+            'head_diameter_calculation_mm': f"{numbers['head_diameter_mm']:.4f}",
+            'head_height_input': f"{head_height:.4f} {original_unit}" if head_height else "Estimated",
+            'head_height_calculation_mm': f"{numbers['head_height_mm']:.4f}",
+            'shank_volume_mm3': f"{numbers['shank_volume_mm3']:.4f}",
+            'head_volume_mm3': f"{numbers['head_volume_mm3']:.4f}",
+            'total_volume_mm3': f"{numbers['total_volume_mm3']:.4f}",
+            'total_volume_cm3': f"{numbers['total_volume_cm3']:.4f}",
+            'density_g_cm3': f"{numbers['density_g_cm3']:.4f}"
+        }
+    })
+    return result
+
+def build_hex_weight_result(numbers, diameter_value, diameter_unit, length, length_unit, width_across_flats, head_height, original_unit):
+    """Hex product result dict from computed numbers (HEX_RESULT_FIELDS) and the raw inputs"""
+    result = dict(numbers)
+    result.update({
+        'original_diameter': f"{diameter_value} {diameter_unit}",
+        'original_length': f"{length} {length_unit}",
+        'original_width_across_flats': f"{width_across_flats} {original_unit}" if width_across_flats else "N/A",
+        'original_head_height': f"{head_height} {original_unit}" if head_height else "N/A",
+        'calculation_method': 'Hex Product Formula',
+        'formula_details': dict(HEX_FORMULA_DETAILS),
+        'dimensions_used': {
+            'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
+            'diameter_calculation_mm': f"{numbers['diameter_mm']:.4f}",
+            'length_input': f"{length:.4f} {length_unit}",
+            'length_calculation_mm': f"{numbers['length_mm']:.4f}",
+            'width_across_flats_input': f"{width_across_flats:.4f} {original_unit}" if width_across_flats else "Estimated",
+            'width_across_flats_calculation_mm': f"{numbers['width_across_flats_mm']:.4f}",
+            'head_height_input': f"{head_height:.4f} {original_unit}" if head_height else "Estimated",
+            'head_height_calculation_mm': f"{numbers['head_height_mm']:.4f}",
+            'side_length_calculation_mm': f"{numbers['side_length_mm']:.4f}",
+            'shank_volume_mm3': f"{numbers['shank_volume_mm3']:.4f}",
+            'head_volume_mm3': f"{numbers['head_volume_mm3']:.4f}",
+            'total_volume_mm3': f"{numbers['total_volume_mm3']:.4f}",
+            'total_volume_cm3': f"{numbers['total_volume_cm3']:.4f}",
+            'density_g_cm3': f"{numbers['density_g_cm3']:.4f}"
+        }
+    })
+    return result
+
+def build_cylinder_weight_result(numbers, diameter_value, diameter_unit, length, length_unit, calculation_method):
+    """Threaded rod / standard cylinder result dict from computed numbers (CYLINDER_RESULT_FIELDS)"""
+    result = dict(numbers)
+    if calculation_method == 'Standard Cylinder Formula':
+        result['original_diameter'] = f"{diameter_value:.4f} {diameter_unit}"
+        result['original_length'] = f"{length:.4f} {length_unit}"
+    else:
+        result['original_diameter'] = f"{diameter_value} {diameter_unit}"
+        result['original_length'] = f"{length} {length_unit}"
+    result['calculation_method'] = calculation_method
+    result['dimensions_used'] = {
+        'diameter_input': f"{diameter_value:.4f} {diameter_unit}",
+        'diameter_calculation_mm': f"{numbers['diameter_mm']:.4f}",
+        'length_input': f"{length:.4f} {length_unit}",
+        'length_calculation_mm': f"{numbers['length_mm']:.4f}",
+        'volume_mm3': f"{numbers['volume_mm3']:.4f}",
+        'volume_cm3': f"{numbers['volume_cm3']:.4f}",
+        'density_g_cm3': f"{numbers['density_g_cm3']:.4f}"
+    }
+    return result
+
+def calculate_socket_product_weight_rectified(parameters, head_diameter, head_height, original_unit):
+    """FIXED: Calculate weight for Socket Head Products (ASME B18.3 and DIN-7991)"""
+    try:
+        # Extract parameters
+        product_type = parameters.get('product_type', 'Hexagon Socket Head Cap Screws')
+        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
+        diameter_value = parameters.get('diameter_value', 0.0)
+        diameter_unit = parameters.get('diameter_unit', 'mm')
+        length = parameters.get('length', 0.0)
+        length_unit = parameters.get('length_unit', 'mm')
+        material = parameters.get('material', 'Carbon Steel')
+        
+        # Convert dimensions to mm only if needed
+        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
+        length_mm = convert_to_mm(length, length_unit)
+        
+        # Convert head dimensions to mm (they should already be in mm from database)
+        if head_diameter is not None:
+            head_diameter_mm = convert_to_mm(head_diameter, original_unit)
+        else:
+            head_diameter_mm = diameter_mm * 1.5  # Default ratio if not available
+        
+        if head_height is not None:
+            head_height_mm = convert_to_mm(head_height, original_unit)
+        else:
+            head_height_mm = diameter_mm * 0.65  # Default ratio if not available
+        
+        # Get material density in g/cm³
+        density_g_cm3 = get_material_density_rectified(material)
+        
+        # Calculate volumes in mm³
+        shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
+        head_volume_mm3 = calculate_socket_head_volume_rectified(head_diameter_mm, head_height_mm)
+        total_volume_mm3 = shank_volume_mm3 + head_volume_mm3
+        
+        # Convert mm³ to cm³ for weight calculation
+        total_volume_cm3 = total_volume_mm3 / 1000
+        
+        # Calculate Weight in grams and kg
+        weight_g = total_volume_cm3 * density_g_cm3
+        weight_kg = weight_g / 1000
+        weight_lb = weight_kg * 2.20462
+        
+        numbers = dict(zip(SOCKET_RESULT_FIELDS, (
+            weight_kg, weight_g, weight_lb, shank_volume_mm3, head_volume_mm3, total_volume_mm3,
+            total_volume_cm3, diameter_mm, length_mm, head_diameter_mm, head_height_mm, density_g_cm3
+        )))
+        result = build_socket_weight_result(numbers, diameter_value, diameter_unit, length, length_unit,
+                                            head_diameter, head_height, original_unit)
+        
+        OperationLog.log_operation("Socket Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
+        return result
+    
+    except Exception as e:
+        CalculationIssues.report("error", f"Socket product calculation error: {str(e)}")
+        OperationLog.log_operation("Socket Product Weight Calculation", False, str(e))
+        return None
+
+def calculate_hex_product_weight_rectified(parameters, width_across_flats, head_height, original_unit):
+    """FIXED: Calculate weight for hex products with detailed parameters"""
+    try:
+        # Extract parameters
+        product_type = parameters.get('product_type', 'Hex Bolt')
+        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
+        diameter_value = parameters.get('diameter_value', 0.0)
+        diameter_unit = parameters.get('diameter_unit', 'mm')
+        length = parameters.get('length', 0.0)
+        length_unit = parameters.get('length_unit', 'mm')
+        material = parameters.get('material', 'Carbon Steel')
+        
+        # Convert dimensions to mm only if needed
+        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
+        length_mm = convert_to_mm(length, length_unit)
+        
+        # Convert head dimensions to mm (they should already be in mm from database)
+        if width_across_flats is not None:
+            width_across_flats_mm = convert_to_mm(width_across_flats, original_unit)
+        else:
+            width_across_flats_mm = diameter_mm * 1.5  # Default ratio if not available
+        
+        if head_height is not None:
+            head_height_mm = convert_to_mm(head_height, original_unit)
+        else:
+            head_height_mm = diameter_mm * 0.65  # Default ratio if not available
+        
+        # Get material density in g/cm³
+        density_g_cm3 = get_material_density_rectified(material)
+        
+        # Calculate volumes in mm³
+        shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
+        
+        # Calculate Head Volume using the specific formula in mm³
+        side_length_mm = width_across_flats_mm * 1.1547
+        head_volume_mm3 = 0.65 * (side_length_mm**2) * head_height_mm
+        
+        # Total Volume in mm³
+        total_volume_mm3 = shank_volume_mm3 + head_volume_mm3
+        
+        # Convert mm³ to cm³ for weight calculation
+        total_volume_cm3 = total_volume_mm3 / 1000
+        
+        # Calculate Weight in grams and kg
+        weight_g = total_volume_cm3 * density_g_cm3
+        weight_kg = weight_g / 1000
+        weight_lb = weight_kg * 2.20462
+        
+        numbers = dict(zip(HEX_RESULT_FIELDS, (
+            weight_kg, weight_g, weight_lb, shank_volume_mm3, head_volume_mm3, total_volume_mm3,
+            total_volume_cm3, diameter_mm, length_mm, width_across_flats_mm, head_height_mm,
+            side_length_mm, density_g_cm3
+        )))
+        result = build_hex_weight_result(numbers, diameter_value, diameter_unit, length, length_unit,
+                                         width_across_flats, head_height, original_unit)
+        
+        OperationLog.log_operation("Hex Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
+        return result
+    
+    except Exception as e:
+        CalculationIssues.report("error", f"Hex product calculation error: {str(e)}")
+        OperationLog.log_operation("Hex Product Weight Calculation", False, str(e))
+        return None
+
+# ======================================================
+# WEIGHT CALCULATION - DENSITY AND CACHED ENTRY POINT
+# ======================================================
+MATERIAL_DENSITIES = {
+    "Carbon Steel": 7.85,
+    "Stainless Steel": 8.00,
+    "Alloy Steel": 7.85,
+    "Brass": 8.50,
+    "Aluminum": 2.70,
+    "Copper": 8.96,
+    "Titanium": 4.50,
+    "Bronze": 8.80,
+    "Inconel": 8.20,
+    "Monel": 8.80,
+    "Nickel": 8.90
+}
+
+def get_material_density_rectified(material):
+    """RECTIFIED: Get density for different materials in g/cm³"""
+    return MATERIAL_DENSITIES.get(material, 7.85)  # Default to carbon steel
+
+@Spans.span("weight_calculation")
+def calculate_weight_rectified(parameters):
+    """Weight calculation served from the weight catalog or the result cache when possible"""
+    snapshot = get_reference_snapshot()
+    catalog = get_weight_catalog(snapshot)
+    catalog_result = catalog.lookup(parameters) if catalog is not None else None
+    if catalog_result is not None:
+        return catalog_result
+    
+    reference_version = snapshot.version
+    cache_key = WeightResultCache.parameter_key(parameters, reference_version)
+    cached_result = weight_result_cache.get_many([cache_key]).get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    with CalculationIssues.collect() as issues:
+        result = compute_weight_rectified(parameters, snapshot)
+    # Results that needed a warning (missing dimensions, bad values) are recomputed so the warning shows again
+    if result is not None and all(level == "debug" for level, _ in issues):
+        weight_result_cache.put_many([(cache_key, result)], reference_version)
+    return result
+
+@Spans.span("weight_calculation.bulk")
+def calculate_weights_rectified(parameter_list):
+    """calculate_weight_rectified for many inputs: one cache round trip, each distinct input computed once; (result, issues) per input"""
+    snapshot = get_reference_snapshot()
+    catalog = get_weight_catalog(snapshot)
+    catalog_results = [catalog.lookup(parameters) if catalog is not None else None for parameters in parameter_list]
+    
+    reference_version = snapshot.version
+    cache_keys = [
+        WeightResultCache.parameter_key(parameters, reference_version) if catalog_result is None else None
+        for parameters, catalog_result in zip(parameter_list, catalog_results)
+    ]
+    cached_results = weight_result_cache.get_many([key for key in dict.fromkeys(cache_keys) if key is not None])
+    
+    computed = {}
+    new_items = []
+    for cache_key, parameters in zip(cache_keys, parameter_list):
+        if cache_key is None or cache_key in cached_results or cache_key in computed:
+            continue
+        with CalculationIssues.collect() as issues:
+            result = compute_weight_rectified(parameters, snapshot)
+        computed[cache_key] = (result, list(issues))
+        if result is not None and all(level == "debug" for level, _ in issues):
+            new_items.append((cache_key, result))
+    if new_items:
+        weight_result_cache.put_many(new_items, reference_version)
+    
+    return [
+        (catalog_result, []) if catalog_result is not None
+        else (cached_results[cache_key], []) if cache_key in cached_results
+        else computed[cache_key]
+        for catalog_result, cache_key in zip(catalog_results, cache_keys)
+    ]
+
+def compute_weight_rectified(parameters, snapshot=None):
+    """FIXED: Enhanced weight calculation with proper data fetching for ALL products; snapshot defaults to the served one"""
+    try:
+        # Extract parameters
+        product_type = parameters.get('product_type', 'Hex Bolt')
+        diameter_type = parameters.get('diameter_type', 'Blank Diameter')
+        diameter_value = parameters.get('diameter_value', 0.0)
+        diameter_unit = parameters.get('diameter_unit', 'mm')
+        length = parameters.get('length', 0.0)
+        length_unit = parameters.get('length_unit', 'mm')
+        material = parameters.get('material', 'Carbon Steel')
+        standard = parameters.get('standard', 'ASME B18.2.1')
+        size = parameters.get('size', 'All')
+        grade = parameters.get('grade', 'All')
+        
+        # SPECIAL CASE: For Socket Head Products (ASME B18.3 and DIN-7991)
+        if product_type in SOCKET_HEAD_PRODUCTS:
+            # Get socket head dimensions from SEPARATE functions based on standard
+            head_diameter, head_height, original_unit = get_socket_head_dimensions(standard, product_type, size, grade, snapshot)
+            
+            # Store original dimensions for display
+            original_head_diameter = head_diameter
+            original_head_height = head_height
+            
+            # If dimensions not found in database, use default ratios
+            if head_diameter is None:
+                # Estimate head diameter based on shank diameter
+                diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
+                head_diameter = diameter_mm_temp * 1.5  # Default ratio
+                original_head_diameter = head_diameter
+                original_unit = "mm"  # Default to mm for estimated values
+            
+            if head_height is None:
+                # Estimate head height based on shank diameter
+                diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
+                head_height = diameter_mm_temp * 0.65  # Default ratio
+                original_head_height = head_height
+            
+            # Calculate using socket head formula - SAME FORMULA FOR BOTH
+            return calculate_socket_product_weight_rectified(parameters, head_diameter, head_height, original_unit)
+        
+        # For hex products, get hex head dimensions
+        width_across_flats, head_height, original_unit = get_hex_head_dimensions(standard, product_type, size, grade, snapshot)
+        
+        # Store original dimensions for display
+        original_width_across_flats = width_across_flats
+        original_head_height = head_height
+        
+        # If dimensions not found in database, use default ratios
+        if width_across_flats is None:
+            # Estimate width across flats based on diameter
+            diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
+            width_across_flats = diameter_mm_temp * 1.5  # Default ratio
+            original_width_across_flats = width_across_flats
+            original_unit = "mm"  # Default to mm for estimated values
+        
+        if head_height is None:
+            # Estimate head height based on diameter
+            diameter_mm_temp = convert_to_mm(diameter_value, diameter_unit)
+            head_height = diameter_mm_temp * 0.65  # Default ratio
+            original_head_height = head_height
+        
+        # Convert dimensions to mm only if needed
+        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
+        length_mm = convert_to_mm(length, length_unit)
+        
+        # Pitch diameters arrive as diameter_value/diameter_unit (inch for ASME B1.1, mm for ISO),
+        # so convert_to_mm above already covers them
+        
+        # Get material density in g/cm³
+        density_g_cm3 = get_material_density_rectified(material)
+        
+        # For Threaded Rod, use simple cylinder volume calculation in mm³
+        if product_type == "Threaded Rod":
+            # Simple cylinder volume for threaded rod in mm³
+            shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
+            
+            # Convert mm³ to cm³ for weight calculation
+            volume_cm3 = shank_volume_mm3 / 1000
+            weight_g = volume_cm3 * density_g_cm3
+            weight_kg = weight_g / 1000
+            weight_lb = weight_kg * 2.20462
+            
+            numbers = dict(zip(CYLINDER_RESULT_FIELDS, (
+                weight_kg, weight_g, weight_lb, shank_volume_mm3, volume_cm3, density_g_cm3, diameter_mm, length_mm
+            )))
+            result = build_cylinder_weight_result(numbers, diameter_value, diameter_unit, length, length_unit,
+                                                  'Threaded Rod Cylinder Formula')
+            
+            OperationLog.log_operation("Threaded Rod Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
+            return result
+        
+        # For hex products, use rectified hex product formula in mm³
+        elif product_type in HEX_PRODUCTS:
+            return calculate_hex_product_weight_rectified(parameters, width_across_flats, head_height, original_unit)
+        
+        # For other products, use simple cylinder calculation in mm³
+        else:
+            shank_volume_mm3 = calculate_shank_volume_rectified(diameter_mm, length_mm)
+            volume_cm3 = shank_volume_mm3 / 1000
+            weight_g = volume_cm3 * density_g_cm3
+            weight_kg = weight_g / 1000
+            weight_lb = weight_kg * 2.20462
+            
+            numbers = dict(zip(CYLINDER_RESULT_FIELDS, (
+                weight_kg, weight_g, weight_lb, shank_volume_mm3, volume_cm3, density_g_cm3, diameter_mm, length_mm
+            )))
+            result = build_cylinder_weight_result(numbers, diameter_value, diameter_unit, length, length_unit,
+                                                  'Standard Cylinder Formula')
+            
+            OperationLog.log_operation("Standard Product Weight Calculation", True, f"Weight: {weight_kg:.4f} kg")
+            return result
+    
+    except Exception as e:
+        CalculationIssues.report("error", f"Calculation error: {str(e)}")
+        OperationLog.log_operation("Weight Calculation", False, str(e))
+        import traceback
+        CalculationIssues.report("error", f"Detailed error: {traceback.format_exc()}")
+        return None
+
+# ======================================================
+# WEIGHT CATALOG - STANDARD SIZES OVER A LENGTH GRID
+# ======================================================
+WEIGHT_CATALOG_DEFAULT_LENGTHS_MM = (
+    2, 3, 4, 5, 6, 8, 10, 12, 16, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 80, 90, 100,
+    110, 120, 130, 140, 150, 160, 180, 200, 220, 240, 260, 280, 300, 320, 340, 360, 380, 400,
+    420, 440, 460, 480, 500
+)
+
+def weight_catalog_lengths():
+    """Length grid in mm: FASTENER_WEIGHT_CATALOG_LENGTHS (comma separated) or the preferred lengths"""
+    configured = os.environ.get("FASTENER_WEIGHT_CATALOG_LENGTHS", "")
+    if not configured.strip():
+        return WEIGHT_CATALOG_DEFAULT_LENGTHS_MM
+    try:
+        lengths = sorted({float(value) for value in configured.split(",") if value.strip()})
+        if len(lengths) < 2 or lengths[0] < 0:
+            raise ValueError("needs at least two non-negative lengths")
+        return tuple(lengths)
+    except ValueError as e:
+        logger.warning(f"Ignoring FASTENER_WEIGHT_CATALOG_LENGTHS={configured}: {str(e)}")
+        return WEIGHT_CATALOG_DEFAULT_LENGTHS_MM
+
+WEIGHT_CATALOG_LENGTHS_MM = weight_catalog_lengths()
+
+class WeightCatalog:
+    """Weights for every standard product, size, grade and material at each grid length, from one snapshot"""
+    
+    # Columns that vary along the length grid; everything else is fixed per item and material
+    GRID_FIELDS = ('length_mm', 'shank_volume_mm3', 'total_volume_mm3', 'total_volume_cm3', 'weight_g', 'weight_kg', 'weight_lb')
+    BASE_MATERIAL = "Carbon Steel"
+    
+    def __init__(self, snapshot, lengths_mm=None):
+        self.version = snapshot.version
+        self.lengths_mm = np.array(sorted(lengths_mm or WEIGHT_CATALOG_LENGTHS_MM), dtype=float)
+        self.materials = list(MATERIAL_DENSITIES)
+        self.material_codes = {material: code for code, material in enumerate(self.materials)}
+        
+        with Spans.span("weight_catalog.build"), OperationLog.aggregate_logs():
+            items, item_grids = self.evaluate_items(snapshot)
+        self.items = pd.DataFrame(items)
+        self._item_records = items
+        self.item_codes = {
+            (item['standard'], item['product'], item['size'], item['grade']): code for code, item in enumerate(items)
+        }
+        self.table = self.expand_materials(item_grids)
+        # Rows are ordered item, material, length: one contiguous block of len(lengths_mm) rows per pair
+        self._grid_values = self.table[list(self.GRID_FIELDS)].to_numpy(dtype=float)
+        OperationLog.log_operation("Build Weight Catalog", True,
+                                   f"Items: {len(items)}, Rows: {len(self.table)}, Version: {self.version}")
+    
+    @staticmethod
+    def catalog_keys(snapshot):
+        """(standard, product, size, grade) for every hex and socket head product size in the tables"""
+        options = snapshot.options
+        for standard, table in snapshot.dimension_index.tables.items():
+            if table.empty or 'Product' not in table.columns:
+                continue
+            for product in sorted(str(product).strip() for product in table['Product'].dropna().unique()):
+                if product not in HEX_PRODUCTS and product not in SOCKET_HEAD_PRODUCTS:
+                    continue
+                for grade in options.grade_options_for(standard, product):
+                    for size in options.size_options(standard, product, grade):
+                        if size != "All":
+                            yield standard, product, size, grade
+    
+    def evaluate_items(self, snapshot):
+        """Run compute_weight_rectified over the length grid at each size's nominal diameter"""
+        items = []
+        item_grids = []
+        for standard, product, size, grade in self.catalog_keys(snapshot):
+            nominal_mm = parse_fastener_size(size).nominal_mm
+            socket = product in SOCKET_HEAD_PRODUCTS
+            lookup = get_socket_head_dimensions if socket else get_hex_head_dimensions
+            # Explicit snapshot: a refresh builds the catalog before the new snapshot is served
+            head_first, head_second, head_unit = lookup(standard, product, size, grade, snapshot)
+            # Sizes without a nominal diameter or table head dimensions stay on the regular path
+            if not nominal_mm or head_first is None or head_second is None:
+                continue
+            
+            parameters = {
+                'product_type': product, 'standard': standard, 'size': size, 'grade': grade,
+                'diameter_type': 'Blank Diameter', 'diameter_value': nominal_mm, 'diameter_unit': 'mm',
+                'length_unit': 'mm', 'material': self.BASE_MATERIAL
+            }
+            with CalculationIssues.collect() as issues:
+                results = [compute_weight_rectified(dict(parameters, length=float(length)), snapshot) for length in self.lengths_mm]
+            if any(result is None for result in results) or any(level != "debug" for level, _ in issues):
+                continue
+            
+            first = results[0]
+            items.append({
+                'standard': standard, 'product': product, 'size': size, 'grade': grade,
+                'method': 'socket' if socket else 'hex', 'diameter_mm': first['diameter_mm'],
+                'head_first': head_first, 'head_second': head_second, 'head_unit': head_unit,
+                'head_first_mm': first['head_diameter_mm' if socket else 'width_across_flats_mm'],
+                'head_second_mm': first['head_height_mm'], 'head_volume_mm3': first['head_volume_mm3'],
+                'side_length_mm': first.get('side_length_mm', np.nan)
+            })
+            item_grids.append([[result[field] for field in self.GRID_FIELDS] for result in results])
+        return items, np.array(item_grids, dtype=float).reshape(len(item_grids), len(self.lengths_mm), len(self.GRID_FIELDS))
+    
+    def expand_materials(self, item_grids):
+        """One row per item, material and length; weights rescaled with each density exactly as the formulas do"""
+        item_count, length_count, _ = item_grids.shape
+        material_count = len(self.materials)
+        densities = np.array([MATERIAL_DENSITIES[material] for material in self.materials])
+        grid = np.repeat(item_grids[:, np.newaxis, :, :], material_count, axis=1)
+        
+        fields = {field: position for position, field in enumerate(self.GRID_FIELDS)}
+        weight_g = grid[..., fields['total_volume_cm3']] * densities[np.newaxis, :, np.newaxis]
+        grid[..., fields['weight_g']] = weight_g
+        grid[..., fields['weight_kg']] = weight_g / 1000
+        grid[..., fields['weight_lb']] = grid[..., fields['weight_kg']] * 2.20462
+        
+        table = pd.DataFrame(grid.reshape(-1, len(self.GRID_FIELDS)), columns=list(self.GRID_FIELDS))
+        table.insert(0, 'item', np.repeat(np.arange(item_count, dtype=np.int32), material_count * length_count))
+        table.insert(1, 'material', pd.Categorical.from_codes(
+            np.tile(np.repeat(np.arange(material_count, dtype=np.int8), length_count), item_count), self.materials
+        ))
+        return table
+    
+    @staticmethod
+    def number(value):
+        """value as a float when it is a plain finite number, else None"""
+        if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+            return None
+        value = float(value)
+        return value if math.isfinite(value) else None
+    
+    def lookup(self, parameters):
+        """calculate_weight_rectified result for a catalog item, interpolated in length between grid points; None otherwise"""
+        try:
+            item_code = self.item_codes.get((
+                parameters.get('standard', 'ASME B18.2.1'), parameters.get('product_type', 'Hex Bolt'),
+                parameters.get('size', 'All'), parameters.get('grade', 'All')
+            ))
+            material_code = self.material_codes.get(parameters.get('material', 'Carbon Steel'))
+        except TypeError:
+            return None
+        if item_code is None or material_code is None:
+            return None
+        
+        diameter_value = parameters.get('diameter_value', 0.0)
+        diameter_unit = parameters.get('diameter_unit', 'mm')
+        length = parameters.get('length', 0.0)
+        length_unit = parameters.get('length_unit', 'mm')
+        if self.number(diameter_value) is None or self.number(length) is None:
+            return None
+        diameter_mm = convert_to_mm(diameter_value, diameter_unit)
+        length_mm = convert_to_mm(length, length_unit)
+        
+        item = self._item_records[item_code]
+        if not math.isclose(diameter_mm, item['diameter_mm'], rel_tol=1e-9):
+            return None
+        position = int(np.searchsorted(self.lengths_mm, length_mm))
+        if position == len(self.lengths_mm) or (position == 0 and length_mm != self.lengths_mm[0]):
+            return None
+        
+        block = (item_code * len(self.materials) + material_code) * len(self.lengths_mm)
+        if self.lengths_mm[position] == length_mm:
+            values = self._grid_values[block + position]
+        else:
+            # Linear in length between the neighbouring grid points
+            lower, upper = self._grid_values[block + position - 1], self._grid_values[block + position]
+            fraction = (length_mm - self.lengths_mm[position - 1]) / (self.lengths_mm[position] - self.lengths_mm[position - 1])
+            values = lower + fraction * (upper - lower)
+        
+        numbers = dict(zip(self.GRID_FIELDS, values.tolist()))
+        numbers.update({
+            'diameter_mm': diameter_mm, 'length_mm': length_mm,
+            'head_volume_mm3': item['head_volume_mm3'], 'head_height_mm': item['head_second_mm'],
+            'density_g_cm3': MATERIAL_DENSITIES[self.materials[material_code]]
+        })
+        if item['method'] == 'socket':
+            numbers['head_diameter_mm'] = item['head_first_mm']
+            return build_socket_weight_result(
+                {field: numbers[field] for field in SOCKET_RESULT_FIELDS}, diameter_value, diameter_unit, length, length_unit,
+                item['head_first'], item['head_second'], item['head_unit'])
+        numbers['width_across_flats_mm'] = item['head_first_mm']
+        numbers['side_length_mm'] = item['side_length_mm']
+        return build_hex_weight_result(
+            {field: numbers[field] for field in HEX_RESULT_FIELDS}, diameter_value, diameter_unit, length, length_unit,
+            item['head_first'], item['head_second'], item['head_unit'])
+
+def get_weight_catalog(snapshot=None, wait=False):
+    """Weight catalog of the snapshot; built in the background, so None until ready unless wait is set"""
+    snapshot = snapshot or get_reference_snapshot()
+    if wait:
+        return snapshot.derived("weight_catalog", WeightCatalog)
+    return snapshot.derived_in_background("weight_catalog", WeightCatalog)
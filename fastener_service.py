@@ -0,0 +1,350 @@
+"""Local HTTP/JSON API over the fastener engine: weights, hex head dimensions and pitch diameters.
+
+A plain ASGI application served by uvicorn; keep-alive connections are reused between calls:
+
+    python fastener_service.py --port 8000
+    uvicorn fastener_service:app --port 8000
+
+Requests that arrive within a few milliseconds of each other are evaluated together in one call,
+and GET /metrics reports per-endpoint latency histograms. Set FASTENER_TRACE_EXPORT=otlp to also
+export engine spans to an OpenTelemetry collector.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastener_engine import (
+    OperationLog, CalculationIssues, configure_logging, configure_tracing, get_reference_snapshot, spill_default,
+    LatencyHistogram, Spans, get_weight_catalog,
+    calculate_weights_rectified, get_hex_head_dimensions, get_pitch_diameter_from_thread_data
+)
+
+# ======================================================
+# SERVICE SETTINGS
+# ======================================================
+SERVICE_BATCH_WINDOW_SECONDS = 0.005
+SERVICE_MAX_BATCH_ITEMS = 2000
+SERVICE_MAX_BULK_ITEMS = 10000
+SERVICE_MAX_BODY_BYTES = 16 * 1024 * 1024
+SERVICE_KEEP_ALIVE_SECONDS = 30
+SERVICE_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class RequestError(Exception):
+    """Client error with the HTTP status to answer with"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def json_value(value):
+    """Payload with NaN and infinity as null, which is how JSON spells a missing number"""
+    if isinstance(value, dict):
+        return {key: json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_value(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+def issue_records(issues):
+    """(level, message) pairs as JSON objects"""
+    return [{'level': level, 'message': message} for level, message in issues]
+
+# ======================================================
+# MICRO-BATCHING
+# ======================================================
+class MicroBatcher:
+    """Coalesce items submitted within a short window into one evaluate(items) call on the evaluation thread"""
+    
+    def __init__(self, evaluate, executor, window=SERVICE_BATCH_WINDOW_SECONDS, max_items=SERVICE_MAX_BATCH_ITEMS):
+        self.evaluate = evaluate
+        self.executor = executor
+        self.window = window
+        self.max_items = max_items
+        self._pending = []
+        self._flush_handle = None
+        self.batches = 0
+        self.items = 0
+    
+    async def submit_many(self, items):
+        """Results for items, in order, evaluated together with whatever else arrives in the window"""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in items]
+        self._pending.extend(zip(items, futures))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await asyncio.gather(*futures)
+    
+    def _flush(self):
+        """Hand everything pending to one evaluation"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._evaluate(pending))
+    
+    async def _evaluate(self, pending):
+        """Run evaluate on the worker thread and resolve each caller's future"""
+        self.batches += 1
+        self.items += len(pending)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.evaluate, [item for item, _ in pending]
+            )
+        except Exception as e:
+            OperationLog.log_operation("Service Batch Evaluation", False, str(e))
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+    
+    def stats(self):
+        """How well requests are being coalesced"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else None
+        }
+
+# ======================================================
+# BATCH EVALUATION
+# ======================================================
+def evaluate_weights(parameter_list):
+    """Weight results for a batch of calculate_weight_rectified parameter dicts"""
+    return [
+        {'result': result, 'issues': issue_records(issues)}
+        for result, issues in calculate_weights_rectified(parameter_list)
+    ]
+
+def evaluate_distinct(argument_list, lookup):
+    """lookup(*arguments) once per distinct argument tuple, with the issues it reported"""
+    found = {}
+    for arguments in argument_list:
+        if arguments not in found:
+            with CalculationIssues.collect() as issues:
+                value = lookup(*arguments)
+            found[arguments] = (value, issue_records(issues))
+    return [found[arguments] for arguments in argument_list]
+
+def hex_dimensions_record(standard, product, size, grade):
+    """get_hex_head_dimensions as a JSON object"""
+    width_across_flats, head_height, unit = get_hex_head_dimensions(standard, product, size, grade)
+    return {'width_across_flats': width_across_flats, 'head_height': head_height, 'unit': unit}
+
+def evaluate_hex_dimensions(argument_list):
+    """Hex head dimensions for a batch of (standard, product, size, grade)"""
+    return [
+        dict(record, issues=issues)
+        for record, issues in evaluate_distinct(argument_list, hex_dimensions_record)
+    ]
+
+def evaluate_pitch_diameters(argument_list):
+    """Pitch diameters for a batch of (thread_standard, thread_size, thread_class)"""
+    return [
+        {'pitch_diameter': value, 'issues': issues}
+        for value, issues in evaluate_distinct(argument_list, get_pitch_diameter_from_thread_data)
+    ]
+
+# ======================================================
+# REQUEST PARSING
+# ======================================================
+def required_text(item, field, default=None):
+    """A field of a request object as text"""
+    value = item.get(field, default)
+    if value is None:
+        raise RequestError(400, f"Missing field: {field}")
+    return str(value)
+
+def hex_dimensions_arguments(item):
+    """(standard, product, size, grade) from a request object"""
+    if not isinstance(item, dict):
+        raise RequestError(400, "Expected a JSON object")
+    return (required_text(item, 'standard'), required_text(item, 'product'),
+            required_text(item, 'size'), required_text(item, 'grade', "All"))
+
+def pitch_diameter_arguments(item):
+    """(thread_standard, thread_size, thread_class) from a request object"""
+    if not isinstance(item, dict):
+        raise RequestError(400, "Expected a JSON object")
+    return (required_text(item, 'thread_standard'), required_text(item, 'thread_size'),
+            required_text(item, 'thread_class'))
+
+def weight_parameters(item):
+    """calculate_weight_rectified parameters from a request object"""
+    if not isinstance(item, dict):
+        raise RequestError(400, "Expected a JSON object")
+    return item
+
+def bulk_items(body):
+    """The "items" list of a bulk request"""
+    if not isinstance(body, dict) or not isinstance(body.get('items'), list):
+        raise RequestError(400, 'Expected {"items": [...]}')
+    if len(body['items']) > SERVICE_MAX_BULK_ITEMS:
+        raise RequestError(413, f"At most {SERVICE_MAX_BULK_ITEMS} items per request")
+    return body['items']
+
+# ======================================================
+# ASGI APPLICATION
+# ======================================================
+class FastenerService:
+    """ASGI application: JSON endpoints over the fastener engine"""
+    
+    def __init__(self):
+        # One evaluation thread: batches run one after another while the event loop keeps collecting the next
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-eval")
+        self.batchers = {
+            'weight': MicroBatcher(evaluate_weights, self.executor),
+            'hex_dimensions': MicroBatcher(evaluate_hex_dimensions, self.executor),
+            'pitch_diameter': MicroBatcher(evaluate_pitch_diameters, self.executor),
+        }
+        endpoints = [
+            ('weight', '/v1/weight', weight_parameters, 'result'),
+            ('hex_dimensions', '/v1/dimensions/hex', hex_dimensions_arguments, 'width_across_flats'),
+            ('pitch_diameter', '/v1/pitch-diameter', pitch_diameter_arguments, 'pitch_diameter'),
+        ]
+        self.routes = {('GET', '/health'): self.health, ('GET', '/metrics'): self.metrics}
+        for name, path, parse, value_field in endpoints:
+            self.routes[('POST', path)] = self.single_endpoint(self.batchers[name], parse, value_field)
+            self.routes[('POST', f"{path}/bulk")] = self.bulk_endpoint(self.batchers[name], parse)
+        self.histograms = {f"{method} {path}": LatencyHistogram(SERVICE_LATENCY_BUCKETS_MS) for method, path in self.routes}
+        self.paths = {path for _, path in self.routes}
+    
+    def single_endpoint(self, batcher, parse, value_field):
+        """Handler for one item; 422 when the engine found no value"""
+        async def handle(body):
+            [record] = await batcher.submit_many([parse(body)])
+            return (200 if record[value_field] is not None else 422), record
+        return handle
+    
+    def bulk_endpoint(self, batcher, parse):
+        """Handler for {"items": [...]}; results come back in the same order"""
+        async def handle(body):
+            items = [parse(item) for item in bulk_items(body)]
+            return 200, {'results': await batcher.submit_many(items)}
+        return handle
+    
+    async def health(self, body):
+        """Reference data version served by this process"""
+        snapshot = get_reference_snapshot()
+        return 200, {'status': 'ok', 'reference_version': snapshot.version, 'loaded_on': snapshot.loaded_on.isoformat()}
+    
+    async def metrics(self, body):
+        """Per-endpoint latency histograms, micro-batching counters and engine span histograms"""
+        return 200, {
+            'latency': {endpoint: histogram.summary() for endpoint, histogram in self.histograms.items() if histogram.count},
+            'batching': {name: batcher.stats() for name, batcher in self.batchers.items()},
+            'spans': Spans.process.summary()
+        }
+    
+    async def lifespan(self, receive, send):
+        """Load the reference data once per process, before the first request"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    configure_logging()
+                    configure_tracing()
+                    snapshot = await asyncio.get_running_loop().run_in_executor(self.executor, get_reference_snapshot)
+                    # Catalog weights answer from the first request on
+                    await asyncio.get_running_loop().run_in_executor(self.executor, get_weight_catalog, snapshot, True)
+                    OperationLog.log_operation("Service Startup", True, f"Reference version: {snapshot.version}")
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    @staticmethod
+    async def read_json(receive):
+        """Request body parsed as JSON, None when empty"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > SERVICE_MAX_BODY_BYTES:
+                raise RequestError(413, "Request body too large")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        body = b''.join(chunks)
+        if not body:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON: {str(e)}")
+    
+    @staticmethod
+    async def respond(send, status, payload):
+        """Send a JSON response"""
+        body = json.dumps(json_value(payload), default=spill_default).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii'))]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        
+        start = time.perf_counter()
+        endpoint = f"{scope['method']} {scope['path']}"
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            status = 405 if scope['path'] in self.paths else 404
+            await FastenerService.respond(send, status, {'error': f"No endpoint for {endpoint}"})
+            return
+        
+        try:
+            status, payload = await handler(await FastenerService.read_json(receive))
+        except RequestError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            OperationLog.log_operation(f"Service Request: {endpoint}", False, str(e))
+            status, payload = 500, {'error': "Internal error"}
+        await FastenerService.respond(send, status, payload)
+        self.histograms[endpoint].observe(time.perf_counter() - start)
+
+app = FastenerService()
+
+# ======================================================
+# COMMAND LINE
+# ======================================================
+def main(argv=None):
+    """Serve the API with uvicorn"""
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for fastener weights and dimensions.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="server processes; each loads the reference data once")
+    args = parser.parse_args(argv)
+    
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("the service needs uvicorn (pip install uvicorn)")
+    
+    uvicorn.run("fastener_service:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_keep_alive=SERVICE_KEEP_ALIVE_SECONDS, access_log=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())